@@ -1,25 +1,213 @@
-from django.contrib import admin
-from .models import Batch, CallRequest, Company, Employee, Lead, SalesRecord
-from .models import Company, Employee, Expense
-from .models import Attendance, LeaveRequest
-
-from .models import Company, Employee, Expense, Attendance, LeaveRequest, SalesRecord, Lead, Batch, EnrolledClient, SupportTicket, CallRequest
-
-admin.site.register(Company)
-admin.site.register(Employee)
-admin.site.register(Expense)
-admin.site.register(Attendance)
-admin.site.register(LeaveRequest)
-admin.site.register(SalesRecord)
-admin.site.register(Lead)
-admin.site.register(Batch)
+from django import forms
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+from . import leave
+from .models import (
+    Company, Employee, Expense, Attendance, LeaveRequest, LeaveLedger, SalesRecord, Lead, Batch,
+    EnrolledClient, SupportTicket, CallRequest
+)
+
+# Unfiltered changelists above this many rows show an estimate instead of running COUNT(*)
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_rows(queryset):
+    """
+    Cheap row estimate for a whole table from planner statistics: pg_class on
+    PostgreSQL, sqlite_stat1 (written by ANALYZE) on SQLite. None if there are
+    none, and the paginator counts exactly. MAX(pk) is not used: after
+    archive_data removes the old, low ids it overcounts by everything archived.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None  # -1 until the table is first analyzed
+        if connection.vendor == 'sqlite':
+            try:
+                # The first number of any row for the table is its row count at the last ANALYZE
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            except DatabaseError:  # no sqlite_stat1 until ANALYZE has run once
+                return None
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row and row[0] else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """ Exact counts for filtered changelists (they hit an index), an estimate for the bare table. """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if hasattr(qs, 'query') and not qs.query.where:
+            estimate = estimated_rows(qs)
+            if estimate and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # skips the second, unfiltered COUNT(*)
+    list_per_page = 50
+
+
+@admin.register(Company)
+class CompanyAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+
+
+class EmployeeForm(forms.ModelForm):
+    casual_adjustment = forms.IntegerField(required=False, help_text='Days to add (negative to remove), recorded in the leave ledger')
+    sick_adjustment = forms.IntegerField(required=False, help_text='Days to add (negative to remove), recorded in the leave ledger')
+    adjustment_note = forms.CharField(required=False, max_length=200)
+
+    class Meta:
+        model = Employee
+        fields = '__all__'
+
+
+@admin.register(Employee)
+class EmployeeAdmin(admin.ModelAdmin):
+    """ Balances are read-only here; changes go through leave.adjust() so the ledger stays in step. """
+    form = EmployeeForm
+    list_display = ('full_name', 'designation', 'company', 'joining_date', 'is_probation')
+    list_select_related = ('company',)
+    list_filter = ('is_probation', 'company')
+    search_fields = ('full_name', 'designation')
+    autocomplete_fields = ('user', 'company')
+    readonly_fields = ('casual_leave_bal', 'sick_leave_bal')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        note = form.cleaned_data.get('adjustment_note') or 'Admin adjustment'
+        for leave_type, field in (('Casual', 'casual_adjustment'), ('Sick', 'sick_adjustment')):
+            days = form.cleaned_data.get(field)
+            if days:
+                leave.adjust(obj.pk, leave_type, days, user=request.user, note=note)
+
+
+@admin.register(Expense)
+class ExpenseAdmin(admin.ModelAdmin):
+    list_display = ('voucher_no', 'date', 'description', 'amount', 'paid_to', 'company')
+    list_select_related = ('company',)
+    search_fields = ('=voucher_no',)
+    date_hierarchy = 'date'
+
+
+@admin.register(Attendance)
+class AttendanceAdmin(LargeTableAdmin):
+    list_display = ('employee', 'date', 'status', 'in_time', 'out_time', 'penalty_amount')
+    list_select_related = ('employee',)
+    list_filter = ('status',)  # with the date hierarchy: attn_date_status_idx
+    date_hierarchy = 'date'
+    ordering = ('-date', '-id')
+    autocomplete_fields = ('employee',)
+
+
+@admin.register(LeaveRequest)
+class LeaveRequestAdmin(LargeTableAdmin):
+    """ Status is read-only: approving goes through leave.approve(), which deducts and writes the ledger. """
+    list_display = ('employee', 'leave_type', 'start_date', 'end_date', 'status')
+    list_select_related = ('employee',)
+    list_filter = ('status',)
+    ordering = ('-id',)
+    autocomplete_fields = ('employee',)
+    readonly_fields = ('status',)
+    actions = ('approve', 'reject')
+
+    @admin.action(description='Approve selected pending requests')
+    def approve(self, request, queryset):
+        try:
+            approved = leave.approve(list(queryset.values_list('pk', flat=True)), user=request.user)
+        except leave.LeaveError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        self.message_user(request, f'{len(approved)} approved.')
+
+    @admin.action(description='Reject selected pending requests')
+    def reject(self, request, queryset):
+        rejected = queryset.filter(status='Pending').update(status='Rejected')
+        self.message_user(request, f'{rejected} rejected.')
+
+
+@admin.register(LeaveLedger)
+class LeaveLedgerAdmin(LargeTableAdmin):
+    """ Read-only: balances move through documents.leave, which writes these rows. """
+    list_display = ('employee', 'leave_type', 'entry', 'days', 'note', 'created_by', 'created_at')
+    list_select_related = ('employee', 'created_by')
+    list_filter = ('leave_type', 'entry')
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SalesRecord)
+class SalesRecordAdmin(LargeTableAdmin):
+    list_display = ('employee', 'date', 'count')
+    list_select_related = ('employee',)
+    date_hierarchy = 'date'
+    ordering = ('-date', '-id')
+    autocomplete_fields = ('employee',)
+
+
+@admin.register(Lead)
+class LeadAdmin(LargeTableAdmin):
+    list_display = ('name', 'phone', 'status', 'source', 'assigned_to', 'created_at')
+    list_select_related = ('assigned_to',)
+    list_filter = ('status',)
+    search_fields = ('=phone',)  # exact match on lead_phone_idx; LIKE '%..%' would scan
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    autocomplete_fields = ('assigned_to',)
+
+
+@admin.register(Batch)
+class BatchAdmin(admin.ModelAdmin):
+    list_display = ('name', 'coordinator', 'student_limit', 'created_at')
+    list_select_related = ('coordinator',)
+    search_fields = ('name',)
+    autocomplete_fields = ('coordinator',)
+
 
 # Client Section Customization
+@admin.register(EnrolledClient)
 class ClientAdmin(admin.ModelAdmin):
     list_display = ('name', 'batch', 'email', 'phone', 'joined_date')
+    list_select_related = ('batch',)
     search_fields = ('name', 'email', 'phone')
     list_filter = ('batch',)
+    autocomplete_fields = ('user', 'batch')
+
+
+@admin.register(SupportTicket)
+class SupportTicketAdmin(LargeTableAdmin):
+    list_display = ('subject', 'client', 'coordinator', 'status', 'created_at', 'resolved_at')
+    list_select_related = ('client', 'coordinator')
+    list_filter = ('status',)
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    autocomplete_fields = ('client', 'coordinator')
+
 
-admin.site.register(EnrolledClient, ClientAdmin)
-admin.site.register(SupportTicket)
-admin.site.register(CallRequest)
\ No newline at end of file
+@admin.register(CallRequest)
+class CallRequestAdmin(LargeTableAdmin):
+    list_display = ('client', 'coordinator', 'status', 'created_at', 'completed_at')
+    list_select_related = ('client', 'coordinator')
+    list_filter = ('status',)
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    autocomplete_fields = ('client', 'coordinator')
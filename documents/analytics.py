@@ -0,0 +1,144 @@
+"""
+Sales roll-ups, leaderboards and commission.
+
+SalesDaily / SalesMonthly hold per-employee totals. Signals call
+record_changed() whenever a SalesRecord is saved or deleted; it recomputes
+just the affected (employee, day) and (employee, month) rows, so edits
+and deletes stay exact. bulk_create skips signals, so after bulk loads run
+"manage.py rebuild_sales_rollups" (seed_benchmark does this itself).
+
+A company-wide leaderboard is then one read on the (month, -total)
+index instead of a GROUP BY over every SalesRecord.
+
+commission() and bonus() are the single place the tiered rule lives:
+400 per sale up to the target, 500 per sale above it, plus a 1000 bonus
+once the target is passed. The payslip and the roll-ups both use them.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from .models import SalesRecord, SalesDaily, SalesMonthly
+
+COMMISSION_TARGET = 10
+BASE_RATE = 400
+ABOVE_TARGET_RATE = 500
+TARGET_BONUS = 1000
+LEADERBOARD_SIZE = 10
+
+
+def commission(sales):
+    """ Tiered commission for a month's sales count, without the target bonus. """
+    if sales <= COMMISSION_TARGET:
+        return sales * BASE_RATE
+    return COMMISSION_TARGET * BASE_RATE + (sales - COMMISSION_TARGET) * ABOVE_TARGET_RATE
+
+
+def bonus(sales):
+    return TARGET_BONUS if sales > COMMISSION_TARGET else 0
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def _as_date(value):
+    # SalesRecord.date may still be the raw form string or timezone.now() until reloaded
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+# --- Maintenance ---
+
+def _upsert(model, key, **values):
+    # One INSERT ... ON CONFLICT DO UPDATE (no signals, so cache eviction hangs off SalesRecord)
+    if values['total']:
+        model.objects.bulk_create([model(**key, **values)], update_conflicts=True,
+                                  unique_fields=list(key), update_fields=list(values))
+    else:
+        model.objects.filter(**key).delete()
+
+
+def refresh(employee_id, day):
+    """ Recompute one employee's daily and monthly totals from SalesRecord. """
+    day = _as_date(day)
+    if employee_id is None or day is None:
+        return
+    first = month_start(day)
+    next_month = (first + datetime.timedelta(days=32)).replace(day=1)
+    with transaction.atomic():
+        total = SalesRecord.objects.filter(employee_id=employee_id, date=day).aggregate(t=Sum('count'))['t'] or 0
+        _upsert(SalesDaily, {'employee_id': employee_id, 'date': day}, total=total)
+
+        month_total = SalesDaily.objects.filter(employee_id=employee_id, date__gte=first, date__lt=next_month) \
+            .aggregate(t=Sum('total'))['t'] or 0
+        _upsert(SalesMonthly, {'employee_id': employee_id, 'month': first}, total=month_total,
+                commission=commission(month_total) + bonus(month_total))
+
+
+def record_changed(record):
+    current = (record.employee_id, _as_date(record.date))
+    loaded = getattr(record, '_loaded_key', None)
+    if loaded and (loaded[0], _as_date(loaded[1])) != current:
+        refresh(*loaded)
+    refresh(*current)
+
+
+def rebuild(since=None):
+    """ Recreate the roll-ups from SalesRecord (everything, or from `since` onwards). Returns (daily, monthly) row counts. """
+    records = SalesRecord.objects.all()
+    daily, monthly = SalesDaily.objects.all(), SalesMonthly.objects.all()
+    if since:
+        since = month_start(since)
+        records, daily, monthly = records.filter(date__gte=since), daily.filter(date__gte=since), monthly.filter(month__gte=since)
+    with transaction.atomic():
+        daily.delete()
+        monthly.delete()
+        days = SalesDaily.objects.bulk_create([
+            SalesDaily(employee_id=row['employee_id'], date=row['date'], total=row['total'])
+            for row in records.values('employee_id', 'date').annotate(total=Sum('count')).order_by().iterator()
+            if row['total']
+        ], batch_size=5000)
+        months = SalesMonthly.objects.bulk_create([
+            SalesMonthly(employee_id=row['employee_id'], month=_as_date(row['month']), total=row['total'],
+                         commission=commission(row['total']) + bonus(row['total']))
+            for row in records.annotate(month=TruncMonth('date')).values('employee_id', 'month')
+                              .annotate(total=Sum('count')).order_by().iterator()
+            if row['total']
+        ], batch_size=5000)
+    return len(days), len(months)
+
+
+# --- Reads ---
+
+def _in_company(qs, company_id):
+    # Ranks are within a company; the roll-ups hold one row per employee, so the join is cheap
+    return qs if company_id is None else qs.filter(employee__company_id=company_id)
+
+
+def leaderboard(month=None, limit=LEADERBOARD_SIZE, company_id=None):
+    """ Top sellers for a month, highest first. """
+    month = month_start(month or datetime.date.today())
+    return list(_in_company(SalesMonthly.objects.filter(month=month), company_id).select_related('employee')
+                .order_by('-total', 'employee_id')[:limit])
+
+
+def daily_leaderboard(day=None, limit=LEADERBOARD_SIZE, company_id=None):
+    day = day or datetime.date.today()
+    return list(_in_company(SalesDaily.objects.filter(date=day), company_id).select_related('employee')
+                .order_by('-total', 'employee_id')[:limit])
+
+
+def standing(employee_id, month=None, company_id=None):
+    """ An employee's total, rank (1-based, None without sales) and projected commission for a month. """
+    month = month_start(month or datetime.date.today())
+    row = SalesMonthly.objects.filter(employee_id=employee_id, month=month).values('total', 'commission').first()
+    if not row:
+        return {'total': 0, 'rank': None, 'commission': 0}
+    ahead = _in_company(SalesMonthly.objects.filter(month=month, total__gt=row['total']), company_id).count()
+    return {'total': row['total'], 'rank': ahead + 1, 'commission': row['commission']}
@@ -0,0 +1,248 @@
+"""
+Hot/cold archival of dead rows to Parquet.
+
+    python manage.py archive_data                  # cut-offs from settings
+    python manage.py archive_data --only attendance --older-than 400
+
+Closed leads (Not_Interested / No_Response, untouched for
+ARCHIVE_LEADS_AFTER_DAYS) and attendance older than
+ARCHIVE_ATTENDANCE_AFTER_DAYS are moved out of the database into
+
+    ARCHIVE_DIR/<name>/year=YYYY/month=MM/part-<run>-<chunk>.parquet
+
+partitioned by the row's date (Lead.created_at, Attendance.date) and
+holding every concrete column by attname (FKs as ids). Each chunk is one
+transaction: the rows are read under select_for_update, written to a new
+file, then deleted. If the delete fails the file is removed again; a
+crash between the two can only leave a duplicate, which rows() drops by id.
+
+read() / rows() are the read-only side for historical reports: they open
+only the month partitions overlapping the requested range. archived() tells
+the Sheets import which phones belong to archived leads, so a dead lead is
+not imported again as a new one. pyarrow is
+imported on first use (see pdf.py).
+"""
+import datetime
+import os
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
+
+from . import watermarks
+from .exports import arrow_type
+from .models import Lead, Attendance
+
+CHUNK_SIZE = 10000
+MAX_ROWS = 10000
+CLOSED_LEAD_STATUSES = ('Not_Interested', 'No_Response')
+
+# name -> model, partition date field, field the cut-off applies to, extra filter, settings name of the cut-off
+ARCHIVES = {
+    'leads': (Lead, 'created_at', 'updated_at', {'status__in': CLOSED_LEAD_STATUSES}, 'ARCHIVE_LEADS_AFTER_DAYS'),
+    'attendance': (Attendance, 'date', 'date', {}, 'ARCHIVE_ATTENDANCE_AFTER_DAYS'),
+}
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def _spec(name):
+    if name not in ARCHIVES:
+        raise ArchiveError(f"Unknown archive '{name}'")
+    return ARCHIVES[name]
+
+
+def _day(value):
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def _bound(model, field, day, end=False):
+    """ Date bound usable against `field`: whole local days for DateTimeFields. """
+    if isinstance(model._meta.get_field(field), models.DateTimeField):
+        day = day + datetime.timedelta(days=1) if end else day
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return day
+
+
+def directory(name):
+    return os.path.join(settings.ARCHIVE_DIR, name)
+
+
+def cutoff(name, older_than_days=None):
+    days = older_than_days if older_than_days is not None else getattr(settings, _spec(name)[4])
+    return timezone.localdate() - datetime.timedelta(days=days)
+
+
+def candidates(name, before):
+    """ Hot rows due for archiving: the cut-off field is before the `before` date. """
+    model, _, age_field, extra, _ = _spec(name)
+    return model.objects.filter(**extra, **{f'{age_field}__lt': _bound(model, age_field, before)})
+
+
+def _schema(model):
+    import pyarrow as pa
+
+    fields = model._meta.concrete_fields
+    return [f.attname for f in fields], pa.schema([(f.attname, arrow_type(f)) for f in fields])
+
+
+def _write(name, columns, schema, rows, date_index, run, chunk_no):
+    """ One Parquet file per month partition touched by the chunk. Returns the paths written. """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    partitions = {}
+    for row in rows:
+        day = _day(row[date_index])
+        partitions.setdefault((day.year, day.month), []).append(row)
+    paths = []
+    for (year, month), part in sorted(partitions.items()):
+        folder = os.path.join(directory(name), f'year={year}', f'month={month:02d}')
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'part-{run}-{chunk_no:05d}.parquet')
+        table = pa.Table.from_arrays([pa.array(col, type=schema.field(i).type) for i, col in enumerate(zip(*part))],
+                                     schema=schema)
+        pq.write_table(table, path, compression='zstd')
+        paths.append(path)
+    return paths
+
+
+def archive(name, before=None, chunk_size=CHUNK_SIZE, dry_run=False):
+    """ Move rows older than `before` (default: the configured cut-off) to Parquet. Returns (rows, files). """
+    model, date_field, _, _, _ = _spec(name)
+    before = before or cutoff(name)
+    qs = candidates(name, before)
+    if dry_run:
+        return qs.count(), 0
+    columns, schema = _schema(model)
+    date_index = columns.index(model._meta.get_field(date_field).attname)
+    pk_index = columns.index(model._meta.pk.attname)
+    run = f"{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+    moved = files = chunk_no = 0
+    while True:
+        with transaction.atomic():
+            rows = list(qs.select_for_update().order_by('pk').values_list(*columns)[:chunk_size])
+            if not rows:
+                break
+            paths = _write(name, columns, schema, rows, date_index, run, chunk_no)
+            try:
+                # Raw DELETE: the rows are dead, so skip collecting them for per-row signals
+                done = model.objects.filter(pk__in=[row[pk_index] for row in rows])
+                done._raw_delete(done.db)
+            except Exception:
+                for path in paths:
+                    os.remove(path)
+                raise
+            watermarks.touch(model)
+        moved += len(rows)
+        files += len(paths)
+        chunk_no += 1
+    return moved, files
+
+
+# --- Reads ---
+
+def _files(name, start=None, end=None):
+    root = directory(name)
+    if not os.path.isdir(root):
+        return []
+    lo = (start.year, start.month) if start else None
+    hi = (end.year, end.month) if end else None
+    paths = []
+    for year_dir in sorted(os.listdir(root)):
+        for month_dir in sorted(os.listdir(os.path.join(root, year_dir))):
+            key = (int(year_dir.split('=')[1]), int(month_dir.split('=')[1]))
+            if (lo and key < lo) or (hi and key > hi):
+                continue
+            folder = os.path.join(root, year_dir, month_dir)
+            paths += [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.endswith('.parquet')]
+    return paths
+
+
+def read(name, start=None, end=None, columns=None, **equals):
+    """
+    Archived rows as a pyarrow Table. start/end are inclusive dates on the
+    partition field; keyword arguments are equality filters on columns
+    (e.g. employee_id=4, status='No_Response').
+    """
+    import pyarrow.dataset as ds
+
+    model, date_field, _, _, _ = _spec(name)
+    _, schema = _schema(model)
+    paths = _files(name, start, end)
+    if not paths:
+        return schema.empty_table().select(columns) if columns else schema.empty_table()
+    dataset = ds.dataset(paths, schema=schema, format='parquet')
+    conditions = []
+    if start:
+        conditions.append(ds.field(date_field) >= _bound(model, date_field, start))
+    if end:
+        bound = _bound(model, date_field, end, end=True)
+        conditions.append(ds.field(date_field) < bound if isinstance(bound, datetime.datetime) else ds.field(date_field) <= bound)
+    for column, value in equals.items():
+        if column not in schema.names:
+            raise ArchiveError(f"'{name}' has no column '{column}'")
+        conditions.append(ds.field(column) == value)
+    expr = None
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+    return dataset.to_table(columns=columns, filter=expr)
+
+
+def archived(name, column, values):
+    """ The subset of `values` found in `column` of any archived row. """
+    paths = _files(name)
+    if not paths or not values:
+        return set()
+    import pyarrow.dataset as ds
+
+    _, schema = _schema(_spec(name)[0])
+    table = ds.dataset(paths, schema=schema, format='parquet').to_table(
+        columns=[column], filter=ds.field(column).isin(list(values)))
+    return set(table.column(column).to_pylist())
+
+
+def parse_query(name, params):
+    """ (start, end, limit, filters) from ?from=&to=&limit= plus column=value pairs, values typed per model field. """
+    model = _spec(name)[0]
+    params = dict(params.items())
+    try:
+        start, end = (datetime.date.fromisoformat(params.pop(k)) if params.get(k) else None for k in ('from', 'to'))
+        limit = min(int(params.pop('limit', None) or 1000), MAX_ROWS)
+    except ValueError:
+        raise ArchiveError("Use ?from=YYYY-MM-DD&to=YYYY-MM-DD&limit=<n>")
+    params.pop('from', None), params.pop('to', None)
+    filters = {}
+    for column, value in params.items():
+        try:
+            field = next(f for f in model._meta.concrete_fields if f.attname == column)
+            filters[column] = field.to_python(value)
+        except (StopIteration, ValidationError):
+            raise ArchiveError(f"Bad filter {column}={value!r}")
+    return start, end, limit, filters
+
+
+def rows(name, start=None, end=None, limit=None, **equals):
+    """ Archived rows as dicts, oldest first, one per id. """
+    model, date_field, _, _, _ = _spec(name)
+    pk = model._meta.pk.attname
+    table = read(name, start, end, **equals).sort_by([(date_field, 'ascending'), (pk, 'ascending')])
+    # Convert to Python a window at a time, so ?limit=5 over years of rows builds a handful of dicts.
+    # Duplicates are rare (see above), so the first window of twice the limit nearly always does.
+    window = 2 * (limit or table.num_rows) or 1
+    seen, out = set(), []
+    for offset in range(0, table.num_rows, window):
+        for row in table.slice(offset, window).to_pylist():
+            if row[pk] in seen:
+                continue
+            seen.add(row[pk])
+            out.append(row)
+            if limit and len(out) >= limit:
+                return out
+    return out
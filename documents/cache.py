@@ -0,0 +1,136 @@
+"""
+Dashboard fragment cache.
+
+Dashboards are assembled from named fragments (lead counts, sales total,
+batch list, ...). Each fragment is cached under
+
+    dash:<role>:<owner>:<name>
+
+where owner is the profile id for employees/clients and company_owner()
+for the admin dashboard, which every superuser working in that company
+shares, so each company's figures live in their own namespace. Model signals call
+invalidate(), which deletes only the keys listed for that model in
+INVALIDATION below. Fragments are always built on the primary database
+(routers.primary()), never on the replica. Hit/miss counters are kept per process and served
+to superusers at /cache-stats/.
+"""
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import routers
+from .models import Company, Lead, Attendance, SalesRecord, LeaveRequest, Expense, Batch, EnrolledClient, SupportTicket, CallRequest
+
+GLOBAL_OWNER = 'all'  # fragments every superuser shares whatever company they are in
+_MISSING = object()
+
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_stats_lock = threading.Lock()
+
+
+def fragment_key(role, owner, name):
+    return f'dash:{role}:{owner}:{name}'
+
+
+def fragment(role, owner, name, build, ttl=None):
+    """ Return the cached fragment, building (and storing) it on a miss. build() must return picklable data. """
+    key = fragment_key(role, owner, name)
+    value = cache.get(key, _MISSING)
+    hit = value is not _MISSING
+    with _stats_lock:
+        _stats[name]['hits' if hit else 'misses'] += 1
+    if not hit:
+        # Shared by every reader, so never built from a replica that may not have seen the write that evicted it
+        with routers.primary():
+            value = build()
+            cache.set(key, value, ttl or settings.DASHBOARD_CACHE_TTL)
+    return value
+
+
+def company_owner(company_id):
+    return f'company-{company_id}' if company_id is not None else None
+
+
+def evict(role, owner, *names):
+    if owner is not None:
+        cache.delete_many([fragment_key(role, owner, name) for name in names])
+
+
+def _batch_row(batch_id):
+    row = Batch.objects.filter(pk=batch_id).values_list('coordinator_id', 'company_id').first() if batch_id else None
+    return row or (None, None)
+
+
+def _batch_owner(client):
+    """ (coordinator_id, company_id) of the client's batch, looked up once per save. """
+    cached = getattr(client, '_batch_owner', None)
+    if cached is None or cached[0] != client.batch_id:
+        cached = client._batch_owner = (client.batch_id, _batch_row(client.batch_id))
+    return cached[1]
+
+
+def _loaded_batch_owner(client):
+    """ (coordinator_id, company_id) of the batch the client was loaded in, if it has moved since. """
+    loaded = getattr(client, '_loaded_batch_id', None)
+    if loaded is None or loaded == client.batch_id:
+        return (None, None)
+    cached = getattr(client, '_loaded_batch_owner', None)
+    if cached is None or cached[0] != loaded:
+        cached = client._loaded_batch_owner = (loaded, _batch_row(loaded))
+    return cached[1]
+
+
+def _company(o):
+    return company_owner(o.company_id)
+
+
+# model -> [(role, owner getter, fragment names)]
+INVALIDATION = {
+    Company: [('admin', lambda o: GLOBAL_OWNER, ['companies'])],
+    Lead: [
+        ('employee', lambda o: o.assigned_to_id, ['leads']),
+        ('employee', lambda o: getattr(o, '_loaded_assigned_to_id', None), ['leads']),
+        ('admin', _company, ['crm']),
+    ],
+    Attendance: [('employee', lambda o: o.employee_id, ['history'])],
+    SalesRecord: [
+        ('employee', lambda o: o.employee_id, ['sales']),
+        ('employee', lambda o: (getattr(o, '_loaded_key', None) or (None,))[0], ['sales']),
+        ('admin', _company, ['leaderboard']),
+    ],
+    LeaveRequest: [('employee', lambda o: o.employee_id, ['leaves'])],
+    Expense: [('admin', _company, ['finance'])],
+    Batch: [
+        ('employee', lambda o: o.coordinator_id, ['batches']),
+        ('employee', lambda o: getattr(o, '_loaded_owner_id', None), ['batches']),
+        ('admin', _company, ['cms']),
+    ],
+    EnrolledClient: [
+        ('employee', lambda o: _batch_owner(o)[0], ['batches']),
+        ('employee', lambda o: _loaded_batch_owner(o)[0], ['batches']),  # moved: the old coordinator too
+        ('admin', lambda o: company_owner(_batch_owner(o)[1]), ['cms']),
+        ('admin', lambda o: company_owner(_loaded_batch_owner(o)[1]), ['cms']),
+    ],
+    SupportTicket: [('client', lambda o: o.client_id, ['tickets'])],
+    CallRequest: [('client', lambda o: o.client_id, ['tickets'])],
+}
+
+
+def invalidate(instance):
+    for role, owner, names in INVALIDATION.get(type(instance), ()):
+        evict(role, owner(instance), *names)
+
+
+def stats():
+    with _stats_lock:
+        rows = {name: dict(counts) for name, counts in _stats.items()}
+    for counts in rows.values():
+        total = counts['hits'] + counts['misses']
+        counts['ratio'] = round(counts['hits'] / total, 3) if total else None
+    return {
+        'backend': settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1],
+        'ttl': settings.DASHBOARD_CACHE_TTL,
+        'fragments': rows,
+    }
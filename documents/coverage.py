@@ -0,0 +1,113 @@
+"""
+Team coverage calendar: who is available on each day of a range.
+
+Three reads, whatever the range or headcount: the roster (id, designation,
+joining date), approved LeaveRequest intervals overlapping the range, and
+Attendance rows that mark someone out (Absent / Leave). Everything else is
+NumPy on an employees x days boolean grid:
+
+  * leave intervals become +1/-1 marks in a difference array, and a
+    cumulative sum along the day axis expands them to "on leave" cells
+  * attendance rows are scattered straight into an "absent" grid
+  * people count from their joining date
+
+available = employed & ~on_leave & ~absent, summed per day overall and per
+designation. NumPy is imported on first use (see pdf.py).
+"""
+import datetime
+
+from .models import Attendance, Employee, LeaveRequest
+
+MAX_DAYS = 366
+OUT_STATUSES = ('Absent', 'Leave')
+
+
+class CoverageError(ValueError):
+    pass
+
+
+def parse_range(params, default_days=31):
+    """ (start, end) from ?from=YYYY-MM-DD&to=YYYY-MM-DD, defaulting to 31 days from today. """
+    try:
+        start = datetime.date.fromisoformat(params['from']) if params.get('from') else datetime.date.today()
+        end = datetime.date.fromisoformat(params['to']) if params.get('to') else start + datetime.timedelta(days=default_days - 1)
+    except ValueError:
+        raise CoverageError("Use ?from=YYYY-MM-DD&to=YYYY-MM-DD")
+    if end < start:
+        raise CoverageError("'to' is before 'from'")
+    if (end - start).days >= MAX_DAYS:
+        raise CoverageError(f"Range is limited to {MAX_DAYS} days")
+    return start, end
+
+
+def calendar(start, end, employees=None):
+    """
+    Per-day coverage between start and end (inclusive). `employees` narrows
+    the roster (any Employee queryset). Returns
+    {'from', 'to', 'designations', 'days': [{'date', 'headcount', 'on_leave',
+    'absent', 'available', 'by_designation': {designation: available}}]}.
+    """
+    import numpy as np
+
+    n_days = (end - start).days + 1
+    roster = list((employees if employees is not None else Employee.scoped.all())
+                  .order_by('pk').values_list('pk', 'designation', 'joining_date'))
+    index = {pk: i for i, (pk, _, _) in enumerate(roster)}
+    n_emp = len(roster)
+
+    def offset(day):
+        return (day - start).days
+
+    # Employed from the joining date (clipped into the range; after it -> n_days, never employed)
+    joined = np.array([min(max(offset(j), 0), n_days) for _, _, j in roster], dtype=np.int32)
+    employed = np.arange(n_days)[None, :] >= joined[:, None]
+
+    # Approved leave: +1 at the first day, -1 after the last, cumulative sum -> covered days
+    leaves = LeaveRequest.scoped.filter(status='Approved', start_date__lte=end, end_date__gte=start)
+    if employees is not None:
+        leaves = leaves.filter(employee__in=employees)
+    rows, first, last = [], [], []
+    for emp_id, s, e in leaves.values_list('employee_id', 'start_date', 'end_date').iterator():
+        if emp_id in index:
+            rows.append(index[emp_id])
+            first.append(max(offset(s), 0))
+            last.append(min(offset(e), n_days - 1) + 1)
+    marks = np.zeros((n_emp, n_days + 1), dtype=np.int16)
+    if rows:
+        np.add.at(marks, (rows, first), 1)
+        np.add.at(marks, (rows, last), -1)
+    on_leave = np.cumsum(marks[:, :-1], axis=1) > 0
+
+    # Recorded absences (past days only, naturally)
+    attendance = Attendance.scoped.filter(date__range=(start, end), status__in=OUT_STATUSES)
+    if employees is not None:
+        attendance = attendance.filter(employee__in=employees)
+    cells = [(index[emp_id], offset(day)) for emp_id, day in attendance.values_list('employee_id', 'date').iterator()
+             if emp_id in index]
+    absent = np.zeros((n_emp, n_days), dtype=bool)
+    if cells:
+        r, c = zip(*cells)
+        absent[list(r), list(c)] = True
+
+    out_leave = employed & on_leave
+    out_absent = employed & absent & ~on_leave
+    available = employed & ~on_leave & ~absent
+
+    designations = sorted({d for _, d, _ in roster})
+    groups = np.array([designations.index(d) for _, d, _ in roster], dtype=np.int32)
+    by_designation = {name: available[groups == g].sum(axis=0) for g, name in enumerate(designations)}
+
+    headcount, leave_count = employed.sum(axis=0), out_leave.sum(axis=0)
+    absent_count, available_count = out_absent.sum(axis=0), available.sum(axis=0)
+    return {
+        'from': start, 'to': end, 'designations': designations,
+        'days': [{
+            'date': start + datetime.timedelta(days=d),
+            'headcount': int(headcount[d]),
+            'on_leave': int(leave_count[d]),
+            'absent': int(absent_count[d]),
+            'available': int(available_count[d]),
+            'by_designation': {name: int(counts[d]) for name, counts in by_designation.items()},
+        } for d in range(n_days)],
+    }
+
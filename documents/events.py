@@ -0,0 +1,186 @@
+"""
+Live events for the dashboards (Server-Sent Events).
+
+Signal handlers publish small JSON events into an in-process broker; each
+open /events/ stream holds one asyncio.Queue subscribed to its channels.
+A publish only reaches streams served by the same process, so every
+stream also polls the database for rows newer than its cursor whenever
+it has been idle for POLL_INTERVAL seconds. That keeps multi-worker
+deployments correct, at the cost of a few seconds of latency.
+
+Streams need ASGI (uvicorn, see readme.md). Under WSGI Django buffers an
+async streaming response to the end before sending it, so a stream would
+hold a worker for MAX_STREAM_AGE and deliver nothing: the dashboards only
+open one when streaming() says so, and /events/ answers 204 (which tells
+EventSource to stop reconnecting) otherwise.
+"""
+import asyncio
+import datetime
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from . import tenancy
+from .models import Employee, SupportTicket, CallRequest, Lead
+
+POLL_INTERVAL = 10      # seconds between DB polls on an idle stream
+MAX_STREAM_AGE = 300    # seconds; browsers reconnect on their own
+
+_subscribers = {}       # channel -> set of (loop, queue)
+_lock = threading.Lock()
+
+
+def streaming(request):
+    """ Whether this server can hold an event stream open (ASGI only). """
+    return isinstance(request, ASGIRequest)
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def admin_channel(company_id):
+    """ Superusers hear about their active company only. """
+    return f'admin:{company_id}'
+
+
+def publish(channel, event):
+    """ Thread-safe: sync views run in a worker thread, streams live on the event loop. """
+    with _lock:
+        targets = list(_subscribers.get(channel, ()))
+    for loop, queue in targets:
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+
+def subscribe(channels):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    with _lock:
+        for channel in channels:
+            _subscribers.setdefault(channel, set()).add((loop, queue))
+    return queue
+
+
+def unsubscribe(channels, queue):
+    with _lock:
+        for channel in channels:
+            subs = _subscribers.get(channel)
+            if not subs:
+                continue
+            subs.difference_update({s for s in subs if s[1] is queue})
+            if not subs:
+                del _subscribers[channel]
+
+
+# --- Event payloads (kept small on purpose) ---
+
+def ticket_event(ticket):
+    return {'type': 'ticket', 'id': ticket.id, 'subject': ticket.subject,
+            'created_at': ticket.created_at.isoformat()}
+
+
+def call_event(call):
+    return {'type': 'call', 'id': call.id, 'client_id': call.client_id,
+            'created_at': call.created_at.isoformat()}
+
+
+def lead_event(lead):
+    return {'type': 'lead', 'id': lead.id, 'name': lead.name, 'status': lead.status,
+            'created_at': (lead.assigned_date or lead.created_at).isoformat()}
+
+
+def employee_channels(employee_id):
+    if not employee_id:
+        return []
+    user_id = Employee.objects.filter(pk=employee_id).values_list('user_id', flat=True).first()
+    return [user_channel(user_id)] if user_id else []
+
+
+def coordinator_channels(coordinator_id):
+    """ Support items go to the coordinator and to the superusers working in the coordinator's company. """
+    if not coordinator_id:
+        return []
+    row = Employee.objects.filter(pk=coordinator_id).values_list('user_id', 'company_id').first()
+    if row is None:
+        return []
+    user_id, company_id = row
+    return [admin_channel(company_id)] + ([user_channel(user_id)] if user_id else [])
+
+
+# --- DB fallback ---
+
+async def _poll(employee_id, admin_company, since):
+    events = []
+    tickets = SupportTicket.objects.filter(created_at__gt=since)
+    calls = CallRequest.objects.filter(created_at__gt=since)
+    if admin_company is not None:
+        tickets = tickets.filter(client__batch__company_id=admin_company)
+        calls = calls.filter(client__batch__company_id=admin_company)
+    else:
+        tickets = tickets.filter(coordinator_id=employee_id)
+        calls = calls.filter(coordinator_id=employee_id)
+    if admin_company is not None or employee_id:
+        events += [ticket_event(t) async for t in tickets.order_by('created_at')[:50]]
+        events += [call_event(c) async for c in calls.order_by('created_at')[:50]]
+    if employee_id:
+        leads = Lead.objects.filter(assigned_to_id=employee_id, assigned_date__gt=since).order_by('assigned_date')
+        events += [lead_event(l) async for l in leads[:50]]
+    return events
+
+
+def _format(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def _stream(channels, employee_id, admin_company):
+    queue = subscribe(channels)
+    seen = set()
+    cursor = timezone.now()
+    started = cursor
+    try:
+        yield 'retry: 5000\n\n'
+        while (timezone.now() - started).total_seconds() < MAX_STREAM_AGE:
+            try:
+                batch = [await asyncio.wait_for(queue.get(), timeout=POLL_INTERVAL)]
+            except asyncio.TimeoutError:
+                now = timezone.now()
+                # Look back one interval to catch rows committed late; `seen` drops the repeats
+                since = max(started, cursor - datetime.timedelta(seconds=POLL_INTERVAL))
+                batch = await _poll(employee_id, admin_company, since)
+                cursor = now
+                if not batch:
+                    yield ': ping\n\n'
+                    continue
+            for event in batch:
+                key = (event['type'], event['id'])
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield _format(event)
+    finally:
+        unsubscribe(channels, queue)
+
+
+async def event_stream(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not streaming(request):
+        return HttpResponse(status=204)
+    employee_id = await Employee.objects.filter(user=user).values_list('id', flat=True).afirst()
+    channels = [user_channel(user.id)]
+    admin_company = None
+    if user.is_superuser:
+        # The company picked with the switcher; the session lookup is sync
+        admin_company = await sync_to_async(tenancy.active)()
+        if admin_company is not None:
+            channels.append(admin_channel(admin_company))
+    response = StreamingHttpResponse(_stream(channels, employee_id, admin_company),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,195 @@
+"""
+Streaming data exports (CSV, XLSX, Parquet).
+
+Every export reads its queryset with values_list().iterator(chunk_size=...),
+so only one chunk of rows is in memory at a time:
+
+  * csv      streamed straight to the client (StreamingHttpResponse)
+  * xlsx     openpyxl write-only workbook, spooled to a temp file
+  * parquet  pyarrow ParquetWriter, one row group per chunk, temp file
+
+openpyxl and pyarrow are imported on first use (see pdf.py for why).
+
+Filters (all optional): ?from=YYYY-MM-DD&to=YYYY-MM-DD&status=<value>.
+"""
+import csv
+import datetime
+import tempfile
+
+from django.db import models, router
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Lead, Attendance, Expense, SalesRecord
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# name -> model, [(header, field path)], date field, status field
+EXPORTS = {
+    'leads': (Lead, [
+        ('ID', 'id'), ('Name', 'name'), ('Phone', 'phone'), ('Email', 'email'), ('Source', 'source'),
+        ('Status', 'status'), ('Assigned To', 'assigned_to__full_name'), ('Assigned', 'assigned_date'),
+        ('Created', 'created_at'),
+    ], 'created_at', 'status'),
+    'attendance': (Attendance, [
+        ('Employee', 'employee__full_name'), ('Date', 'date'), ('In', 'in_time'), ('Out', 'out_time'),
+        ('Status', 'status'), ('Penalty', 'penalty_amount'),
+    ], 'date', 'status'),
+    'expenses': (Expense, [
+        ('Voucher', 'voucher_no'), ('Date', 'date'), ('Description', 'description'), ('Amount', 'amount'),
+        ('Paid To', 'paid_to'), ('Company', 'company__name'),
+    ], 'date', None),
+    'sales': (SalesRecord, [
+        ('Employee', 'employee__full_name'), ('Date', 'date'), ('Count', 'count'),
+    ], 'date', None),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"'{name}' must be YYYY-MM-DD")
+
+
+def _field(model, path):
+    *relations, name = path.split('__')
+    for rel in relations:
+        model = model._meta.get_field(rel).related_model
+    return model._meta.get_field(name)
+
+
+def build_queryset(name, params):
+    """ Filtered values_list queryset for an export, plus its (header, field) columns. """
+    if name not in EXPORTS:
+        raise ExportError(f"Unknown export '{name}'")
+    model, columns, date_field, status_field = EXPORTS[name]
+    qs = model.scoped.order_by(date_field, 'pk')  # the active company's rows (see tenancy.py)
+
+    is_datetime = isinstance(model._meta.get_field(date_field), models.DateTimeField)
+    for param, lookup, shift in (('from', 'gte', 0), ('to', 'lt' if is_datetime else 'lte', 1)):
+        if params.get(param):
+            day = _parse_date(params[param], param)
+            if is_datetime:
+                # Whole-day bounds on the raw column so the created_at index is used
+                day = timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=shift), datetime.time.min))
+            qs = qs.filter(**{f'{date_field}__{lookup}': day})
+    if params.get('status'):
+        if not status_field:
+            raise ExportError(f"'{name}' has no status filter")
+        qs = qs.filter(**{status_field: params['status']})
+    return qs.values_list(*[path for _, path in columns]), columns
+
+
+def _rows(qs):
+    return qs.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _chunks(qs):
+    chunk = []
+    for row in _rows(qs):
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- Writers ---
+
+class _Echo:
+    """ csv.writer target that hands each line back instead of buffering it. """
+    def write(self, value):
+        return value
+
+
+def csv_response(qs, columns, filename):
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield '\ufeff' + writer.writerow([header for header, _ in columns])  # BOM so Excel picks UTF-8
+        for row in _rows(qs):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type=FORMATS['csv'])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def _naive(value):
+    # Excel has no time zones; write aware datetimes as local wall time
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+def xlsx_response(qs, columns, filename):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(filename[:31])
+    ws.append([header for header, _ in columns])
+    for row in _rows(qs):
+        ws.append([_naive(v) for v in row])
+    out = tempfile.TemporaryFile()
+    wb.save(out)
+    out.seek(0)
+    return FileResponse(out, as_attachment=True, filename=f'{filename}.xlsx', content_type=FORMATS['xlsx'])
+
+
+def arrow_type(field):
+    """ The pyarrow type a model field's values are written as (exports and archive share it). """
+    import pyarrow as pa
+
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.TimeField):
+        return pa.time64('us')
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, (models.IntegerField, models.AutoField, models.ForeignKey)):
+        return pa.int64()
+    return pa.string()
+
+
+def parquet_response(qs, columns, filename):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    model = qs.model
+    # Parquet gets the field paths as column names, easier to query than the display headers
+    schema = pa.schema([(path, arrow_type(_field(model, path))) for _, path in columns])
+    out = tempfile.TemporaryFile()
+    with pq.ParquetWriter(out, schema, compression='zstd') as writer:
+        for chunk in _chunks(qs):
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(col, type=schema.field(i).type) for i, col in enumerate(zip(*chunk))], schema=schema))
+    out.seek(0)
+    return FileResponse(out, as_attachment=True, filename=f'{filename}.parquet', content_type=FORMATS['parquet'])
+
+
+WRITERS = {'csv': csv_response, 'xlsx': xlsx_response, 'parquet': parquet_response}
+
+
+def export_response(name, fmt, params):
+    if fmt not in WRITERS:
+        raise ExportError(f"Unknown format '{fmt}'")
+    qs, columns = build_queryset(name, params)
+    # Pin the alias now: the CSV body is read after the view (and its replica routing) has returned
+    qs = qs.using(router.db_for_read(qs.model))
+    stamp = timezone.localdate().isoformat()
+    return WRITERS[fmt](qs, columns, f'{name}_{stamp}')
@@ -0,0 +1,168 @@
+"""
+Per-request performance instrumentation.
+
+Enabled with PERF_INSTRUMENTATION=1. For every request it records query
+count, total and slowest SQL time, template render time and PDF render
+time. It then:
+  * adds a Server-Timing header (visible in the browser's network tab),
+  * logs requests slower than PERF_SLOW_REQUEST_MS to 'documents.perf',
+  * keeps the last PERF_SUMMARY_SIZE samples per URL name in memory for
+    the superuser page at /perf/.
+
+When disabled the middleware removes itself at startup (MiddlewareNotUsed)
+and the template/PDF timers reduce to one ContextVar lookup.
+"""
+import contextvars
+import logging
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger('documents.perf')
+
+_current = contextvars.ContextVar('perf_metrics', default=None)
+_samples = defaultdict(lambda: deque(maxlen=settings.PERF_SUMMARY_SIZE))
+_samples_lock = threading.Lock()
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_ms', 'slowest_ms', 'slowest_sql', 'template_ms', 'pdf_ms')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = ''
+        self.template_ms = 0.0
+        self.pdf_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """ connection.execute_wrapper hook """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.db_ms += elapsed
+            if elapsed > self.slowest_ms:
+                self.slowest_ms = elapsed
+                self.slowest_sql = sql
+
+
+@contextmanager
+def timed(kind):
+    """ Add the block's wall time to the current request's template_ms / pdf_ms. """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        attr = f'{kind}_ms'
+        setattr(metrics, attr, getattr(metrics, attr) + (time.perf_counter() - started) * 1000)
+
+
+# --- Template backend that reports render time ---
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """ Drop-in for DjangoTemplates; only top-level renders are timed, so includes are not double counted. """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# --- Middleware ---
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        if not settings.PERF_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries"',
+            f'db-slowest;dur={metrics.slowest_ms:.1f}',
+            f'tpl;dur={metrics.template_ms:.1f}',
+            f'pdf;dur={metrics.pdf_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        name = (match.view_name if match else None) or 'unresolved'
+        record(name, total_ms, metrics)
+        if total_ms >= settings.PERF_SLOW_REQUEST_MS:
+            logger.warning('slow request %s %s (%s) %.0fms: %d queries %.0fms db, slowest %.0fms [%s], tpl %.0fms, pdf %.0fms',
+                           request.method, request.path, name, total_ms, metrics.queries, metrics.db_ms,
+                           metrics.slowest_ms, metrics.slowest_sql[:200], metrics.template_ms, metrics.pdf_ms)
+        return response
+
+
+# --- Rolling summary ---
+
+# summary() row key -> column heading on /perf/
+SUMMARY_COLUMNS = {
+    'name': 'VIEW', 'count': 'REQUESTS', 'p50_ms': 'P50 (MS)', 'p95_ms': 'P95 (MS)', 'max_ms': 'MAX (MS)',
+    'avg_queries': 'QUERIES', 'avg_db_ms': 'DB (MS)', 'avg_tpl_ms': 'TEMPLATE (MS)', 'avg_pdf_ms': 'PDF (MS)',
+}
+
+
+def record(name, total_ms, metrics):
+    with _samples_lock:
+        _samples[name].append((total_ms, metrics.queries, metrics.db_ms, metrics.template_ms, metrics.pdf_ms))
+
+
+def summary():
+    """ One row per URL name, slowest p95 first. """
+    with _samples_lock:
+        snapshot = {name: list(rows) for name, rows in _samples.items()}
+    rows = []
+    for name, samples in snapshot.items():
+        totals = sorted(s[0] for s in samples)
+        rows.append({
+            'name': name,
+            'count': len(samples),
+            'p50_ms': round(statistics.median(totals), 1),
+            'p95_ms': round(totals[min(len(totals) - 1, int(len(totals) * 0.95))], 1),
+            'max_ms': round(totals[-1], 1),
+            'avg_queries': round(statistics.fmean(s[1] for s in samples), 1),
+            'avg_db_ms': round(statistics.fmean(s[2] for s in samples), 1),
+            'avg_tpl_ms': round(statistics.fmean(s[3] for s in samples), 1),
+            'avg_pdf_ms': round(statistics.fmean(s[4] for s in samples), 1),
+        })
+    return sorted(rows, key=lambda r: r['p95_ms'], reverse=True)
@@ -0,0 +1,85 @@
+"""
+Scheduled jobs, run from cron through "manage.py run_jobs".
+
+    10 0 * * *   python manage.py run_jobs nightly     # yesterday: close check-ins, then mark absences
+    30 0 1 * *   python manage.py run_jobs rollover    # the month that just ended
+
+Every job takes the day it is about and is idempotent, so a missed night
+can be replayed with --date, and running one twice changes nothing.
+
+mark_absent() writes the rows reports used to infer with anti-joins: an
+'Absent' row for every working employee with no attendance that day, and
+a 'Leave' row for those on approved leave. One SELECT finds them (EXISTS
+subqueries on the attendance and leave indexes), one bulk_create writes
+them. bulk_create sends no signals; the employee 'history' fragment
+picks the rows up when its TTL runs out.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from . import analytics, watermarks
+from .models import Attendance, Employee, LeaveRequest
+
+
+def yesterday():
+    return datetime.date.today() - datetime.timedelta(days=1)
+
+
+def is_working_day(day):
+    return day.weekday() not in settings.WEEKLY_OFF_DAYS
+
+
+def close_open_checkins(day):
+    """
+    Check-ins on or before `day` that were never checked out get the default
+    check-out time. Ones made after it are left for an admin to fix by hand.
+    """
+    closing = datetime.time.fromisoformat(settings.AUTO_CHECKOUT_TIME)
+    closed = Attendance.objects.filter(date__lte=day, in_time__isnull=False, in_time__lte=closing,
+                                       out_time__isnull=True).update(out_time=closing)
+    if closed:
+        watermarks.touch(Attendance)
+    return closed
+
+
+def mark_absent(day):
+    """ Attendance rows for everyone who has none on `day`: 'Leave' if on approved leave, else 'Absent'. """
+    if not is_working_day(day):
+        return 0
+    missing = Employee.objects.filter(joining_date__lte=day).exclude(
+        Exists(Attendance.objects.filter(employee=OuterRef('pk'), date=day))
+    ).annotate(on_leave=Exists(LeaveRequest.objects.filter(
+        employee=OuterRef('pk'), status='Approved', start_date__lte=day, end_date__gte=day)))
+    with transaction.atomic():
+        rows = Attendance.objects.bulk_create([
+            Attendance(employee_id=pk, company_id=company_id, date=day, status='Leave' if on_leave else 'Absent')
+            for pk, company_id, on_leave in missing.values_list('pk', 'company_id', 'on_leave').iterator()
+        ], batch_size=5000)
+        if rows:
+            watermarks.touch(Attendance)
+    return len(rows)
+
+
+def nightly(day=None):
+    day = day or yesterday()
+    return {'closed_checkins': close_open_checkins(day), 'marked_absent': mark_absent(day)}
+
+
+def rollover(day=None):
+    """
+    Close the month containing `day` (by default the one that just ended):
+    fill any nights the absence job missed and recompute its sales roll-ups,
+    so the month's payslips and sheets read finished numbers.
+    """
+    day = day or yesterday()
+    first = analytics.month_start(day)
+    last = min((first + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1), yesterday())
+    marked = sum(mark_absent(first + datetime.timedelta(days=n)) for n in range((last - first).days + 1))
+    daily, monthly = analytics.rebuild(first)
+    return {'month': first.strftime('%Y-%m'), 'marked_absent': marked, 'sales_daily': daily, 'sales_monthly': monthly}
+
+
+JOBS = {'nightly': nightly, 'rollover': rollover, 'close_checkins': close_open_checkins, 'mark_absent': mark_absent}
@@ -0,0 +1,144 @@
+"""
+Leave engine.
+
+Balances live on Employee (casual_leave_bal / sick_leave_bal) and every
+change to them is also written to LeaveLedger, so for each employee and
+leave type
+
+    balance == sum(LeaveLedger.days)
+
+always holds (drift() lists anyone where it doesn't). Approvals lock the
+pending requests and the employee rows, then move the balance with an
+F() update in the same transaction as the ledger row, so two admins
+approving at once can neither double-deduct nor lose an update.
+
+apply() rejects requests that overlap a pending or approved one, using
+the (employee, end_date) index: only requests ending on/after the new
+start date are read.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from . import watermarks
+from .models import Employee, LeaveRequest, LeaveLedger
+
+BALANCE_FIELDS = {'Casual': 'casual_leave_bal', 'Sick': 'sick_leave_bal'}
+ACTIVE_STATUSES = ('Pending', 'Approved')
+
+
+class LeaveError(ValueError):
+    pass
+
+
+def _as_date(value, name):
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(value or '')
+    except ValueError:
+        raise LeaveError(f"{name} must be a date (YYYY-MM-DD)")
+
+
+def leave_days(req):
+    return (req.end_date - req.start_date).days + 1
+
+
+def overlapping(employee_id, start, end, exclude_id=None):
+    qs = LeaveRequest.objects.filter(employee_id=employee_id, end_date__gte=start, start_date__lte=end,
+                                     status__in=ACTIVE_STATUSES)
+    if exclude_id:
+        qs = qs.exclude(pk=exclude_id)
+    return qs
+
+
+def apply(employee_id, leave_type, start_date, end_date, reason=''):
+    if leave_type not in BALANCE_FIELDS:
+        raise LeaveError(f"Unknown leave type '{leave_type}'")
+    start, end = _as_date(start_date, 'start_date'), _as_date(end_date, 'end_date')
+    if end < start:
+        raise LeaveError("end_date is before start_date")
+    with transaction.atomic():
+        # Serialise applications per employee so two overlapping requests can't both pass the check
+        company_id = Employee.objects.select_for_update().filter(pk=employee_id).values_list('company_id', flat=True).get()
+        clash = overlapping(employee_id, start, end).order_by('start_date').first()
+        if clash:
+            raise LeaveError(f"Overlaps {clash.leave_type.lower()} leave {clash.start_date} to {clash.end_date} ({clash.status.lower()})")
+        return LeaveRequest.objects.create(employee_id=employee_id, company_id=company_id, leave_type=leave_type, start_date=start,
+                                           end_date=end, reason=reason or "Personal", status='Pending')
+
+
+def _post(employee_id, leave_type, days, entry, user=None, leave_request=None, note=''):
+    """ Move a balance by `days` (F() update) and record it. Call inside a transaction. """
+    field = BALANCE_FIELDS[leave_type]
+    Employee.objects.filter(pk=employee_id).update(**{field: F(field) + days})
+    watermarks.touch(Employee)
+    return LeaveLedger(employee_id=employee_id, leave_type=leave_type, entry=entry, days=days,
+                       leave_request=leave_request, created_by=user, note=note)
+
+
+def approve(ids, user=None):
+    """
+    Approve pending requests (one id or many). Deducts each from the balance
+    in one transaction. Returns the approved requests; ids that are no longer
+    pending are skipped. Raises LeaveError, approving none of them, if any
+    request is longer than the balance left for it.
+    """
+    ids = [ids] if isinstance(ids, (int, str)) else list(ids)
+    with transaction.atomic():
+        requests = list(LeaveRequest.objects.select_for_update().filter(pk__in=ids, status='Pending')
+                        .order_by('employee_id', 'start_date', 'pk'))
+        if not requests:
+            return []
+        balances = {e['pk']: e for e in Employee.objects.select_for_update()
+                    .filter(pk__in={r.employee_id for r in requests})
+                    .values('pk', *BALANCE_FIELDS.values())}
+        entries = []
+        for req in requests:
+            field = BALANCE_FIELDS.get(req.leave_type)
+            if not field:
+                continue
+            available, taken = balances[req.employee_id][field], leave_days(req)
+            if taken > available:
+                raise LeaveError(f"{req.leave_type} leave {req.start_date} to {req.end_date} needs {taken} days; "
+                                 f"only {max(available, 0)} left")
+            balances[req.employee_id][field] -= taken
+            entries.append(_post(req.employee_id, req.leave_type, -taken, 'Approval', user, req,
+                                 note=f"{req.start_date} to {req.end_date}"))
+        LeaveLedger.objects.bulk_create(entries)
+        LeaveRequest.objects.filter(pk__in=[r.pk for r in requests]).update(status='Approved')
+        watermarks.touch(LeaveRequest)
+        for req in requests:
+            req.status = 'Approved'
+    return requests
+
+
+def adjust(employee_id, leave_type, days, user=None, note=''):
+    """ Manual correction (e.g. yearly top-up). Positive adds days. """
+    if leave_type not in BALANCE_FIELDS:
+        raise LeaveError(f"Unknown leave type '{leave_type}'")
+    with transaction.atomic():
+        return LeaveLedger.objects.bulk_create([_post(employee_id, leave_type, days, 'Adjustment', user, note=note)])[0]
+
+
+def open_balances(employees):
+    """ Opening ledger rows matching the employees' current balances. """
+    LeaveLedger.objects.bulk_create([
+        LeaveLedger(employee_id=emp.pk, leave_type=leave_type, entry='Opening', days=getattr(emp, field))
+        for emp in employees for leave_type, field in BALANCE_FIELDS.items()
+    ], batch_size=5000)
+
+
+def drift():
+    """ [(employee_id, leave_type, balance, ledger_sum)] wherever the two disagree. """
+    sums = defaultdict(int)
+    for row in LeaveLedger.objects.values('employee_id', 'leave_type').annotate(total=Sum('days')).order_by():
+        sums[row['employee_id'], row['leave_type']] = row['total']
+    mismatches = []
+    for emp in Employee.objects.values('pk', *BALANCE_FIELDS.values()).iterator():
+        for leave_type, field in BALANCE_FIELDS.items():
+            if emp[field] != sums[emp['pk'], leave_type]:
+                mismatches.append((emp['pk'], leave_type, emp[field], sums[emp['pk'], leave_type]))
+    return mismatches
@@ -0,0 +1,166 @@
+"""
+Expense roll-ups, period reports and voucher numbering.
+
+ExpenseMonthly holds one row per (company, month, paid_to) with the sum
+and number of expenses. Signals call record_changed() whenever an Expense
+is saved or deleted and it recomputes just the affected rows (the old
+ones too when an edit moves the expense), the same way analytics keeps
+the sales roll-ups. bulk_create skips signals, so after bulk loads run
+"manage.py rebuild_expense_rollups" (seed_benchmark does this itself).
+
+Dashboard totals, period reports and trend charts then read the roll-up,
+which grows by companies x payees a month, never the Expense table.
+
+Voucher numbers come from VoucherSequence, one counter per company and
+year: V<company>-<year>-<n>, e.g. V1-2026-00042. The counter is bumped
+with an UPDATE ... SET last = last + 1, which holds its row lock until
+the expense is committed (Expense.save runs in a transaction), so
+concurrent inserts queue for the next number instead of racing for it,
+and a failed insert gives its number back.
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .analytics import month_start
+from .models import Expense, ExpenseMonthly, VoucherSequence
+
+VOUCHER_FORMAT = 'V{company}-{year}-{number:05d}'
+MAX_MONTHS = 60
+ZERO = Decimal('0.00')
+
+
+class LedgerError(ValueError):
+    pass
+
+
+# --- Voucher numbers ---
+
+def next_voucher_no(company_id, day):
+    """ Take the next number in the company's sequence for `day`'s year. Call inside the insert's transaction. """
+    year = day.year
+    with transaction.atomic():
+        VoucherSequence.objects.bulk_create([VoucherSequence(company_id=company_id, year=year)], ignore_conflicts=True)
+        counter = VoucherSequence.objects.filter(company_id=company_id, year=year)
+        counter.update(last=F('last') + 1)
+        number = counter.values_list('last', flat=True).get()
+    return VOUCHER_FORMAT.format(company=company_id, year=year, number=number)
+
+
+def assign_voucher(expense):
+    if not expense.voucher_no and expense.company_id and expense.date:
+        expense.voucher_no = next_voucher_no(expense.company_id, _as_date(expense.date))
+
+
+# --- Maintenance ---
+
+def _as_date(value):
+    # Expense.date may still be the raw form string until reloaded
+    return datetime.date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _month_range(first):
+    return first, (first + datetime.timedelta(days=32)).replace(day=1)
+
+
+def refresh(company_id, day, paid_to):
+    """ Recompute one (company, month, payee) roll-up row from Expense. """
+    day = _as_date(day)
+    if company_id is None or day is None:
+        return
+    first, next_month = _month_range(month_start(day))
+    paid_to = paid_to or ''
+    with transaction.atomic():
+        row = Expense.objects.filter(company_id=company_id, paid_to=paid_to, date__gte=first, date__lt=next_month) \
+            .aggregate(total=Sum('amount'), count=Count('pk'))
+        key = {'company_id': company_id, 'month': first, 'paid_to': paid_to}
+        if row['count']:
+            ExpenseMonthly.objects.bulk_create([ExpenseMonthly(**key, **row)], update_conflicts=True,
+                                               unique_fields=list(key), update_fields=['total', 'count'])
+        else:
+            ExpenseMonthly.objects.filter(**key).delete()
+
+
+def record_changed(expense):
+    current = (expense.company_id, _as_date(expense.date), expense.paid_to or '')
+    loaded = getattr(expense, '_loaded_key', None)
+    if loaded and (loaded[0], _as_date(loaded[1]), loaded[2] or '') != current:
+        refresh(*loaded)
+    refresh(*current)
+
+
+def rebuild(since=None):
+    """ Recreate ExpenseMonthly from Expense (everything, or from `since`'s month on). Returns the row count. """
+    expenses, rollups = Expense.objects.all(), ExpenseMonthly.objects.all()
+    if since:
+        since = month_start(since)
+        expenses, rollups = expenses.filter(date__gte=since), rollups.filter(month__gte=since)
+    with transaction.atomic():
+        rollups.delete()
+        rows = ExpenseMonthly.objects.bulk_create([
+            ExpenseMonthly(company_id=row['company_id'], month=row['month'], paid_to=row['paid_to'],
+                           total=row['total'], count=row['count'])
+            for row in expenses.annotate(month=TruncMonth('date')).values('company_id', 'month', 'paid_to')
+                               .annotate(total=Sum('amount'), count=Count('pk')).order_by().iterator()
+        ], batch_size=5000)
+    return len(rows)
+
+
+# --- Reads ---
+
+def totals(today, company_id=None):
+    """ All-time and this-month spend, for the dashboard. """
+    rows = ExpenseMonthly.objects.all()
+    if company_id:
+        rows = rows.filter(company_id=company_id)
+    first = month_start(today)
+    return {
+        'total_expense': rows.aggregate(t=Sum('total'))['t'] or ZERO,
+        'monthly_expense': rows.filter(month=first).aggregate(t=Sum('total'))['t'] or ZERO,
+    }
+
+
+def parse_period(params, today):
+    """ (first month, last month) from ?from=YYYY-MM&to=YYYY-MM; defaults to the last 12 months. """
+    try:
+        end = datetime.date.fromisoformat(params['to'] + '-01') if params.get('to') else month_start(today)
+        if params.get('from'):
+            start = datetime.date.fromisoformat(params['from'] + '-01')
+        else:
+            start = (end - datetime.timedelta(days=334)).replace(day=1)
+    except ValueError:
+        raise LedgerError("Use ?from=YYYY-MM&to=YYYY-MM")
+    if start > end:
+        raise LedgerError("'from' is after 'to'")
+    if (end.year - start.year) * 12 + end.month - start.month >= MAX_MONTHS:
+        raise LedgerError(f"At most {MAX_MONTHS} months at a time")
+    return start, end
+
+
+def report(start, end, company_id=None):
+    """ Spend per month (every month in range, zeros included) and per payee between two months, inclusive. """
+    rows = ExpenseMonthly.objects.filter(month__gte=start, month__lte=end)
+    if company_id:
+        rows = rows.filter(company_id=company_id)
+    by_month, by_payee = {}, {}
+    for month, paid_to, total, count in rows.values_list('month', 'paid_to', 'total', 'count').iterator():
+        by_month.setdefault(month, [ZERO, 0])
+        by_payee.setdefault(paid_to, [ZERO, 0])
+        for bucket in (by_month[month], by_payee[paid_to]):
+            bucket[0] += total
+            bucket[1] += count
+    months, month = [], start
+    while month <= end:
+        total, count = by_month.get(month, (ZERO, 0))
+        months.append({'month': month.strftime('%Y-%m'), 'total': total, 'count': count})
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+    payees = sorted(({'paid_to': name, 'total': t, 'count': c} for name, (t, c) in by_payee.items()),
+                    key=lambda p: p['total'], reverse=True)
+    return {
+        'from': start.strftime('%Y-%m'), 'to': end.strftime('%Y-%m'),
+        'total': sum((m['total'] for m in months), ZERO), 'count': sum(m['count'] for m in months),
+        'by_month': months, 'by_payee': payees,
+    }
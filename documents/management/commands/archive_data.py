@@ -0,0 +1,33 @@
+"""
+Move dead rows from the hot tables to Parquet (see documents/archive.py).
+
+    python manage.py archive_data                         # leads and attendance, settings cut-offs
+    python manage.py archive_data --only leads --older-than 90
+    python manage.py archive_data --dry-run
+
+Safe to run from cron (e.g. weekly); each run only moves what is due.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from documents import archive
+
+
+class Command(BaseCommand):
+    help = 'Archive closed leads and old attendance to date-partitioned Parquet files and delete them from the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=sorted(archive.ARCHIVES))
+        parser.add_argument('--older-than', type=int, help='Days; overrides the ARCHIVE_*_AFTER_DAYS setting')
+        parser.add_argument('--chunk-size', type=int, default=archive.CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **opts):
+        for name in [opts['only']] if opts['only'] else archive.ARCHIVES:
+            before = archive.cutoff(name, opts['older_than'])
+            started = time.perf_counter()
+            moved, files = archive.archive(name, before, opts['chunk_size'], opts['dry_run'])
+            verb = 'would move' if opts['dry_run'] else 'moved'
+            self.stdout.write(f'{name:<11} {verb} {moved} rows older than {before} into {files} files '
+                              f'in {time.perf_counter() - started:.2f}s')
@@ -0,0 +1,185 @@
+"""
+Repeatable load benchmark for the main views.
+
+    python manage.py bench --requests 50 --json bench.json
+    python manage.py bench --base-url http://127.0.0.1:8000 --concurrency 4
+
+The default driver is Django's in-process test client, which also counts
+SQL queries per request. With --base-url the same scenarios go over HTTP
+to a running server (e.g. local gunicorn), logged in as the seed_benchmark
+users. Queries per request are then not available.
+"""
+import http.cookiejar
+import json
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from documents.models import Batch, Employee
+
+from .seed_benchmark import USER_PREFIX, PASSWORD
+
+
+def percentile(samples, pct):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+def scenarios(include_pdf):
+    batch = Batch.objects.filter(name__startswith='Bench ').order_by('id').first()
+    employee = Employee.objects.filter(user__username=f'{USER_PREFIX}emp0').first()
+    rows = [
+        ('admin_dashboard', f'{USER_PREFIX}admin', reverse('home')),
+        ('admin_search', f'{USER_PREFIX}admin', reverse('home') + '?q=Bench+Lead+1'),
+        ('employee_dashboard', f'{USER_PREFIX}emp0', reverse('home')),
+        ('client_portal', f'{USER_PREFIX}client0', reverse('client_portal')),
+    ]
+    if batch:
+        rows.append(('batch_details', f'{USER_PREFIX}admin', reverse('batch_details', args=[batch.id])))
+    if include_pdf and employee:
+        rows += [
+            ('payslip_pdf', f'{USER_PREFIX}admin', reverse('print_smart_payslip', args=[employee.id])),
+            ('salary_sheet_pdf', f'{USER_PREFIX}admin', reverse('print_salary_sheet')),
+        ]
+    return rows
+
+
+class InProcessDriver:
+    def __init__(self):
+        self.clients = {}
+
+    def get(self, username, url):
+        client = self.clients.get(username)
+        if client is None:
+            client = self.clients[username] = Client()
+            client.force_login(User.objects.get(username=username))
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, len(ctx)
+
+
+class HttpDriver:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.openers = {}
+        self.lock = threading.Lock()
+
+    def opener(self, username):
+        with self.lock:
+            if username not in self.openers:
+                jar = http.cookiejar.CookieJar()
+                opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+                page = opener.open(self.base_url + reverse('login')).read().decode()
+                token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page).group(1)
+                body = urllib.parse.urlencode({'username': username, 'password': PASSWORD, 'csrfmiddlewaretoken': token})
+                request = urllib.request.Request(self.base_url + reverse('login'), data=body.encode(),
+                                                 headers={'Referer': self.base_url + reverse('login')})
+                opener.open(request).read()
+                self.openers[username] = opener
+            return self.openers[username]
+
+    def get(self, username, url):
+        opener = self.opener(username)
+        started = time.perf_counter()
+        try:
+            with opener.open(self.base_url + url) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:  # 4xx/5xx: counted in the errors column, not fatal
+            e.read()
+            status = e.code
+            e.close()
+        return status, time.perf_counter() - started, None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the main views and report latency percentiles, queries per request and throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=30, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--concurrency', type=int, default=1, help='Parallel requests (HTTP driver only)')
+        parser.add_argument('--base-url', help='Benchmark a running server instead of the in-process client')
+        parser.add_argument('--only', action='append', help='Run only the named scenario(s)')
+        parser.add_argument('--include-pdf', action='store_true', help='Also benchmark PDF reports (needs WeasyPrint)')
+        parser.add_argument('--json', dest='json_path', help='Write results as JSON to this path ("-" for stdout)')
+
+    def handle(self, *args, **opts):
+        if opts['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        if not User.objects.filter(username=f'{USER_PREFIX}admin').exists():
+            raise CommandError('No benchmark data. Run "manage.py seed_benchmark" first.')
+        if opts['base_url']:
+            driver = HttpDriver(opts['base_url'])
+        else:
+            if opts['concurrency'] > 1:
+                raise CommandError('--concurrency needs --base-url; the in-process client runs serially.')
+            driver = InProcessDriver()
+
+        results = []
+        for name, username, url in scenarios(opts['include_pdf']):
+            if opts['only'] and name not in opts['only']:
+                continue
+            results.append(self.run_scenario(driver, name, username, url, opts))
+
+        report = {
+            'driver': 'http' if opts['base_url'] else 'in-process',
+            'base_url': opts['base_url'],
+            'requests': opts['requests'],
+            'concurrency': opts['concurrency'],
+            'database': connection.vendor,
+            'scenarios': results,
+        }
+        self.print_table(results)
+        if opts['json_path'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+        elif opts['json_path']:
+            with open(opts['json_path'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f'Wrote {opts["json_path"]}')
+
+    def run_scenario(self, driver, name, username, url, opts):
+        for _ in range(opts['warmup']):
+            driver.get(username, url)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=opts['concurrency']) as pool:
+            samples = list(pool.map(lambda _: driver.get(username, url), range(opts['requests'])))
+        wall = time.perf_counter() - started
+
+        latencies = sorted(s[1] * 1000 for s in samples)
+        queries = [s[2] for s in samples if s[2] is not None]
+        errors = sum(1 for s in samples if s[0] >= 400)
+        return {
+            'name': name,
+            'url': url,
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'queries_per_request': round(statistics.fmean(queries), 1) if queries else None,
+            'throughput_rps': round(len(samples) / wall, 1),
+        }
+
+    def print_table(self, results):
+        self.stdout.write(f"{'scenario':<20}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'req/s':>9}{'errors':>8}")
+        for r in results:
+            queries = '-' if r['queries_per_request'] is None else r['queries_per_request']
+            self.stdout.write(f"{r['name']:<20}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}"
+                              f"{queries:>9}{r['throughput_rps']:>9}{r['errors']:>8}")
@@ -0,0 +1,122 @@
+"""
+Connection-setup benchmark for PostgreSQL.
+
+    DATABASE_URL=postgres://... python manage.py bench_db_connect --requests 500
+
+Replays a short request (one SELECT, like mark_own_attendance's lookup)
+under each connection strategy, running Django's close_old_connections
+at request start and end exactly as the request signals do:
+
+    fresh        CONN_MAX_AGE=0, no pool: connect + auth on every request
+    persistent   CONN_MAX_AGE=600 + CONN_HEALTH_CHECKS
+    pool         psycopg 3 pool with settings.DB_POOL_OPTIONS
+
+--threads runs the requests from several threads, like gthread workers.
+"""
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+
+def strategies():
+    return {
+        'fresh': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'pool': None},
+        'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'pool': None},
+        'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'pool': settings.DB_POOL_OPTIONS},
+    }
+
+
+class Runner:
+    """ One DatabaseWrapper per thread, all sharing the alias (and so the pool). """
+
+    def __init__(self, alias, settings_dict):
+        self.alias = alias
+        self.settings_dict = settings_dict
+        self.local = threading.local()
+        self.wrappers = []
+        self.lock = threading.Lock()
+
+    def wrapper(self):
+        if not hasattr(self.local, 'wrapper'):
+            backend = load_backend(self.settings_dict['ENGINE'])
+            self.local.wrapper = backend.DatabaseWrapper(dict(self.settings_dict), self.alias)
+            with self.lock:
+                self.wrappers.append(self.local.wrapper)
+        return self.local.wrapper
+
+    def request(self, _):
+        conn = self.wrapper()
+        started = time.perf_counter()
+        conn.close_if_unusable_or_obsolete()  # request_started
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        conn.close_if_unusable_or_obsolete()  # request_finished
+        return (time.perf_counter() - started) * 1000
+
+    def close(self):
+        for conn in self.wrappers:
+            conn.close()
+        if self.wrappers and self.wrappers[0].pool:
+            self.wrappers[0].close_pool()
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request connection overhead: fresh connections vs persistent vs psycopg 3 pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument('--json', dest='json_path', help='Write results as JSON to this path ("-" for stdout)')
+
+    def handle(self, *args, **opts):
+        base = connections[opts['database']].settings_dict
+        if base['ENGINE'] != 'django.db.backends.postgresql':
+            raise CommandError('bench_db_connect needs PostgreSQL, set DATABASE_URL=postgres://...')
+
+        results = []
+        for name, strategy in strategies().items():
+            options = {k: v for k, v in base['OPTIONS'].items() if k != 'pool'}
+            if strategy['pool']:
+                options['pool'] = strategy['pool']
+            settings_dict = {**base, 'CONN_MAX_AGE': strategy['CONN_MAX_AGE'],
+                             'CONN_HEALTH_CHECKS': strategy['CONN_HEALTH_CHECKS'], 'OPTIONS': options}
+            runner = Runner(f'bench_{name}', settings_dict)
+            try:
+                with ThreadPoolExecutor(opts['threads']) as pool:
+                    list(pool.map(runner.request, range(opts['threads'])))  # warm-up: open pool / first connection
+                    started = time.perf_counter()
+                    samples = sorted(pool.map(runner.request, range(opts['requests'])))
+                    wall = time.perf_counter() - started
+            finally:
+                runner.close()
+            pct = statistics.quantiles(samples, n=100, method='inclusive')
+            results.append({
+                'strategy': name,
+                'threads': opts['threads'],
+                'p50_ms': round(pct[49], 3),
+                'p95_ms': round(pct[94], 3),
+                'mean_ms': round(statistics.fmean(samples), 3),
+                'requests_per_sec': round(len(samples) / wall, 1),
+            })
+
+        fresh = results[0]['mean_ms']
+        self.stdout.write(f"{'strategy':<12}{'p50 ms':>9}{'p95 ms':>9}{'mean ms':>9}{'req/s':>9}{'saved/req':>11}")
+        for r in results:
+            r['saved_ms_per_request'] = round(fresh - r['mean_ms'], 3)
+            self.stdout.write(f"{r['strategy']:<12}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['mean_ms']:>9}"
+                              f"{r['requests_per_sec']:>9}{r['saved_ms_per_request']:>11}")
+        if opts['json_path'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+        elif opts['json_path']:
+            with open(opts['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f'Wrote {opts["json_path"]}')
@@ -0,0 +1,140 @@
+"""
+Per-template PDF render benchmark: inline CSS vs the pre-parsed print sheets.
+
+    python manage.py bench_pdf --renders 20
+    python manage.py bench_pdf --only id_card --only salary_sheet --json pdf.json
+
+Each PDF view is requested once through the in-process test client to get
+its HTML (rendering is intercepted, so no PDF is written). That HTML is then
+rendered repeatedly two ways:
+
+    before  the print CSS inlined as a <style> block and a new
+            FontConfiguration per document, as the templates used to ship
+    after   pdf.write_pdf: shared weasyprint.CSS objects and font config
+
+Uses the first superuser, employee, expense and approved leave in the
+database, e.g. after "manage.py seed_benchmark". Needs WeasyPrint.
+"""
+import json
+import statistics
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import Client
+from django.urls import reverse
+
+from documents import pdf
+from documents.models import Employee, Expense, LeaveRequest
+
+
+def scenarios():
+    employee = Employee.objects.order_by('pk').first()
+    expense = Expense.objects.order_by('pk').first()
+    approved = LeaveRequest.objects.filter(status='Approved').order_by('pk').first()
+    rows = [reverse('print_salary_sheet'), reverse('print_attendance')]
+    if employee:
+        rows += [reverse(name, args=[employee.id]) for name in
+                 ('print_smart_payslip', 'print_appointment', 'print_id_card', 'print_experience', 'print_emp_attendance')]
+    if expense:
+        rows.append(reverse('print_voucher', args=[expense.id]))
+    if approved:
+        rows.append(reverse('print_leave_approval', args=[approved.id]))
+    return rows
+
+
+def inline(html, stylesheet):
+    """ The HTML with its print CSS back in a <style> block. """
+    css = ''.join((pdf.PRINT_CSS_DIR / f'{name}.css').read_text(encoding='utf-8')
+                  for name in (pdf.BASE_STYLESHEET, stylesheet))
+    return html.replace('</head>', f'<style>\n{css}</style>\n</head>', 1)
+
+
+def render_inline(html, base_url):
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    return HTML(string=html, base_url=base_url).write_pdf(font_config=FontConfiguration())
+
+
+def timed(fn, renders):
+    samples = []
+    for _ in range(renders):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+class Command(BaseCommand):
+    help = 'Benchmark each PDF template with inline CSS vs the shared, pre-parsed print stylesheets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=10, help='Measured renders per template and mode')
+        parser.add_argument('--only', action='append', help='Run only the named template(s)')
+        parser.add_argument('--json', dest='json_path', help='Write results as JSON to this path ("-" for stdout)')
+
+    def handle(self, *args, **opts):
+        try:
+            import weasyprint  # noqa: F401
+        except (ImportError, OSError) as e:
+            raise CommandError(f'WeasyPrint is not usable here: {e}')
+        admin = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if admin is None:
+            raise CommandError('No superuser. Run "manage.py seed_benchmark" first.')
+
+        results = []
+        for name, html in self.documents(admin):
+            if opts['only'] and name not in opts['only']:
+                continue
+            results.append(self.run_template(name, html, opts['renders']))
+
+        self.print_table(results)
+        if opts['json_path'] == '-':
+            self.stdout.write(json.dumps({'renders': opts['renders'], 'templates': results}, indent=2))
+        elif opts['json_path']:
+            with open(opts['json_path'], 'w') as fh:
+                json.dump({'renders': opts['renders'], 'templates': results}, fh, indent=2)
+            self.stdout.write(f'Wrote {opts["json_path"]}')
+
+    def documents(self, admin):
+        """ (template, html) for every PDF view, captured instead of rendered. """
+        captured = []
+
+        def capture(html, request, filename, stylesheet=None):
+            captured.append((stylesheet, html))
+            return HttpResponse(b'')
+
+        client = Client()
+        client.force_login(admin)
+        with mock.patch('documents.views.render_pdf', capture):
+            for url in scenarios():
+                client.get(url)
+        return captured
+
+    def run_template(self, name, html, renders):
+        base_url = 'http://testserver/'
+        legacy = inline(html, name)
+        cold_started = time.perf_counter()
+        pdf.write_pdf(html, base_url, name)  # first render also parses the sheets
+        cold = (time.perf_counter() - cold_started) * 1000
+        render_inline(legacy, base_url)  # warm WeasyPrint itself for the baseline too
+
+        before = timed(lambda: render_inline(legacy, base_url), renders)
+        after = timed(lambda: pdf.write_pdf(html, base_url, name), renders)
+        before_ms, after_ms = statistics.median(before), statistics.median(after)
+        return {
+            'template': name,
+            'before_ms': round(before_ms, 1),
+            'after_ms': round(after_ms, 1),
+            'first_render_ms': round(cold, 1),
+            'saved_pct': round((before_ms - after_ms) / before_ms * 100, 1) if before_ms else None,
+        }
+
+    def print_table(self, results):
+        self.stdout.write(f"{'template':<24}{'before':>10}{'after':>10}{'saved':>8}{'first':>10}")
+        for r in results:
+            saved = '-' if r['saved_pct'] is None else f"{r['saved_pct']}%"
+            self.stdout.write(f"{r['template']:<24}{r['before_ms']:>10}{r['after_ms']:>10}{saved:>8}{r['first_render_ms']:>10}")
@@ -0,0 +1,133 @@
+"""
+SQLite write-concurrency benchmark.
+
+    python manage.py bench_sqlite_writes --workers 4 --writes 500
+
+Starts N processes (standing in for gunicorn workers), each doing
+check-in style transactions against a scratch SQLite file: read the
+employee's rows for today, then insert one. This is the pattern that
+produces "database is locked" during the morning burst. Each mode runs
+on a fresh file:
+
+    default   Django's stock SQLite settings (rollback journal, DEFERRED)
+    tuned     settings.SQLITE_OPTIONS (WAL, busy_timeout, IMMEDIATE, ...)
+
+The configured database is never touched.
+"""
+import datetime
+import json
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = 'CREATE TABLE bench_checkin (id INTEGER PRIMARY KEY AUTOINCREMENT, employee INTEGER, day TEXT, at TEXT)'
+
+
+def modes():
+    return {
+        'default': {},
+        'tuned': settings.SQLITE_OPTIONS,
+    }
+
+
+def _setup_worker():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sme_project.settings')
+    django.setup()
+
+
+def _setup_worker_ready(_):
+    return os.getpid()
+
+
+def _run_worker(path, options, worker, writes, employees):
+    from django.db import OperationalError, connections, transaction
+
+    conn = connections['default']
+    conn.close()
+    conn.settings_dict.update(ENGINE='django.db.backends.sqlite3', NAME=path, OPTIONS=dict(options))
+    day = str(datetime.date.today())
+    latencies, errors = [], 0
+    for i in range(writes):
+        employee = (worker * writes + i) % employees
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(), conn.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM bench_checkin WHERE employee = %s AND day = %s', [employee, day])
+                cursor.fetchone()
+                cursor.execute('INSERT INTO bench_checkin (employee, day, at) VALUES (%s, %s, %s)',
+                               [employee, day, datetime.datetime.now().isoformat()])
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    conn.close()
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent SQLite write throughput with default vs tuned connection settings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent processes, like gunicorn --workers')
+        parser.add_argument('--writes', type=int, default=300, help='Transactions per worker')
+        parser.add_argument('--employees', type=int, default=500)
+        parser.add_argument('--mode', action='append', choices=['default', 'tuned'], help='Run only these modes')
+        parser.add_argument('--json', dest='json_path', help='Write results as JSON to this path ("-" for stdout)')
+
+    def handle(self, *args, **opts):
+        results = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, options in modes().items():
+                if opts['mode'] and name not in opts['mode']:
+                    continue
+                results.append(self.run_mode(os.path.join(tmp, f'{name}.sqlite3'), name, options, opts))
+
+        self.stdout.write(f"{'mode':<10}{'ok':>8}{'locked':>8}{'writes/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+        for r in results:
+            latency = ''.join(f"{'-' if r[k] is None else r[k]:>9}" for k in ('p50_ms', 'p95_ms', 'max_ms'))
+            self.stdout.write(f"{r['mode']:<10}{r['ok']:>8}{r['locked']:>8}{r['writes_per_sec']:>10}{latency}")
+        if opts['json_path'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+        elif opts['json_path']:
+            with open(opts['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f'Wrote {opts["json_path"]}')
+
+    def run_mode(self, path, name, options, opts):
+        with sqlite3.connect(path) as db:
+            db.execute(SCHEMA)
+            db.execute('CREATE INDEX bench_checkin_emp_day ON bench_checkin (employee, day)')
+        db.close()
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(opts['workers'], mp_context=context, initializer=_setup_worker) as pool:
+            # Warm the pool so process start-up isn't timed
+            list(pool.map(_setup_worker_ready, range(opts['workers'])))
+            started = time.perf_counter()
+            futures = [pool.submit(_run_worker, path, options, w, opts['writes'], opts['employees'])
+                       for w in range(opts['workers'])]
+            outcomes = [f.result() for f in futures]
+            wall = time.perf_counter() - started
+
+        latencies = sorted(ms for lat, _ in outcomes for ms in lat)
+        locked = sum(errors for _, errors in outcomes)
+        pct = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+        return {
+            'mode': name,
+            'workers': opts['workers'],
+            'ok': len(latencies),
+            'locked': locked,
+            'wall_s': round(wall, 2),
+            'writes_per_sec': round(len(latencies) / wall, 1),
+            'p50_ms': round(pct[49], 2) if pct else None,
+            'p95_ms': round(pct[94], 2) if pct else None,
+            'max_ms': round(latencies[-1], 2) if latencies else None,
+        }
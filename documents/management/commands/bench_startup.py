@@ -0,0 +1,88 @@
+"""
+Worker start-up benchmark.
+
+    python manage.py bench_startup --runs 10
+    python manage.py bench_startup --eager     # also time the old eager imports
+
+Each run starts a fresh interpreter that does what a gunicorn worker does
+before its first request: django.setup(), load the WSGI application and
+import every view through the URLconf. It reports boot time, resident
+memory (VmRSS, VmHWM) and which heavy libraries ended up loaded. --eager
+adds a second row that imports WeasyPrint, gspread and oauth2client up
+front, the way views.py used to, so the saving shows up side by side.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+HEAVY_MODULES = ['weasyprint', 'gspread', 'oauth2client', 'numpy', 'pandas', 'pyarrow', 'openpyxl']
+
+BOOT_SCRIPT = r'''
+import json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sme_project.settings')
+if {eager}:
+    for name in ('weasyprint', 'gspread', 'oauth2client.service_account'):
+        try:
+            __import__(name)
+        except Exception:
+            pass
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+status = dict(line.split(':', 1) for line in open('/proc/self/status') if ':' in line)
+kb = lambda key: int(status.get(key, '0 kB').split()[0])
+print(json.dumps({{
+    'boot_ms': elapsed * 1000,
+    'rss_mb': kb('VmRSS') / 1024,
+    'peak_rss_mb': kb('VmHWM') / 1024,
+    'loaded': [m for m in {heavy!r} if m in sys.modules],
+}}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure worker boot time and resident memory (optionally against eager heavy imports).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--eager', action='store_true', help='Also measure with WeasyPrint/gspread imported at boot')
+        parser.add_argument('--json', dest='json_path', help='Write results as JSON to this path ("-" for stdout)')
+
+    def handle(self, *args, **opts):
+        modes = [('lazy', False)] + ([('eager', True)] if opts['eager'] else [])
+        results = [self.measure(name, eager, opts['runs']) for name, eager in modes]
+
+        self.stdout.write(f"{'mode':<8}{'boot ms':>10}{'rss MB':>9}{'peak MB':>9}  loaded")
+        for r in results:
+            self.stdout.write(f"{r['mode']:<8}{r['boot_ms']:>10}{r['rss_mb']:>9}{r['peak_rss_mb']:>9}  {', '.join(r['loaded']) or '-'}")
+        if opts['json_path'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+        elif opts['json_path']:
+            with open(opts['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f'Wrote {opts["json_path"]}')
+
+    def measure(self, mode, eager, runs):
+        script = BOOT_SCRIPT.format(eager=eager, heavy=HEAVY_MODULES)
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'sme_project.settings')}
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+        return {
+            'mode': mode,
+            'runs': runs,
+            'boot_ms': round(statistics.median(s['boot_ms'] for s in samples), 1),
+            'rss_mb': round(statistics.median(s['rss_mb'] for s in samples), 1),
+            'peak_rss_mb': round(statistics.median(s['peak_rss_mb'] for s in samples), 1),
+            'loaded': samples[-1]['loaded'],
+        }
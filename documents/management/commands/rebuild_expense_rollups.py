@@ -0,0 +1,26 @@
+"""
+Rebuild the ExpenseMonthly roll-up from Expense.
+
+    python manage.py rebuild_expense_rollups                 # everything
+    python manage.py rebuild_expense_rollups --since 2026-01-01
+
+Needed after bulk imports, which bypass the signals that keep it in step.
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+
+from documents import ledger
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly expense roll-up used by the dashboard and expense reports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=datetime.date.fromisoformat, help='Only rebuild from this month on')
+
+    def handle(self, *args, **opts):
+        started = time.perf_counter()
+        rows = ledger.rebuild(opts['since'])
+        self.stdout.write(f'{rows} monthly rows in {time.perf_counter() - started:.2f}s')
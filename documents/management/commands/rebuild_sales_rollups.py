@@ -0,0 +1,26 @@
+"""
+Rebuild the SalesDaily / SalesMonthly roll-ups from SalesRecord.
+
+    python manage.py rebuild_sales_rollups                 # everything
+    python manage.py rebuild_sales_rollups --since 2026-01-01
+
+Needed after bulk imports, which bypass the signals that keep them in step.
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+
+from documents import analytics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the sales roll-up tables used by the leaderboard and projected commission.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=datetime.date.fromisoformat, help='Only rebuild from this month on')
+
+    def handle(self, *args, **opts):
+        started = time.perf_counter()
+        days, months = analytics.rebuild(opts['since'])
+        self.stdout.write(f'{days} daily and {months} monthly rows in {time.perf_counter() - started:.2f}s')
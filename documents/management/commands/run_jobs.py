@@ -0,0 +1,31 @@
+"""
+Run a scheduled job (see documents/jobs.py for the cron lines).
+
+    python manage.py run_jobs nightly                    # yesterday
+    python manage.py run_jobs nightly --date 2026-03-04  # replay a missed night
+    python manage.py run_jobs rollover --date 2026-02-01 # re-close February
+"""
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documents import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run an idempotent scheduled job: nightly, rollover, close_checkins or mark_absent.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('job', choices=sorted(jobs.JOBS))
+        parser.add_argument('--date', type=datetime.date.fromisoformat, help='Day the job is about (default: yesterday)')
+
+    def handle(self, *args, **opts):
+        day = opts['date'] or jobs.yesterday()
+        if day >= datetime.date.today():
+            raise CommandError('Jobs only run for days that are over')
+        started = time.perf_counter()
+        result = jobs.JOBS[opts['job']](day)
+        self.stdout.write(json.dumps({'job': opts['job'], 'date': str(day), 'result': result,
+                                      'seconds': round(time.perf_counter() - started, 2)}))
@@ -0,0 +1,223 @@
+"""
+Seed production-sized synthetic data for benchmarking.
+
+    python manage.py seed_benchmark --employees 500 --days 730 --leads 200000 --batches 100
+
+Everything is inserted with bulk_create in chunks, so memory stays flat.
+Benchmark rows are tagged (company "Benchmark Co", usernames "bench_*",
+lead source "Benchmark") and --clear removes exactly those rows. All
+bench users log in with the password "bench"; bench_admin is a superuser.
+"""
+import datetime
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from documents import analytics, leave, ledger, watermarks
+from documents.models import (
+    Company, Employee, Attendance, LeaveRequest, Expense, SalesRecord,
+    Lead, Batch, EnrolledClient, SupportTicket, CallRequest
+)
+
+COMPANY_NAME = 'Benchmark Co'
+USER_PREFIX = 'bench_'
+LEAD_SOURCE = 'Benchmark'
+PASSWORD = 'bench'
+DESIGNATIONS = ['Sales Executive', 'Counselor', 'Coordinator', 'Team Lead', 'Accountant']
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic benchmark data (employees, attendance, leads, batches, clients, tickets).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=500)
+        parser.add_argument('--days', type=int, default=730, help='Days of attendance history per employee')
+        parser.add_argument('--leads', type=int, default=200000)
+        parser.add_argument('--batches', type=int, default=100)
+        parser.add_argument('--clients-per-batch', type=int, default=20)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Delete previous benchmark rows first')
+
+    def handle(self, *args, **opts):
+        self.rng = random.Random(opts['seed'])
+        self.chunk_size = opts['chunk_size']
+        self.today = datetime.date.today()
+
+        if opts['clear']:
+            self.step('clear', self.clear)
+
+        self.password = make_password(PASSWORD)  # hashed once, shared by every bench user
+        company = self.step('company', self.seed_company)
+        employees = self.step('employees', self.seed_employees, company, opts['employees'])
+        self.step('attendance', self.seed_attendance, employees, opts['days'])
+        self.step('sales', self.seed_sales, employees, opts['days'])
+        self.step('leaves', self.seed_leaves, employees, opts['days'])
+        self.step('expenses', self.seed_expenses, company, opts['days'])
+        self.step('leads', self.seed_leads, employees, opts['leads'])
+        clients = self.step('batches+clients', self.seed_clients, employees, opts['batches'], opts['clients_per_batch'])
+        self.step('tickets+calls', self.seed_support, clients)
+        self.step('sales rollups', self.rebuild_rollups)
+        self.step('expense rollups', self.rebuild_expense_rollups)
+        watermarks.bump(watermarks.label(m) for m in watermarks.ALL)  # bulk_create sent no signals
+
+    def step(self, name, fn, *args):
+        self.rows = 0
+        started = time.perf_counter()
+        with transaction.atomic():
+            result = fn(*args)
+        if isinstance(result, list):
+            self.rows += len(result)
+        self.stdout.write(f'{name:<16} {self.rows:>9} rows {time.perf_counter() - started:8.2f}s')
+        return result
+
+    def bulk(self, model, rows):
+        for chunk in chunked(rows, self.chunk_size):
+            model.objects.bulk_create(chunk)
+            self.rows += len(chunk)
+
+    # --- steps ---
+
+    def clear(self):
+        Lead.objects.filter(source=LEAD_SOURCE).delete()
+        Batch.objects.filter(name__startswith='Bench ').delete()
+        Company.objects.filter(name=COMPANY_NAME).delete()
+        User.objects.filter(username__startswith=USER_PREFIX).delete()
+
+    def seed_company(self):
+        company, _ = Company.objects.get_or_create(name=COMPANY_NAME, defaults={'address': 'Benchmark Tower, Dhaka'})
+        User.objects.filter(username=f'{USER_PREFIX}admin').delete()
+        User.objects.create(username=f'{USER_PREFIX}admin', password=self.password, is_superuser=True, is_staff=True)
+        return company
+
+    def seed_employees(self, company, count):
+        start = Employee.objects.filter(company=company).count()
+        users = User.objects.bulk_create(
+            [User(username=f'{USER_PREFIX}emp{start + i}', password=self.password) for i in range(count)],
+            batch_size=self.chunk_size)
+        rng = self.rng
+        employees = Employee.objects.bulk_create([
+            Employee(user=u, company=company, full_name=f'Bench Employee {start + i}',
+                     designation=rng.choice(DESIGNATIONS), is_probation=rng.random() < 0.2,
+                     joining_date=self.today - datetime.timedelta(days=rng.randint(30, 1500)))
+            for i, u in enumerate(users)
+        ], batch_size=self.chunk_size)
+        leave.open_balances(employees)  # bulk_create skips the signal that writes these
+        return employees
+
+    def seed_attendance(self, employees, days):
+        rng = self.rng
+
+        def rows():
+            for emp in employees:
+                for d in range(days):
+                    day = self.today - datetime.timedelta(days=d)
+                    if day.weekday() == 4 or rng.random() < 0.05:  # Friday off, ~5% absences
+                        continue
+                    late = rng.random() < 0.1
+                    in_time = datetime.time(15 if late else 9, rng.randint(0, 59))
+                    out_time = None if d == 0 else datetime.time(min(in_time.hour + 7, 23), rng.randint(0, 59))
+                    yield Attendance(employee=emp, company_id=emp.company_id, date=day, in_time=in_time, out_time=out_time,
+                                     status='Late' if late else 'Present', penalty_amount=emp.hourly_rate if late else 0)
+        self.bulk(Attendance, rows())
+
+    def seed_sales(self, employees, days):
+        rng = self.rng
+        sellers = [e for e in employees if e.designation in ('Sales Executive', 'Team Lead')]
+        rows = (SalesRecord(employee=e, company_id=e.company_id, date=self.today - datetime.timedelta(days=d), count=rng.randint(1, 3))
+                for e in sellers for d in range(days) if rng.random() < 0.15)
+        self.bulk(SalesRecord, rows)
+
+    def seed_leaves(self, employees, days):
+        rng = self.rng
+
+        def rows():
+            for emp in employees:
+                for _ in range(max(1, days // 60)):
+                    start = self.today - datetime.timedelta(days=rng.randint(-30, days))
+                    yield LeaveRequest(employee=emp, company_id=emp.company_id, leave_type=rng.choice(['Sick', 'Casual']), start_date=start,
+                                       end_date=start + datetime.timedelta(days=rng.randint(0, 3)), reason='Benchmark',
+                                       status='Pending' if start > self.today else rng.choice(['Approved', 'Rejected']))
+        self.bulk(LeaveRequest, rows())
+
+    def seed_expenses(self, company, days):
+        rng = self.rng
+        stamp = int(time.time())
+        rows = (Expense(company=company, voucher_no=f'BENCH-{stamp}-{i}', date=self.today - datetime.timedelta(days=i % days),
+                        description=rng.choice(['Rent', 'Internet', 'Snacks', 'Marketing', 'Transport']),
+                        amount=rng.randint(200, 50000), paid_to=rng.choice(['Landlord', 'ISP', 'Vendor', 'Agency']))
+                for i in range(days * 3))
+        self.bulk(Expense, rows)
+
+    def seed_leads(self, employees, count):
+        rng = self.rng
+        statuses = [code for code, _ in Lead.STATUS_CHOICES]
+        now = timezone.now()
+        company_id = employees[0].company_id  # bulk_create skips the save() that fills it in
+
+        def rows():
+            for i in range(count):
+                assignee = rng.choice(employees) if rng.random() < 0.8 else None
+                yield Lead(company_id=company_id, name=f'Bench Lead {i}', phone=f'01{rng.randint(300000000, 999999999)}', source=LEAD_SOURCE,
+                           email=f'lead{i}@example.com', status=rng.choice(statuses) if assignee else 'New',
+                           assigned_to=assignee, assigned_date=now if assignee else None)
+        self.bulk(Lead, rows())
+
+    def seed_clients(self, employees, batches, per_batch):
+        rng = self.rng
+        coordinators = [e for e in employees if e.designation == 'Coordinator'] or employees
+        batch_rows = Batch.objects.bulk_create([
+            Batch(name=f'Bench {i}', company_id=coordinators[0].company_id, student_limit=per_batch,
+                  coordinator=rng.choice(coordinators)) for i in range(batches)
+        ])
+        start = User.objects.filter(username__startswith=f'{USER_PREFIX}client').count()
+        users = User.objects.bulk_create(
+            [User(username=f'{USER_PREFIX}client{start + i}', password=self.password) for i in range(batches * per_batch)],
+            batch_size=self.chunk_size)
+        task_fields = [f.name for f in EnrolledClient._meta.fields if f.name.startswith('task_')]
+        clients = []
+        for i, user in enumerate(users):
+            done = rng.randint(0, len(task_fields))
+            clients.append(EnrolledClient(user=user, batch=batch_rows[i % batches], name=f'Bench Client {start + i}',
+                                          phone=f'018{rng.randint(10000000, 99999999)}', email=f'client{start + i}@example.com',
+                                          **{field: n < done for n, field in enumerate(task_fields)}))
+        return EnrolledClient.objects.bulk_create(clients, batch_size=self.chunk_size)
+
+    def rebuild_rollups(self):
+        # bulk_create skipped the signals that maintain them
+        self.rows += sum(analytics.rebuild())
+
+    def rebuild_expense_rollups(self):
+        self.rows += ledger.rebuild()
+
+    def seed_support(self, clients):
+        rng = self.rng
+        now = timezone.now()
+        tickets = []
+        for client in clients:
+            for _ in range(rng.randint(0, 3)):
+                resolved = rng.random() < 0.7
+                seconds = rng.randint(600, 5 * 86400)
+                tickets.append(SupportTicket(client=client, coordinator_id=client.batch.coordinator_id, subject='Benchmark',
+                                             description='Need help with SOP', status='Resolved' if resolved else 'Pending',
+                                             resolved_at=now if resolved else None, resolution_seconds=seconds if resolved else None))
+        calls = [CallRequest(client=c, coordinator_id=c.batch.coordinator_id, status=rng.choice(['Pending', 'Done']))
+                 for c in clients if rng.random() < 0.3]
+        self.bulk(SupportTicket, tickets)
+        self.bulk(CallRequest, calls)
@@ -0,0 +1,30 @@
+"""
+Import new leads from the Google Sheet, outside the request cycle.
+
+    python manage.py sync_sheets                 # into the oldest company
+    python manage.py sync_sheets --company 3
+
+Same import as the dashboard's "Sync" button (sheets.sync_leads), meant for
+cron so a slow or flaky Sheets API never holds a request open.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documents import sheets
+
+
+class Command(BaseCommand):
+    help = 'Import new leads from the Google Sheet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Company id for the new leads (default: the oldest)')
+        parser.add_argument('--sheet', default=sheets.LEADS_SHEET)
+
+    def handle(self, *args, **opts):
+        started = time.perf_counter()
+        try:
+            count = sheets.sync_leads(opts['company'], opts['sheet'])
+        except (FileNotFoundError, sheets.SheetsError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(f'{count} new leads in {time.perf_counter() - started:.2f}s')
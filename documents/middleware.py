@@ -0,0 +1,71 @@
+"""
+Request-scoped role resolution.
+
+role_middleware attaches request.role, one of 'admin', 'employee', 'client'
+or '' (no profile). 'admin' is read from user.is_superuser on every
+request, so a demoted superuser loses it straight away. The profile role
+is resolved once per session and then read back from the session; when it
+does need resolving, the profile lookups are free because ProfileBackend
+loads them with the user.
+"""
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.functional import SimpleLazyObject
+
+ROLE_SESSION_KEY = '_role'
+
+
+def resolve_role(user):
+    if not user.is_authenticated:
+        return ''
+    if user.is_superuser:
+        return 'admin'
+    return profile_role(user)
+
+
+def profile_role(user):
+    if hasattr(user, 'employee'):
+        return 'employee'
+    if hasattr(user, 'enrolledclient'):
+        return 'client'
+    return ''
+
+
+def remember_role(request, user):
+    """ Call right after login(); login() flushes the session when the user changes. """
+    if user.is_superuser:
+        return 'admin'  # never cached; the profile role is looked up if they are ever demoted
+    role = profile_role(user)
+    if role:
+        request.session[ROLE_SESSION_KEY] = role
+    return role
+
+
+def _get_role(request):
+    user = request.user
+    if not user.is_authenticated:
+        return ''
+    if user.is_superuser:
+        return 'admin'
+    role = request.session.get(ROLE_SESSION_KEY)
+    if role is None or role == 'admin':  # 'admin' left over from sessions that cached it
+        # Not cached when empty, so a profile created later is picked up on the next request
+        role = remember_role(request, user)
+    return role
+
+
+def _attach(request):
+    request.role = SimpleLazyObject(lambda: _get_role(request))
+
+
+@sync_and_async_middleware
+def role_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            _attach(request)
+            return await get_response(request)
+    else:
+        def middleware(request):
+            _attach(request)
+            return get_response(request)
+    return middleware
@@ -0,0 +1,76 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_queue(apps, schema_editor):
+    SupportTicket = apps.get_model('documents', 'SupportTicket')
+    CallRequest = apps.get_model('documents', 'CallRequest')
+    for model in (SupportTicket, CallRequest):
+        for row in model.objects.filter(client__batch__isnull=False).select_related('client__batch').iterator():
+            row.coordinator_id = row.client.batch.coordinator_id
+            row.save(update_fields=['coordinator'])
+    for ticket in SupportTicket.objects.filter(resolved_at__isnull=False).iterator():
+        ticket.resolution_seconds = max(0, int((ticket.resolved_at - ticket.created_at).total_seconds()))
+        ticket.save(update_fields=['resolution_seconds'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0012_rename_task_apply_enrolledclient_task_cv_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='callrequest',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='callrequest',
+            name='coordinator',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='call_requests', to='documents.employee'),
+        ),
+        migrations.AddField(
+            model_name='callrequest',
+            name='response_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='supportticket',
+            name='coordinator',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='support_tickets', to='documents.employee'),
+        ),
+        migrations.AddField(
+            model_name='supportticket',
+            name='resolution_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='callrequest',
+            index=models.Index(fields=['status', 'created_at'], name='call_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='callrequest',
+            index=models.Index(fields=['coordinator', 'status', 'created_at'], name='call_coord_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='callrequest',
+            index=models.Index(fields=['coordinator', 'status', 'completed_at'], name='call_coord_sla_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['status', 'created_at'], name='ticket_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['coordinator', 'status', 'created_at'], name='ticket_coord_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['coordinator', 'status', 'resolved_at'], name='ticket_coord_sla_idx'),
+        ),
+        migrations.RunPython(backfill_queue, migrations.RunPython.noop),
+    ]
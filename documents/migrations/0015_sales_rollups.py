@@ -0,0 +1,68 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:27
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    SalesRecord = apps.get_model('documents', 'SalesRecord')
+    SalesDaily = apps.get_model('documents', 'SalesDaily')
+    SalesMonthly = apps.get_model('documents', 'SalesMonthly')
+    months = defaultdict(int)
+    days = []
+    for row in SalesRecord.objects.values('employee_id', 'date').annotate(total=Sum('count')).order_by().iterator():
+        if row['total']:
+            days.append(SalesDaily(employee_id=row['employee_id'], date=row['date'], total=row['total']))
+            months[row['employee_id'], row['date'].replace(day=1)] += row['total']
+    SalesDaily.objects.bulk_create(days, batch_size=5000)
+
+    def payout(sales):
+        # Frozen copy of analytics.commission() + bonus() as of this migration
+        if sales <= 10:
+            return sales * 400
+        return 10 * 400 + (sales - 10) * 500 + 1000
+    SalesMonthly.objects.bulk_create([
+        SalesMonthly(employee_id=emp, month=month, total=total, commission=payout(total))
+        for (emp, month), total in months.items()
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0014_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='documents.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', '-total'], name='sales_daily_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'date'), name='sales_daily_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('total', models.IntegerField(default=0)),
+                ('commission', models.IntegerField(default=0, help_text='Projected commission + target bonus for total')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='documents.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month', '-total'], name='sales_monthly_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'month'), name='sales_monthly_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
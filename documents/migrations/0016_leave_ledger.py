@@ -0,0 +1,62 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_balances(apps, schema_editor):
+    # Current balances become the opening ledger entries
+    Employee = apps.get_model('documents', 'Employee')
+    LeaveLedger = apps.get_model('documents', 'LeaveLedger')
+    LeaveLedger.objects.bulk_create([
+        LeaveLedger(employee_id=pk, leave_type=leave_type, entry='Opening', days=days)
+        for pk, casual, sick in Employee.objects.values_list('pk', 'casual_leave_bal', 'sick_leave_bal').iterator()
+        for leave_type, days in (('Casual', casual), ('Sick', sick))
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0015_sales_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('Sick', 'Sick'), ('Casual', 'Casual')], max_length=20)),
+                ('entry', models.CharField(choices=[('Opening', 'Opening'), ('Approval', 'Approval'), ('Adjustment', 'Adjustment')], max_length=20)),
+                ('days', models.IntegerField(help_text='Change to the balance, negative when leave is taken')),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['employee', 'end_date'], name='leave_employee_end_idx'),
+        ),
+        migrations.AddField(
+            model_name='leaveledger',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='leaveledger',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to='documents.employee'),
+        ),
+        migrations.AddField(
+            model_name='leaveledger',
+            name='leave_request',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='documents.leaverequest'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveledger',
+            index=models.Index(fields=['employee', 'leave_type', 'created_at'], name='leave_ledger_emp_idx'),
+        ),
+        migrations.RunPython(open_balances, migrations.RunPython.noop),
+    ]
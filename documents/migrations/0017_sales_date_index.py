@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0016_leave_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesrecord',
+            index=models.Index(fields=['date'], name='sales_date_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+TRACKED = ['attendance', 'batch', 'callrequest', 'company', 'employee', 'enrolledclient', 'expense',
+           'lead', 'leaverequest', 'salesrecord', 'supportticket']
+
+
+def create_rows(apps, schema_editor):
+    # Rows up front, so bumps are always a single UPDATE
+    ChangeWatermark = apps.get_model('documents', 'ChangeWatermark')
+    ChangeWatermark.objects.bulk_create([ChangeWatermark(name=f'documents.{name}') for name in TRACKED],
+                                        ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0017_sales_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeWatermark',
+            fields=[
+                ('name', models.CharField(help_text='Model label, e.g. documents.attendance', max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_rows, migrations.RunPython.noop),
+    ]
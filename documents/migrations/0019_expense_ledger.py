@@ -0,0 +1,77 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    Expense = apps.get_model('documents', 'Expense')
+    ExpenseMonthly = apps.get_model('documents', 'ExpenseMonthly')
+    ExpenseMonthly.objects.bulk_create([
+        ExpenseMonthly(company_id=row['company_id'], month=row['month'], paid_to=row['paid_to'],
+                       total=row['total'], count=row['count'])
+        for row in Expense.objects.annotate(month=TruncMonth('date')).values('company_id', 'month', 'paid_to')
+                                  .annotate(total=Sum('amount'), count=Count('pk')).order_by().iterator()
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0018_change_watermarks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('paid_to', models.CharField(blank=True, max_length=100)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VoucherSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('last', models.IntegerField(default=0, help_text='Last number handed out')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='voucher_no',
+            field=models.CharField(blank=True, help_text="Leave blank for the next number in the company's sequence", max_length=50, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['date'], name='expense_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='expensemonthly',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='documents.company'),
+        ),
+        migrations.AddField(
+            model_name='vouchersequence',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='documents.company'),
+        ),
+        migrations.AddIndex(
+            model_name='expensemonthly',
+            index=models.Index(fields=['month'], name='expense_monthly_month_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='expensemonthly',
+            constraint=models.UniqueConstraint(fields=('company', 'month', 'paid_to'), name='expense_monthly_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='vouchersequence',
+            constraint=models.UniqueConstraint(fields=('company', 'year'), name='voucher_sequence_unique'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 6.0.2 on 2026-10-19 04:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+OWNED = [('attendance', 'employee'), ('leaverequest', 'employee'), ('salesrecord', 'employee'),
+         ('lead', 'assigned_to'), ('batch', 'coordinator')]
+
+
+def backfill_company(apps, schema_editor):
+    # One UPDATE per table from the owning employee; rows without one (unassigned leads,
+    # batches with no coordinator) go to the oldest company
+    Company = apps.get_model('documents', 'Company')
+    Employee = apps.get_model('documents', 'Employee')
+    fallback = Company.objects.order_by('pk').values_list('pk', flat=True).first()
+    for model_name, owner in OWNED:
+        model = apps.get_model('documents', model_name)
+        model.objects.filter(**{f'{owner}__isnull': False}).update(
+            company_id=Subquery(Employee.objects.filter(pk=OuterRef(f'{owner}_id')).values('company_id')[:1]))
+        orphans = model.objects.filter(company__isnull=True)
+        if orphans.exists():
+            if fallback is None:
+                fallback = Company.objects.create(name='Default', address='').pk
+            orphans.update(company_id=fallback)
+
+
+def company_field(null):
+    return models.ForeignKey(null=null, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='documents.company')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0019_expense_ledger'),
+    ]
+
+    operations = [
+        *[migrations.AddField(model_name=name, name='company', field=company_field(null=True)) for name, _ in OWNED],
+        migrations.RunPython(backfill_company, migrations.RunPython.noop),
+        *[migrations.AlterField(model_name=name, name='company', field=company_field(null=False)) for name, _ in OWNED],
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['company', 'date', 'status'], name='attn_company_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['company', 'status'], name='leave_company_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrecord',
+            index=models.Index(fields=['company', 'date'], name='sales_company_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['company', 'status'], name='lead_company_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['company', 'assigned_to', 'status'], name='lead_company_assignee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['company', '-created_at'], name='lead_company_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['company', '-date'], name='expense_company_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['company', '-created_at'], name='batch_company_created_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-19 04:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0020_company_scoping'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='company',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='documents.company'),
+        ),
+        migrations.AlterField(
+            model_name='batch',
+            name='company',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='documents.company'),
+        ),
+        migrations.AlterField(
+            model_name='lead',
+            name='company',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='documents.company'),
+        ),
+        migrations.AlterField(
+            model_name='leaverequest',
+            name='company',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='documents.company'),
+        ),
+        migrations.AlterField(
+            model_name='salesrecord',
+            name='company',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='documents.company'),
+        ),
+    ]
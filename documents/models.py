@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .tenancy import CompanyManager, active as active_company
+
 # 1. Company Profile
 class Company(models.Model):
     name = models.CharField(max_length=200)
@@ -25,8 +27,53 @@ class Employee(models.Model):
     photo = models.ImageField(upload_to='employee_photos/', blank=True, null=True)
     def __str__(self): return self.full_name
 
+    objects = models.Manager()
+    scoped = CompanyManager()
+
+# Rows that carry their own company (see documents.tenancy)
+class CompanyOwned(models.Model):
+    """
+    company_id is copied from the `company_from` employee (else the active company)
+    on first save, and again whenever that employee changes. It is not a form field.
+    """
+    company_from = None
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+', editable=False)
+
+    objects = models.Manager()
+    scoped = CompanyManager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the loaded owner, so a move to another company's employee moves the row too
+        row = super().from_db(db, field_names, values)
+        row._loaded_owner_id = row.__dict__.get(cls._meta.get_field(cls.company_from).attname)
+        return row
+
+    def save(self, *args, **kwargs):
+        owner_id = getattr(self, self._meta.get_field(self.company_from).attname)
+        moved = owner_id is not None and owner_id != getattr(self, '_loaded_owner_id', owner_id)
+        if self.company_id is None or moved:
+            self.company_id = self.owner_company()
+            if moved and kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'company'}
+        super().save(*args, **kwargs)
+        self._loaded_owner_id = owner_id
+
+    def owner_company(self):
+        field = self._meta.get_field(self.company_from)
+        owner_id = getattr(self, field.attname)
+        if owner_id is None:
+            return active_company()
+        if field.is_cached(self):
+            return getattr(self, self.company_from).company_id
+        return Employee.objects.filter(pk=owner_id).values_list('company_id', flat=True).first()
+
 # 3. Attendance Log
-class Attendance(models.Model):
+class Attendance(CompanyOwned):
+    company_from = 'employee'
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     date = models.DateField(default=timezone.now)
     in_time = models.TimeField(null=True, blank=True)
@@ -35,8 +82,16 @@ class Attendance(models.Model):
     penalty_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     def __str__(self): return f"{self.employee.full_name} - {self.date}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'date'], name='attn_employee_date_idx'),
+            models.Index(fields=['date', 'status'], name='attn_date_status_idx'),
+            models.Index(fields=['company', 'date', 'status'], name='attn_company_date_idx'),
+        ]
+
 # 4. Leave Requests
-class LeaveRequest(models.Model):
+class LeaveRequest(CompanyOwned):
+    company_from = 'employee'
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     leave_type = models.CharField(max_length=20, choices=[('Sick', 'Sick'), ('Casual', 'Casual')])
     start_date = models.DateField()
@@ -45,25 +100,151 @@ class LeaveRequest(models.Model):
     status = models.CharField(max_length=20, default='Pending', choices=[('Pending', 'Pending'), ('Approved', 'Approved'), ('Rejected', 'Rejected')])
     def __str__(self): return f"{self.employee.full_name} - {self.status}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status'], name='leave_status_idx'),
+            models.Index(fields=['company', 'status'], name='leave_company_status_idx'),
+            models.Index(fields=['employee', '-start_date'], name='leave_employee_start_idx'),
+            # Overlap checks: only requests ending on/after the new start are candidates
+            models.Index(fields=['employee', 'end_date'], name='leave_employee_end_idx'),
+        ]
+
+# 4b. Leave balance ledger (append-only; see documents.leave)
+class LeaveLedger(models.Model):
+    ENTRY_CHOICES = [('Opening', 'Opening'), ('Approval', 'Approval'), ('Adjustment', 'Adjustment')]
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_ledger')
+    leave_type = models.CharField(max_length=20, choices=[('Sick', 'Sick'), ('Casual', 'Casual')])
+    entry = models.CharField(max_length=20, choices=ENTRY_CHOICES)
+    days = models.IntegerField(help_text="Change to the balance, negative when leave is taken")
+    leave_request = models.ForeignKey(LeaveRequest, on_delete=models.SET_NULL, null=True, blank=True)
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    def __str__(self): return f"{self.employee.full_name} {self.leave_type} {self.days:+d}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'leave_type', 'created_at'], name='leave_ledger_emp_idx'),
+        ]
+
 # 5. Expenses
 class Expense(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
-    voucher_no = models.CharField(max_length=50, unique=True)
+    voucher_no = models.CharField(max_length=50, unique=True, blank=True,
+                                  help_text="Leave blank for the next number in the company's sequence")
     date = models.DateField()
     description = models.CharField(max_length=255)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     paid_to = models.CharField(max_length=100, blank=True)
     def __str__(self): return self.voucher_no
 
+    class Meta:
+        indexes = [
+            # Recent expenses on the admin dashboard, date hierarchy, period reports
+            models.Index(fields=['date'], name='expense_date_idx'),
+            models.Index(fields=['company', '-date'], name='expense_company_date_idx'),
+        ]
+
+    objects = models.Manager()
+    scoped = CompanyManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember which roll-up the row was counted in, so an edit can fix the old one too
+        expense = super().from_db(db, field_names, values)
+        expense._loaded_key = tuple(expense.__dict__.get(f) for f in ('company_id', 'date', 'paid_to'))
+        return expense
+
+    def save(self, *args, **kwargs):
+        # The voucher number (taken in pre_save) commits or rolls back with the row, so the sequence has no gaps
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_key = (self.company_id, self.date, self.paid_to)
+
+# 5b. Expense roll-ups and voucher numbering (kept by documents.ledger)
+class ExpenseMonthly(models.Model):
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    month = models.DateField(help_text="First day of the month")
+    paid_to = models.CharField(max_length=100, blank=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'month', 'paid_to'], name='expense_monthly_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['month'], name='expense_monthly_month_idx'),
+        ]
+
+class VoucherSequence(models.Model):
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    year = models.IntegerField()
+    last = models.IntegerField(default=0, help_text="Last number handed out")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'year'], name='voucher_sequence_unique'),
+        ]
+
 # 6. Sales Record
-class SalesRecord(models.Model):
+class SalesRecord(CompanyOwned):
+    company_from = 'employee'
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     date = models.DateField(default=timezone.now)
     count = models.IntegerField(default=1)
     def __str__(self): return f"{self.employee.full_name} - {self.count} Sales"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'date'], name='sales_employee_date_idx'),
+            # Admin date hierarchy / ordering across all employees
+            models.Index(fields=['date'], name='sales_date_idx'),
+            models.Index(fields=['company', 'date'], name='sales_company_date_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember where the row was counted so an edit can fix the old roll-up too
+        record = super().from_db(db, field_names, values)
+        record._loaded_key = (record.__dict__.get('employee_id'), record.__dict__.get('date'))
+        return record
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_key = (self.employee_id, self.date)
+
+# 6b. Sales roll-ups (kept in step with SalesRecord by documents.analytics)
+class SalesDaily(models.Model):
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    date = models.DateField()
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'date'], name='sales_daily_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['date', '-total'], name='sales_daily_rank_idx'),
+        ]
+
+class SalesMonthly(models.Model):
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    month = models.DateField(help_text="First day of the month")
+    total = models.IntegerField(default=0)
+    commission = models.IntegerField(default=0, help_text="Projected commission + target bonus for total")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'month'], name='sales_monthly_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['month', '-total'], name='sales_monthly_rank_idx'),
+        ]
+
 # 7. CRM Lead
-class Lead(models.Model):
+class Lead(CompanyOwned):
+    company_from = 'assigned_to'
     STATUS_CHOICES = [
         ('New', 'New Lead'),
         ('Busy', 'Busy / Call Later'),
@@ -85,14 +266,44 @@ class Lead(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     def __str__(self): return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status'], name='lead_status_idx'),
+            models.Index(fields=['assigned_to', 'status'], name='lead_assignee_status_idx'),
+            models.Index(fields=['assigned_to', '-created_at'], name='lead_assignee_created_idx'),
+            models.Index(fields=['-created_at'], name='lead_created_idx'),
+            models.Index(fields=['phone'], name='lead_phone_idx'),
+            # Scoped dashboard: counts by status, unassigned pool, newest first
+            models.Index(fields=['company', 'status'], name='lead_company_status_idx'),
+            models.Index(fields=['company', 'assigned_to', 'status'], name='lead_company_assignee_idx'),
+            models.Index(fields=['company', '-created_at'], name='lead_company_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the loaded assignee so signal handlers can tell a re-assignment from a plain edit
+        lead = super().from_db(db, field_names, values)
+        lead._loaded_assigned_to_id = lead.__dict__.get('assigned_to_id')
+        return lead
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_assigned_to_id = self.assigned_to_id
+
 # 8. Batch Management
-class Batch(models.Model):
+class Batch(CompanyOwned):
+    company_from = 'coordinator'
     name = models.CharField(max_length=100)
     student_limit = models.IntegerField(default=20)
     coordinator = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, related_name='coordinated_batches')
     created_at = models.DateTimeField(auto_now_add=True)
     def __str__(self): return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', '-created_at'], name='batch_company_created_idx'),
+        ]
+
 # 9. Enrolled Client (Student) - UPDATED WITH ALL TASKS
 class EnrolledClient(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -121,6 +332,20 @@ class EnrolledClient(models.Model):
     joined_date = models.DateField(default=timezone.now)
 
     def __str__(self): return self.name
+
+    objects = models.Manager()
+    scoped = CompanyManager('batch__company')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the loaded batch, so moving the client also refreshes the old coordinator's dashboard
+        client = super().from_db(db, field_names, values)
+        client._loaded_batch_id = client.__dict__.get('batch_id')
+        return client
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_batch_id = self.batch_id
     
     # Helper to calculate progress percentage
     def get_progress(self):
@@ -136,14 +361,57 @@ class EnrolledClient(models.Model):
 # 10. Support Ticket
 class SupportTicket(models.Model):
     client = models.ForeignKey(EnrolledClient, on_delete=models.CASCADE)
+    # Copied from client.batch.coordinator so the coordinator queue is one index range scan
+    coordinator = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='support_tickets')
     subject = models.CharField(max_length=200)
     description = models.TextField()
     status = models.CharField(max_length=20, choices=[('Pending', 'Pending'), ('Resolved', 'Resolved')], default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
+    resolution_seconds = models.PositiveIntegerField(null=True, blank=True)
+
+    objects = models.Manager()
+    scoped = CompanyManager('client__batch__company')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='ticket_status_created_idx'),
+            models.Index(fields=['coordinator', 'status', 'created_at'], name='ticket_coord_queue_idx'),
+            models.Index(fields=['coordinator', 'status', 'resolved_at'], name='ticket_coord_sla_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.coordinator_id is None and self.client.batch_id:
+            self.coordinator_id = self.client.batch.coordinator_id
+        super().save(*args, **kwargs)
 
 # 11. Call Request
 class CallRequest(models.Model):
     client = models.ForeignKey(EnrolledClient, on_delete=models.CASCADE)
+    coordinator = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='call_requests')
     status = models.CharField(max_length=20, choices=[('Pending', 'Pending'), ('Done', 'Done')], default='Pending')
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    response_seconds = models.PositiveIntegerField(null=True, blank=True)
+
+    objects = models.Manager()
+    scoped = CompanyManager('client__batch__company')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='call_status_created_idx'),
+            models.Index(fields=['coordinator', 'status', 'created_at'], name='call_coord_queue_idx'),
+            models.Index(fields=['coordinator', 'status', 'completed_at'], name='call_coord_sla_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.coordinator_id is None and self.client.batch_id:
+            self.coordinator_id = self.client.batch.coordinator_id
+        super().save(*args, **kwargs)
+
+# 12. Change watermarks (one row per model; see documents.watermarks)
+class ChangeWatermark(models.Model):
+    name = models.CharField(max_length=50, primary_key=True, help_text="Model label, e.g. documents.attendance")
+    version = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+    def __str__(self): return f"{self.name} v{self.version}"
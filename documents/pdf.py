@@ -0,0 +1,66 @@
+"""
+PDF rendering adapter.
+
+WeasyPrint pulls in Cairo/Pango through cffi, which is slow and memory
+hungry to load, so it is imported on the first render rather than when
+views.py is imported. Workers and manage.py commands that never print a
+PDF don't pay for it.
+
+The templates carry no CSS of their own. Their styles live in
+static/documents/print/: base.css, shared by every document, plus one
+<template>.css each. Each sheet is parsed into a weasyprint.CSS once per
+process and handed to write_pdf, so a render only lays out the HTML. The
+FontConfiguration (the Pango font map and its caches) is kept per thread,
+as Pango font maps are not thread-safe.
+"""
+import threading
+from pathlib import Path
+
+from django.http import HttpResponse
+
+from . import instrumentation
+
+PRINT_CSS_DIR = Path(__file__).resolve().parent / 'static' / 'documents' / 'print'
+BASE_STYLESHEET = 'base'
+
+_sheets = {}
+_sheets_lock = threading.Lock()
+_local = threading.local()
+
+
+def compiled(name):
+    """ print/<name>.css as a parsed weasyprint.CSS, built on first use. """
+    sheet = _sheets.get(name)
+    if sheet is None:
+        from weasyprint import CSS
+
+        with _sheets_lock:
+            sheet = _sheets.get(name)
+            if sheet is None:
+                sheet = _sheets[name] = CSS(filename=str(PRINT_CSS_DIR / f'{name}.css'))
+    return sheet
+
+
+def font_config():
+    fonts = getattr(_local, 'fonts', None)
+    if fonts is None:
+        from weasyprint.text.fonts import FontConfiguration
+
+        fonts = _local.fonts = FontConfiguration()
+    return fonts
+
+
+def write_pdf(html_string, base_url, stylesheet=None):
+    """ PDF bytes for the HTML, styled by base.css and print/<stylesheet>.css. """
+    from weasyprint import HTML
+
+    sheets = [compiled(BASE_STYLESHEET)] + ([compiled(stylesheet)] if stylesheet else [])
+    return HTML(string=html_string, base_url=base_url).write_pdf(stylesheets=sheets, font_config=font_config())
+
+
+def render_pdf(html_string, request, filename, stylesheet=None):
+    with instrumentation.timed('pdf'):
+        result = write_pdf(html_string, request.build_absolute_uri(), stylesheet)
+    response = HttpResponse(result, content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    return response
@@ -0,0 +1,100 @@
+"""
+Compact JSON summaries for the employee and client portals.
+
+The portal front ends poll these instead of re-rendering the dashboards.
+Each summary is one SQL query: the profile row with everything else folded
+in as correlated subqueries (employee), or the client row LEFT JOINed to
+its tickets (client). Views wrap them in watermarks.conditional, so a poll
+that finds nothing new is a 304.
+"""
+import datetime
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import analytics
+from .models import (
+    Employee, Attendance, LeaveRequest, SalesMonthly, Lead, EnrolledClient, SupportTicket, CallRequest
+)
+
+RECENT_TICKETS = 20
+
+
+def _count(qs, outer_field):
+    """ Correlated COUNT(*) as a subquery, 0 when nothing matches. """
+    counted = qs.order_by().values(outer_field).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def work_state(in_time, out_time, now):
+    """ (status, 'Xh Ym' worked, can_checkout) for today's attendance row. """
+    if not in_time:
+        return 'Pending', '0h 0m', False
+    dummy = datetime.date(2000, 1, 1)
+    end = out_time or now.time()
+    diff = (datetime.datetime.combine(dummy, end) - datetime.datetime.combine(dummy, in_time)).total_seconds()
+    duration = f"{int(diff // 3600)}h {int((diff % 3600) // 60)}m"
+    if out_time:
+        return 'Completed', duration, False
+    return 'Active', duration, diff >= 3600
+
+
+def employee_summary(employee_id, now):
+    today = now.date()
+    attendance = Attendance.objects.filter(employee=OuterRef('pk'), date=today).order_by('pk')
+    monthly = SalesMonthly.objects.filter(employee=OuterRef('pk'), month=analytics.month_start(today))
+    row = Employee.objects.filter(pk=employee_id).annotate(
+        in_time=Subquery(attendance.values('in_time')[:1]),
+        out_time=Subquery(attendance.values('out_time')[:1]),
+        attendance_status=Subquery(attendance.values('status')[:1]),
+        month_sales=Coalesce(Subquery(monthly.values('total')[:1]), Value(0)),
+        month_commission=Coalesce(Subquery(monthly.values('commission')[:1]), Value(0)),
+        new_leads=_count(Lead.objects.filter(assigned_to=OuterRef('pk'), status='New'), 'assigned_to'),
+        pending_leaves=_count(LeaveRequest.objects.filter(employee=OuterRef('pk'), status='Pending'), 'employee'),
+        open_tickets=_count(SupportTicket.objects.filter(coordinator=OuterRef('pk'), status='Pending'), 'coordinator'),
+        pending_calls=_count(CallRequest.objects.filter(coordinator=OuterRef('pk'), status='Pending'), 'coordinator'),
+    ).values('full_name', 'casual_leave_bal', 'sick_leave_bal', 'in_time', 'out_time', 'attendance_status',
+             'month_sales', 'month_commission', 'new_leads', 'pending_leaves', 'open_tickets', 'pending_calls').first()
+    if row is None:
+        return None
+    status, duration, can_checkout = work_state(row['in_time'], row['out_time'], now)
+    return {
+        'name': row['full_name'],
+        'date': today,
+        'attendance': {'status': status, 'marked_as': row['attendance_status'], 'in_time': row['in_time'],
+                       'out_time': row['out_time'], 'duration': duration, 'can_checkout': can_checkout},
+        'sales': {'month_total': row['month_sales'], 'projected_commission': row['month_commission']},
+        'leave': {'casual_balance': row['casual_leave_bal'], 'sick_balance': row['sick_leave_bal'],
+                  'pending': row['pending_leaves']},
+        'new_leads': row['new_leads'],
+        'queue': {'open_tickets': row['open_tickets'], 'pending_calls': row['pending_calls']},
+    }
+
+
+def client_summary(client_id, limit=RECENT_TICKETS):
+    task_fields = [f.name for f in EnrolledClient._meta.fields if f.name.startswith('task_')]
+    # One row per ticket (newest first), or a single row with NULL ticket columns
+    rows = list(EnrolledClient.objects.filter(pk=client_id).annotate(
+        pending_calls=_count(CallRequest.objects.filter(client=OuterRef('pk'), status='Pending'), 'client'),
+    ).values(
+        'name', 'batch__name', 'batch__coordinator__full_name', 'pending_calls', *task_fields,
+        'supportticket__id', 'supportticket__subject', 'supportticket__status', 'supportticket__created_at',
+        'supportticket__resolved_at',
+    ).order_by('-supportticket__created_at', '-supportticket__id')[:limit])
+    if not rows:
+        return None
+    first = rows[0]
+    done = [f for f in task_fields if first[f]]
+    return {
+        'name': first['name'],
+        'batch': first['batch__name'],
+        'coordinator': first['batch__coordinator__full_name'],
+        'progress': int(len(done) / len(task_fields) * 100),
+        'tasks_done': len(done),
+        'tasks_total': len(task_fields),
+        'pending_calls': first['pending_calls'],
+        'tickets': [{
+            'id': r['supportticket__id'], 'subject': r['supportticket__subject'], 'status': r['supportticket__status'],
+            'created_at': r['supportticket__created_at'], 'resolved_at': r['supportticket__resolved_at'],
+        } for r in rows if r['supportticket__id'] is not None],
+    }
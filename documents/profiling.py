@@ -0,0 +1,143 @@
+"""
+On-demand cProfile for single requests.
+
+A superuser adds ?_profile=1 (or the header X-Profile: 1) to any URL and
+that one request runs under cProfile. Two files are written to
+PROFILE_DIR:
+
+    <stamp>-<view>.prof      pstats dump, open with snakeviz / pstats
+    <stamp>-<view>.sql.json  every query with its duration, in order
+
+Only the newest PROFILE_KEEP profiles are kept. /profiles/ lists them and
+/profiles/<name> downloads one. Async views (the SSE stream) are never
+profiled.
+"""
+import cProfile
+import json
+import re
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+QUERY_PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE'
+NAME_RE = re.compile(r'^[\w.-]+\.(prof|sql\.json)$')
+
+
+def profile_dir():
+    path = Path(settings.PROFILE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def wants_profile(request):
+    flag = request.GET.get(QUERY_PARAM) or request.META.get(HEADER)
+    return flag in ('1', 'true') and request.user.is_superuser
+
+
+class QueryLog:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': repr(params)[:500],
+            })
+
+
+def profile_request(request, get_response):
+    profiler = cProfile.Profile()
+    log = QueryLog()
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (e.g. a debugger or sys.monitoring tool) is active
+        return get_response(request)
+    try:
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(log))
+            response = get_response(request)
+    finally:
+        profiler.disable()
+    total_ms = (time.perf_counter() - started) * 1000
+
+    match = getattr(request, 'resolver_match', None)
+    view = re.sub(r'[^\w-]', '_', (match.view_name if match else None) or 'unresolved')
+    stem = f'{timezone.now():%Y%m%d-%H%M%S-%f}-{view}'
+    folder = profile_dir()
+    profiler.dump_stats(folder / f'{stem}.prof')
+    with open(folder / f'{stem}.sql.json', 'w') as fh:
+        json.dump({
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': view,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'query_count': len(log.queries),
+            'db_ms': round(sum(q['ms'] for q in log.queries), 1),
+            'queries': log.queries,
+        }, fh, indent=1)
+    prune(folder)
+    response['X-Profile-Id'] = stem
+    return response
+
+
+def prune(folder=None):
+    folder = folder or profile_dir()
+    stems = sorted(p.name[:-len('.prof')] for p in folder.glob('*.prof'))
+    for stem in stems[:max(0, len(stems) - settings.PROFILE_KEEP)]:
+        for suffix in ('.prof', '.sql.json'):
+            (folder / f'{stem}{suffix}').unlink(missing_ok=True)
+
+
+def list_profiles():
+    """ Newest first, with the summary fields of each SQL sidecar. """
+    folder = profile_dir()
+    rows = []
+    for prof in sorted(folder.glob('*.prof'), reverse=True):
+        stem = prof.name[:-len('.prof')]
+        row = {'id': stem, 'size_kb': round(prof.stat().st_size / 1024, 1)}
+        try:
+            with open(folder / f'{stem}.sql.json') as fh:
+                meta = json.load(fh)
+            row.update({k: meta[k] for k in ('method', 'path', 'status', 'total_ms', 'query_count', 'db_ms')})
+        except (OSError, ValueError, KeyError):
+            pass
+        rows.append(row)
+    return rows
+
+
+def profile_path(name):
+    """ Resolve a download name to a file inside PROFILE_DIR, or None. """
+    if not NAME_RE.match(name):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
+
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return await get_response(request)
+    else:
+        def middleware(request):
+            if wants_profile(request):
+                return profile_request(request, get_response)
+            return get_response(request)
+    return middleware
@@ -0,0 +1,99 @@
+"""
+Optional read replica.
+
+Set DATABASE_REPLICA_URL and settings.py adds a 'replica' database and
+enables ReplicaRouter. Nothing reads from the replica by default: only
+views wrapped in @reads_from_replica (dashboards, batch details, PDF
+reports, exports) send their GET/HEAD queries there. Writes, sessions and
+auth always use 'default'.
+
+Read-your-writes: after any POST/PUT/PATCH/DELETE the response sets a
+short-lived cookie (REPLICA_STICKY_SECONDS) and, while it is present,
+that browser's reads stay on 'default' so the user sees what they just
+saved even if the replica lags. Anything shared between users (the
+dashboard fragment cache) is built inside primary(), so a lagging replica
+can't put stale rows back into the cache right after a write evicted them.
+
+Locally, point DATABASE_REPLICA_URL at the same SQLite file
+(sqlite:///db.sqlite3) or at a second PostgreSQL instance. Tests mirror
+'replica' to 'default'.
+"""
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+REPLICA = 'replica'
+STICKY_COOKIE = 'pin_primary'
+PRIMARY_ONLY_APPS = {'sessions', 'auth', 'contenttypes'}
+SAFE_METHODS = ('GET', 'HEAD')
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+def replica_enabled():
+    return REPLICA in settings.DATABASES
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+@contextmanager
+def primary():
+    """ Read from 'default' inside the block, even in a @reads_from_replica view. """
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def _replica_ok(request):
+    return replica_enabled() and request.method in SAFE_METHODS and STICKY_COOKIE not in request.COOKIES
+
+
+def reads_from_replica(view):
+    """ Route the view's reads to the replica, unless the request must see the primary. """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _replica_ok(request):
+            return view(request, *args, **kwargs)
+        token = _use_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+@sync_and_async_middleware
+def sticky_primary_middleware(get_response):
+    """ Pin the browser to 'default' for a few seconds after it writes. """
+    def pin(request, response):
+        if replica_enabled() and request.method not in SAFE_METHODS:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return pin(request, await get_response(request))
+    else:
+        def middleware(request):
+            return pin(request, get_response(request))
+    return middleware
@@ -0,0 +1,252 @@
+"""
+Google Sheets adapter.
+
+One client per process: the service-account credentials are loaded once
+and refreshed by google-auth's session when the token expires (or rebuilt
+when the key file is replaced). Spreadsheets are opened by key; the key is
+pinned in settings (SHEETS_LEADS_KEY) or looked up by name once and cached,
+so a sync does not pay for a Drive search. Reads go through batch_get, one
+API call for any number of ranges, spaced to the per-minute quota and
+retried with exponential backoff on 429/5xx and connection errors.
+
+SHEETS_BACKEND = 'fake' swaps Google for FakeBackend, an in-memory book
+(optionally loaded from SHEETS_FAKE_FILE) used by the tests and local runs.
+
+The import itself is sync_leads(); the dashboard button calls it inline
+and `manage.py sync_sheets` runs it from cron, outside any request.
+gspread and google-auth are imported only when the Google backend is used.
+"""
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db import transaction
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+from . import archive, cache, tenancy, watermarks
+from .models import Company, Lead
+
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly', 'https://www.googleapis.com/auth/drive.readonly']
+LEADS_SHEET = 'Gainers_Leads'
+LEADS_RANGE = 'A1:Z'  # first worksheet, header row first
+KEY_CACHE_SECONDS = 86400
+RETRY_ATTEMPTS = 5
+RETRY_STATUSES = {401, 429, 500, 502, 503, 504}
+CHUNK = 1000
+
+_sleep = time.sleep  # patched in tests
+
+
+class SheetsError(Exception):
+    pass
+
+
+# --- Backends ---
+
+class GoogleBackend:
+    def __init__(self, credentials_file):
+        self.credentials_file = credentials_file
+        self._client = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        if not os.path.exists(self.credentials_file): raise FileNotFoundError(f"{self.credentials_file} missing.")
+        stamp = os.stat(self.credentials_file).st_mtime_ns
+        with self._lock:
+            if self._client is None or stamp != self._stamp:
+                import gspread
+                from google.oauth2.service_account import Credentials
+
+                creds = Credentials.from_service_account_file(self.credentials_file, scopes=SCOPES)
+                self._client, self._stamp = gspread.authorize(creds), stamp
+            return self._client
+
+    def reset(self):
+        with self._lock:
+            self._client = None
+
+    def _api(self, fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if getattr(e, 'code', None) == 401:
+                self.reset()  # revoked or rotated key: authorize again on the retry
+            raise
+
+    def key_for(self, name):
+        return self._api(lambda: self.client().open(name).id)
+
+    def batch_get(self, key, ranges):
+        data = self._api(lambda: self.client().http_client.values_batch_get(key, list(ranges)))
+        return [r.get('values', []) for r in data.get('valueRanges', [])]
+
+
+class FakeBackend:
+    """ Spreadsheets held in memory: load(name, {range: rows}). Records every call in .calls. """
+
+    def __init__(self, path=''):
+        self.books = {}
+        self.keys = {}
+        self.calls = []
+        if path:
+            with open(path, encoding='utf-8') as fh:
+                for name, ranges in json.load(fh).items():
+                    self.load(name, ranges)
+
+    def load(self, name, ranges, key=None):
+        key = key or f'fake-{len(self.keys) + 1}'
+        self.keys[name] = key
+        self.books[key] = ranges
+        return key
+
+    def key_for(self, name):
+        self.calls.append(('key_for', name))
+        if name not in self.keys: raise SheetsError(f"Spreadsheet {name} not found.")
+        return self.keys[name]
+
+    def batch_get(self, key, ranges):
+        self.calls.append(('batch_get', key, tuple(ranges)))
+        book = self.books.get(key)
+        if book is None: raise SheetsError(f"Spreadsheet {key} not found.")
+        return [book.get(r, []) for r in ranges]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    """ The process-wide backend for SHEETS_BACKEND, built on first use. """
+    global _backend
+    kind = settings.SHEETS_BACKEND
+    with _backend_lock:
+        if _backend is None or _backend[0] != kind:
+            if kind == 'fake':
+                instance = FakeBackend(settings.SHEETS_FAKE_FILE)
+            elif kind == 'google':
+                instance = GoogleBackend(settings.SHEETS_CREDENTIALS_FILE)
+            else:
+                raise SheetsError(f"Unknown SHEETS_BACKEND {kind!r}.")
+            _backend = (kind, instance)
+        return _backend[1]
+
+
+def reset():
+    """ Drop the cached backend (and with it the Google client). """
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+# --- Calls ---
+
+class _Throttle:
+    """ Spaces calls 60/rate seconds apart across threads. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self, per_minute):
+        if not per_minute:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + 60 / per_minute
+        if start > now:
+            _sleep(start - now)
+
+
+_throttle = _Throttle()
+
+
+def _transient(exc):
+    from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+
+    if getattr(exc, 'code', None) in RETRY_STATUSES:
+        return True
+    return isinstance(exc, (ConnectionError, TimeoutError, RequestsConnectionError, Timeout))
+
+
+def _call(fn, *args):
+    """ fn(*args) within the request rate, retried with exponential backoff on transient errors. """
+    retrying = Retrying(stop=stop_after_attempt(RETRY_ATTEMPTS), wait=wait_exponential_jitter(initial=1, max=30),
+                        retry=retry_if_exception(_transient), sleep=_sleep, reraise=True)
+    for attempt in retrying:
+        with attempt:
+            _throttle.wait(settings.SHEETS_REQUESTS_PER_MINUTE)
+            return fn(*args)
+
+
+def spreadsheet_key(name):
+    """ The pinned key for the leads sheet, else the name's key looked up once per day. """
+    if name == LEADS_SHEET and settings.SHEETS_LEADS_KEY:
+        return settings.SHEETS_LEADS_KEY
+    cache_key = f'sheets:key:{name}'
+    key = django_cache.get(cache_key)
+    if key is None:
+        key = _call(backend().key_for, name)
+        django_cache.set(cache_key, key, KEY_CACHE_SECONDS)
+    return key
+
+
+def batch_get(name, ranges):
+    """ Rows of every range, in order, from one API call. """
+    return _call(backend().batch_get, spreadsheet_key(name), list(ranges))
+
+
+def as_records(rows):
+    """ Rows under a header row as dicts keyed by header; blank rows dropped. """
+    if not rows:
+        return []
+    header = [str(h).strip() for h in rows[0]]
+    return [dict(zip(header, list(row) + [''] * (len(header) - len(row))))
+            for row in rows[1:] if any(str(v).strip() for v in row)]
+
+
+def fetch_records(sheet_name=LEADS_SHEET, cell_range=LEADS_RANGE):
+    """ All rows of the range (the first worksheet by default) as dicts keyed by header. """
+    return as_records(batch_get(sheet_name, [cell_range])[0])
+
+
+# --- Lead import ---
+
+def _lead(row):
+    phone = str(row.get('WhatsApp Number/নাম্বার', '') or row.get('Phone', '')).strip()
+    name = row.get('Name/নাম', '') or row.get('Name', '')
+    email = row.get('Email/ইমেল', '') or row.get('Email', '')
+    return phone, Lead(name=name, phone=phone, email=email, source='Google Sheet', status='New')
+
+
+def sync_leads(company_id=None, sheet_name=LEADS_SHEET):
+    """ Import rows whose phone is not a lead yet, live or archived; returns how many were added. """
+    leads = {}
+    for row in fetch_records(sheet_name):
+        phone, lead = _lead(row)
+        if phone and phone not in leads:
+            leads[phone] = lead
+    if not leads:
+        return 0
+    phones = list(leads)
+    for i in range(0, len(phones), CHUNK):
+        for phone in Lead.objects.filter(phone__in=phones[i:i + CHUNK]).values_list('phone', flat=True):
+            leads.pop(phone, None)
+    for phone in archive.archived('leads', 'phone', leads):  # closed leads moved to Parquet
+        leads.pop(phone, None)
+    if not leads:
+        return 0
+
+    # Unassigned leads have no employee to take the company from
+    company_id = company_id or tenancy.active() or Company.objects.order_by('pk').values_list('pk', flat=True).first()
+    for lead in leads.values():
+        lead.company_id = company_id
+    with transaction.atomic():
+        Lead.objects.bulk_create(leads.values(), batch_size=CHUNK)
+        watermarks.touch(Lead)  # bulk_create sends no signals
+    cache.evict('admin', cache.company_owner(company_id), 'crm')
+    return len(leads)
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Batch, SupportTicket, CallRequest, Lead, SalesRecord, Employee, Expense
+from . import analytics, cache, events, leave, ledger, support, watermarks
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def evict_dashboard_cache(sender, instance, **kwargs):
+    cache.invalidate(instance)
+    watermarks.touch(sender)
+
+
+@receiver(post_save, sender=Batch)
+def batch_saved(sender, instance, created, **kwargs):
+    if not created:
+        support.reassign_batch_queue(instance)
+
+
+@receiver(post_save, sender=Employee)
+def employee_created(sender, instance, created, **kwargs):
+    if created:
+        leave.open_balances([instance])
+
+
+@receiver(post_save, sender=SalesRecord)
+@receiver(post_delete, sender=SalesRecord)
+def sales_changed(sender, instance, **kwargs):
+    analytics.record_changed(instance)
+
+
+@receiver(pre_save, sender=Expense)
+def expense_numbered(sender, instance, **kwargs):
+    ledger.assign_voucher(instance)
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def expense_changed(sender, instance, **kwargs):
+    ledger.record_changed(instance)
+
+
+@receiver(post_save, sender=SupportTicket)
+def ticket_saved(sender, instance, created, **kwargs):
+    if created:
+        event = events.ticket_event(instance)
+        channels = events.coordinator_channels(instance.coordinator_id)
+        transaction.on_commit(lambda: [events.publish(ch, event) for ch in channels])
+
+
+@receiver(post_save, sender=CallRequest)
+def call_saved(sender, instance, created, **kwargs):
+    if created:
+        event = events.call_event(instance)
+        channels = events.coordinator_channels(instance.coordinator_id)
+        transaction.on_commit(lambda: [events.publish(ch, event) for ch in channels])
+
+
+@receiver(post_save, sender=Lead)
+def lead_saved(sender, instance, created, **kwargs):
+    assignee = instance.assigned_to_id
+    if assignee and assignee != getattr(instance, '_loaded_assigned_to_id', None):
+        event = events.lead_event(instance)
+        if Lead.assigned_to.is_cached(instance):
+            user_id = instance.assigned_to.user_id
+            channels = [events.user_channel(user_id)] if user_id else []
+        else:
+            channels = events.employee_channels(assignee)
+        transaction.on_commit(lambda: [events.publish(ch, event) for ch in channels])
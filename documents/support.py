@@ -0,0 +1,86 @@
+"""
+Coordinator support queue.
+
+Pending tickets and call requests are served oldest-first and paginated,
+straight off the (coordinator, status, created_at) indexes. Resolution
+times are stored on the row when a ticket/call is closed, so the SLA
+numbers are a plain aggregate over the resolved rows.
+"""
+import datetime
+
+from django.core.paginator import Paginator
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+
+from . import watermarks
+from .models import SupportTicket, CallRequest
+
+QUEUE_PAGE_SIZE = 20
+
+
+def _queue(model, coordinator=None):
+    # A coordinator's own queue is already one company's; the admin queue is the active company's
+    manager = model.objects if coordinator is not None else model.scoped
+    qs = manager.filter(status='Pending').select_related('client').order_by('created_at', 'id')
+    if coordinator is not None:
+        qs = qs.filter(coordinator=coordinator)
+    return qs
+
+
+def ticket_queue(coordinator=None, page=1, per_page=QUEUE_PAGE_SIZE):
+    """ Oldest pending tickets first. coordinator=None means every coordinator (admin view). """
+    return Paginator(_queue(SupportTicket, coordinator), per_page).get_page(page)
+
+
+def call_queue(coordinator=None, page=1, per_page=QUEUE_PAGE_SIZE):
+    return Paginator(_queue(CallRequest, coordinator), per_page).get_page(page)
+
+
+def resolve_ticket(ticket, when=None):
+    when = when or timezone.now()
+    ticket.status = 'Resolved'
+    ticket.resolved_at = when
+    ticket.resolution_seconds = max(0, int((when - ticket.created_at).total_seconds()))
+    ticket.save(update_fields=['status', 'resolved_at', 'resolution_seconds'])
+    return ticket
+
+
+def complete_call(call, when=None):
+    when = when or timezone.now()
+    call.status = 'Done'
+    call.completed_at = when
+    call.response_seconds = max(0, int((when - call.created_at).total_seconds()))
+    call.save(update_fields=['status', 'completed_at', 'response_seconds'])
+    return call
+
+
+def reassign_batch_queue(batch):
+    """ Keep open tickets/calls pointed at the batch's current coordinator. """
+    for model in (SupportTicket, CallRequest):
+        model.objects.filter(client__batch=batch, status='Pending').update(coordinator=batch.coordinator_id)
+    watermarks.touch(SupportTicket, CallRequest)
+
+
+def sla_summary(coordinator=None, days=30):
+    """ Resolution stats over the last `days` days plus the age of the oldest open item. """
+    since = timezone.now() - datetime.timedelta(days=days)
+    tickets = SupportTicket.scoped.all() if coordinator is None else SupportTicket.objects.all()
+    calls = CallRequest.scoped.all() if coordinator is None else CallRequest.objects.all()
+    if coordinator is not None:
+        tickets = tickets.filter(coordinator=coordinator)
+        calls = calls.filter(coordinator=coordinator)
+
+    resolved = tickets.filter(status='Resolved', resolved_at__gte=since).aggregate(
+        count=Count('id'), avg=Avg('resolution_seconds'), worst=Max('resolution_seconds'))
+    answered = calls.filter(status='Done', completed_at__gte=since).aggregate(
+        count=Count('id'), avg=Avg('response_seconds'))
+    oldest = tickets.filter(status='Pending').order_by('created_at').values_list('created_at', flat=True).first()
+
+    return {
+        'resolved_count': resolved['count'],
+        'avg_resolve_hours': round((resolved['avg'] or 0) / 3600, 1),
+        'worst_resolve_hours': round((resolved['worst'] or 0) / 3600, 1),
+        'calls_done': answered['count'],
+        'avg_call_hours': round((answered['avg'] or 0) / 3600, 1),
+        'oldest_pending': oldest,
+    }
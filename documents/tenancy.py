@@ -0,0 +1,121 @@
+"""
+Company scoping.
+
+Every request works inside one company: an employee's own, the company of
+a client's batch, or, for superusers, the one picked with the switcher
+(the oldest company until they pick). Like the role, it is resolved once
+per session and then read back from the session.
+
+company_middleware makes that company active for the request, and the
+`scoped` manager on the company-owned models filters by it:
+
+    Lead.scoped.filter(status='New')      # this company's leads only
+    Lead.objects.filter(status='New')     # every company (admin site, jobs)
+
+The big tables (attendance, leave, sales, leads, batches) carry their own
+company_id, copied from the employee/coordinator on first save, so a
+scoped query is one index range on a (company, ...) index instead of a
+join through employees. Clients, tickets and calls are scoped through
+their batch. Outside a request (commands, jobs, the shell) nothing is
+active and `scoped` returns every row, unless activate() says otherwise.
+Inside a request it fails closed: a user without a company (a client not
+in a batch yet) gets no rows rather than every company's.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.db import models
+from django.utils.decorators import sync_and_async_middleware
+
+COMPANY_SESSION_KEY = '_company'
+
+# A callable returning the active company id, so requests resolve it only when a query needs it
+_active = ContextVar('active_company', default=None)
+
+
+def active():
+    """ Id of the company the current request (or activate() block) works in; None means unscoped. """
+    resolve = _active.get()
+    return resolve() if resolve else None
+
+
+@contextmanager
+def activate(company_id):
+    token = _active.set(lambda: company_id)
+    try:
+        yield
+    finally:
+        _active.reset(token)
+
+
+class CompanyManager(models.Manager):
+    """ Rows of the active company only: every row outside a request, none in a request without a company. """
+
+    def __init__(self, field='company'):
+        super().__init__()
+        self.field = field
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        resolve = _active.get()
+        if resolve is None:
+            return qs
+        company_id = resolve()
+        return qs.none() if company_id is None else qs.filter(**{f'{self.field}_id': company_id})
+
+
+# --- Per request ---
+
+def resolve_company(user):
+    from .models import Batch, Company
+
+    if not user.is_authenticated:
+        return None
+    if user.is_superuser:
+        return Company.objects.order_by('pk').values_list('pk', flat=True).first()
+    if hasattr(user, 'employee'):
+        return user.employee.company_id
+    if hasattr(user, 'enrolledclient') and user.enrolledclient.batch_id:
+        return Batch.objects.filter(pk=user.enrolledclient.batch_id).values_list('company_id', flat=True).first()
+    return None
+
+
+def remember_company(request, company_id):
+    """ Pin the session to a company (the superuser switcher, or right after the first lookup). """
+    if company_id is not None:
+        request.session[COMPANY_SESSION_KEY] = company_id
+    return company_id
+
+
+def company_id(request):
+    """ The request's company id, looked up at most once per session. """
+    if not hasattr(request, '_company_id'):
+        if not request.user.is_authenticated:
+            request._company_id = None
+        else:
+            value = request.session.get(COMPANY_SESSION_KEY)
+            if value is None:
+                # Not cached when empty, so a profile linked later is picked up on the next request
+                value = remember_company(request, resolve_company(request.user))
+            request._company_id = value
+    return request._company_id
+
+
+@sync_and_async_middleware
+def company_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _active.set(lambda: company_id(request))
+            try:
+                return await get_response(request)
+            finally:
+                _active.reset(token)
+    else:
+        def middleware(request):
+            token = _active.set(lambda: company_id(request))
+            try:
+                return get_response(request)
+            finally:
+                _active.reset(token)
+    return middleware
@@ -1,3 +1,1177 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import analytics, archive, coverage, events, jobs, leave, ledger, pdf, portal, routers, sheets, tenancy
+from .models import (
+    Company, Employee, Attendance, LeaveRequest, Expense, SalesRecord,
+    Lead, Batch, EnrolledClient, SupportTicket, CallRequest, SalesMonthly, ChangeWatermark, ExpenseMonthly
+)
+
+
+def fake_pdf(html, request, filename, stylesheet=None):
+    # Query budgets are about the ORM; WeasyPrint itself is not exercised here
+    response = HttpResponse(html, content_type='application/pdf')
+    response.stylesheet = stylesheet
+    return response
+
+
+def seed(employees=40, days=90, leads=2000, batches=8, clients_per_batch=10):
+    """ Realistic-ish volumes, inserted with bulk_create so the suite stays fast. """
+    company = Company.objects.create(name='Gainers Future', address='Dhaka')
+    today = datetime.date.today()
+    users = User.objects.bulk_create([User(username=f'emp{i}') for i in range(employees)])
+    emps = Employee.objects.bulk_create([
+        Employee(user=u, company=company, full_name=f'Employee {i}', designation='Sales' if i % 2 else 'Coordinator',
+                 joining_date=today - datetime.timedelta(days=400))
+        for i, u in enumerate(users)
+    ])
+    leave.open_balances(emps)
+    Attendance.objects.bulk_create([
+        Attendance(employee=e, company_id=e.company_id, date=today - datetime.timedelta(days=d), in_time=datetime.time(9, 0),
+                   out_time=None if d == 0 else datetime.time(17, 0), status='Late' if d % 7 == 0 else 'Present')
+        for e in emps for d in range(days)
+    ])
+    SalesRecord.objects.bulk_create([
+        SalesRecord(employee=e, company_id=e.company_id, date=today - datetime.timedelta(days=d), count=1 + d % 3)
+        for e in emps for d in range(0, days, 5)
+    ])
+    LeaveRequest.objects.bulk_create([
+        LeaveRequest(employee=e, company_id=e.company_id, leave_type='Casual', start_date=today + datetime.timedelta(days=7),
+                     end_date=today + datetime.timedelta(days=8), reason='Family', status='Pending')
+        for e in emps
+    ])
+    Expense.objects.bulk_create([
+        Expense(company=company, voucher_no=f'V-{i}', date=today - datetime.timedelta(days=i), description='Office',
+                amount=500, paid_to='Vendor')
+        for i in range(60)
+    ])
+    Lead.objects.bulk_create([
+        Lead(company=company, name=f'Lead {i}', phone=f'0170000{i:05d}', assigned_to=emps[i % employees] if i % 3 else None,
+             status=['New', 'Busy', 'Interested', 'No_Response'][i % 4])
+        for i in range(leads)
+    ])
+    batch_rows = Batch.objects.bulk_create([Batch(name=f'Batch {i}', company=company, coordinator=emps[i]) for i in range(batches)])
+    client_users = User.objects.bulk_create([User(username=f'client{i}') for i in range(batches * clients_per_batch)])
+    clients = EnrolledClient.objects.bulk_create([
+        EnrolledClient(user=u, batch=batch_rows[i % batches], name=f'Client {i}', phone=f'0180000{i:04d}',
+                       email=f'c{i}@example.com')
+        for i, u in enumerate(client_users)
+    ])
+    SupportTicket.objects.bulk_create([
+        SupportTicket(client=c, coordinator_id=c.batch.coordinator_id, subject='Help', description='SOP review')
+        for c in clients
+    ])
+    CallRequest.objects.bulk_create([CallRequest(client=c, coordinator_id=c.batch.coordinator_id) for c in clients[::2]])
+    analytics.rebuild()
+    ledger.rebuild()
+    admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+    return {'company': company, 'admin': admin, 'employee': emps[0], 'client': clients[0], 'batch': batch_rows[0]}
+
+
+@mock.patch('documents.views.render_pdf', fake_pdf)
+class QueryBudgetTests(TestCase):
+    """
+    Every route in sme_project/urls.py under a query budget. Budgets count
+    the session and user lookups too, and are measured on a cold cache. The
+    first page of a session also saves the resolved role (BEGIN/UPDATE/COMMIT).
+    Conditional pages read their watermarks (one SELECT) and writes bump
+    them (one UPDATE at the end of the request). The first page that needs
+    the active company looks it up and saves it to the session (a SELECT for
+    superusers and clients, free for employees).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed()
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, user):
+        self.client.force_login(user)
+
+    def assertQueryBudget(self, budget, url, method='get', data=None, status=(200, 302), **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data or {}, **extra)
+        self.assertIn(response.status_code, status)
+        queries = '\n'.join(q['sql'] for q in ctx.captured_queries)
+        self.assertLessEqual(len(ctx), budget, f'{method.upper()} {url} ran {len(ctx)} queries (budget {budget}):\n{queries}')
+        return response
+
+    def assertPrintStyled(self, response):
+        # Styles come from the pre-parsed print sheets, not from the template
+        self.assertNotIn(b'<style', response.content)
+        self.assertTrue((pdf.PRINT_CSS_DIR / f'{response.stylesheet}.css').exists(), response.stylesheet)
+
+    # --- Dashboards ---
+
+    def test_admin_dashboard(self):
+        self.login(self.data['admin'])
+        self.assertQueryBudget(32, reverse('home'))
+
+    def test_admin_dashboard_search(self):
+        self.login(self.data['admin'])
+        self.assertQueryBudget(32, reverse('home'), data={'q': 'Lead 1'})
+
+    def test_admin_dashboard_warm_cache(self):
+        self.login(self.data['admin'])
+        self.client.get(reverse('home'))
+        self.assertQueryBudget(18, reverse('home'))
+
+    def test_admin_dashboard_does_not_scale_with_rows(self):
+        self.login(self.data['admin'])
+        self.client.get(reverse('home'))
+        cache.clear()
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(reverse('home'))
+        cache.clear()
+        extra = Employee.objects.bulk_create([
+            Employee(company=self.data['company'], full_name=f'Extra {i}', designation='Sales',
+                     joining_date=datetime.date.today()) for i in range(20)
+        ])
+        Attendance.objects.bulk_create([Attendance(employee=e, company_id=e.company_id, in_time=datetime.time(9, 0), status='Present') for e in extra])
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(reverse('home'))
+        self.assertEqual(len(before), len(after))
+
+    def test_employee_dashboard(self):
+        self.login(self.data['employee'].user)
+        self.assertQueryBudget(19, reverse('home'))
+
+    def test_client_dashboard(self):
+        self.login(self.data['client'].user)
+        self.assertQueryBudget(10, reverse('home'))
+        self.assertQueryBudget(5, reverse('client_portal'))
+
+    def test_client_portal_submit_issue(self):
+        self.login(self.data['client'].user)
+        self.assertQueryBudget(11, reverse('client_portal'), method='post', data={'submit_issue': '1', 'subject': 'Visa', 'description': 'Docs'})
+
+    def test_batch_details(self):
+        self.login(self.data['admin'])
+        self.assertQueryBudget(4, reverse('batch_details', args=[self.data['batch'].id]))
+
+    # --- Auth ---
+
+    def test_login_and_logout(self):
+        self.assertQueryBudget(0, reverse('login'))
+        self.assertQueryBudget(9, reverse('login'), method='post', data={'username': 'admin', 'password': 'pass'})
+        self.assertQueryBudget(4, reverse('logout'))
+
+    # --- Actions ---
+
+    def test_attendance_actions(self):
+        employee = Employee.objects.create(company=self.data['company'], full_name='Fresh', designation='Sales',
+                                           joining_date=datetime.date.today())
+        self.login(self.data['admin'])
+        self.assertQueryBudget(4, reverse('mark_attendance'), method='post', data={'employee_id': employee.id, 'action': 'check_in'})
+        self.assertQueryBudget(2, reverse('mark_attendance'), method='post', data={'employee_id': employee.id, 'action': 'check_out'})
+
+    def test_mark_own_attendance(self):
+        self.login(self.data['employee'].user)
+        self.assertQueryBudget(3, reverse('mark_own_attendance'), method='post', data={'action_type': 'check_in'},
+                               HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def test_manage_leave(self):
+        employee = self.data['employee']
+        self.login(employee.user)
+        # Apply: SAVEPOINT, lock the employee row, overlap check on (employee, end_date), INSERT, RELEASE
+        self.assertQueryBudget(11, reverse('manage_leave'), method='post', data={
+            'apply_leave': '1', 'leave_type': 'Sick', 'start_date': '2026-03-01', 'end_date': '2026-03-02', 'reason': 'Flu'})
+        req = LeaveRequest.objects.filter(employee=employee).latest('id')
+        self.login(self.data['admin'])
+        # Approve: lock requests + employees, one F() UPDATE and ledger INSERT per employee, one status UPDATE
+        self.assertQueryBudget(13, reverse('manage_leave'), method='post', data={'approve_id': req.id})
+
+    def test_add_sales(self):
+        self.login(self.data['admin'])
+        # Employee's company, INSERT, then the roll-up refresh: BEGIN, day sum, day upsert, month sum, month upsert, COMMIT
+        self.assertQueryBudget(9, reverse('add_sales'), method='post', data={
+            'employee_id': self.data['employee'].id, 'sale_count': 2, 'sale_date': str(datetime.date.today())})
+
+    # --- CRM ---
+
+    def test_add_lead(self):
+        self.login(self.data['admin'])
+        # An unassigned lead goes to the active company: session, user, company, INSERT, session save
+        self.assertQueryBudget(8, reverse('add_lead_admin'), method='post', data={'name': 'Walk-in', 'phone': '01900000000'})
+
+    def test_distribute_leads(self):
+        self.login(self.data['admin'])
+        # One UPDATE per lead, ten leads by default, plus the company lookup and session save
+        self.assertQueryBudget(19, reverse('distribute_leads'), method='post', data={'employee_id': self.data['employee'].id})
+
+    def test_update_lead_status(self):
+        lead = Lead.objects.filter(assigned_to=self.data['employee']).first()
+        self.login(self.data['employee'].user)
+        response = self.assertQueryBudget(3, reverse('update_lead_status'), method='post',
+                                          data={'lead_id': lead.id, 'status': 'Interested'},
+                                          HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json()['new_status'], 'Interested')
+
+    def test_sync_google_sheets_requires_credentials(self):
+        self.login(self.data['admin'])
+        response = self.assertQueryBudget(2, reverse('sync_google_sheets'), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json()['status'], 'error')
+
+    # --- CMS ---
+
+    def test_create_batch(self):
+        self.login(self.data['admin'])
+        self.assertQueryBudget(5, reverse('create_batch'), method='post', data={
+            'name': 'Spring', 'limit': 20, 'coordinator_id': self.data['employee'].id})
+
+    def test_add_enrolled_client(self):
+        self.login(self.data['admin'])
+        self.assertQueryBudget(5, reverse('add_enrolled_client'), method='post', data={
+            'name': 'New', 'email': 'new@example.com', 'phone': '1', 'batch_id': self.data['batch'].id, 'password': 'x'})
+
+    def test_update_client_task(self):
+        self.login(self.data['employee'].user)
+        self.assertQueryBudget(4, reverse('update_client_task'), method='post', data={
+            'client_id': self.data['client'].id, 'task_name': 'task_cv', 'is_checked': 'true'})
+
+    def test_resolve_issue_and_call(self):
+        self.login(self.data['employee'].user)
+        ticket = SupportTicket.objects.filter(coordinator=self.data['employee']).first()
+        call = CallRequest.objects.filter(coordinator=self.data['employee']).first()
+        self.assertQueryBudget(3, reverse('resolve_issue', args=[ticket.id]))
+        self.assertQueryBudget(3, reverse('complete_call_request', args=[call.id]))
+        ticket.refresh_from_db()
+        self.assertIsNotNone(ticket.resolution_seconds)
+
+    # --- PDFs ---
+
+    def test_employee_documents(self):
+        self.login(self.data['admin'])
+        emp_id = self.data['employee'].id
+        for name, budget in [('print_appointment', 2), ('print_id_card', 2), ('print_experience', 2),
+                             ('print_emp_attendance', 3), ('print_payslip', 5), ('print_smart_payslip', 5)]:
+            with self.subTest(name):
+                self.assertPrintStyled(self.assertQueryBudget(budget, reverse(name, args=[emp_id])))
+
+    def test_company_sheets(self):
+        self.login(self.data['admin'])
+        # The company's own employees; the first page also resolves and saves the company
+        self.assertPrintStyled(self.assertQueryBudget(9, reverse('print_salary_sheet')))
+        self.assertPrintStyled(self.assertQueryBudget(5, reverse('print_attendance')))
+        self.assertPrintStyled(self.assertQueryBudget(2, reverse('print_voucher', args=[Expense.objects.first().id])))
+
+    def test_leave_documents(self):
+        req = LeaveRequest.objects.filter(employee=self.data['employee']).first()
+        leave.approve(req.id)
+        self.login(self.data['admin'])
+        # First page of the session, so this includes saving the role and company
+        self.assertPrintStyled(self.assertQueryBudget(8, reverse('print_leave_approval', args=[req.id])))
+        # Roster, approved leave, absences: three reads however long the range
+        self.assertQueryBudget(5, reverse('leave_coverage'), data={'from': '2026-01-01', 'to': '2026-03-31'})
+
+    def test_expense_report(self):
+        self.login(self.data['admin'])
+        # One read on the roll-up, whatever the range
+        self.assertQueryBudget(8, reverse('expense_report'), data={'from': '2024-01', 'to': '2026-12'})
+
+    # --- Portal APIs ---
+
+    def test_portal_summaries(self):
+        # Session, user, role save, watermarks, then the summary itself (plus the client's company)
+        self.login(self.data['employee'].user)
+        self.assertQueryBudget(7, reverse('employee_summary'))
+        self.login(self.data['client'].user)
+        self.assertQueryBudget(8, reverse('client_summary'))
+
+    # --- Monitoring / admin ---
+
+    def test_cache_stats(self):
+        self.login(self.data['admin'])
+        self.assertQueryBudget(2, reverse('cache_stats'))
+
+    def test_perf_summary(self):
+        self.login(self.data['admin'])
+        self.assertQueryBudget(2, reverse('perf_summary'))
+
+    def test_admin_index(self):
+        self.login(self.data['admin'])
+        self.assertQueryBudget(3, reverse('admin:index'))
+
+    def test_admin_changelists(self):
+        # No per-row queries: list_select_related covers every __str__ / FK column
+        self.login(self.data['admin'])
+        # Session, user, sqlite_stat1 estimate (none here, so COUNT too), page, date-hierarchy bounds + buckets
+        for model, budget in [('attendance', 7), ('salesrecord', 7), ('lead', 7), ('leaverequest', 5),
+                              ('leaveledger', 5), ('supportticket', 7), ('callrequest', 7), ('employee', 6)]:
+            with self.subTest(model):
+                self.assertQueryBudget(budget, reverse(f'admin:documents_{model}_changelist'))
+
+    def test_admin_estimates_large_tables(self):
+        self.login(self.data['admin'])
+        # Archiving removes the oldest ids; the statistics don't pretend they are still there
+        Lead.objects.filter(pk__in=Lead.objects.order_by('pk').values('pk')[:10]).delete()
+        total = Lead.objects.count()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE documents_lead')
+        with mock.patch('documents.admin.ESTIMATE_THRESHOLD', 100):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('admin:documents_lead_changelist'))
+                filtered = self.client.get(reverse('admin:documents_lead_changelist'), {'status__exact': 'New'})
+        counts = [q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql']]
+        self.assertEqual(len(counts), 1)  # only the filtered page counts exactly
+        self.assertEqual(response.context['cl'].result_count, total)  # as of the last ANALYZE
+        self.assertLess(response.context['cl'].result_count, Lead.objects.latest('pk').pk)
+        self.assertEqual(filtered.context['cl'].result_count, Lead.objects.filter(status='New').count())
+
+    def test_admin_counts_exactly_without_statistics(self):
+        self.login(self.data['admin'])
+        Lead.objects.filter(pk__in=Lead.objects.order_by('pk').values('pk')[:10]).delete()
+        with mock.patch('documents.admin.ESTIMATE_THRESHOLD', 100), \
+                mock.patch('documents.admin.estimated_rows', return_value=None):
+            response = self.client.get(reverse('admin:documents_lead_changelist'))
+        self.assertEqual(response.context['cl'].result_count, Lead.objects.count())
+
+    def test_admin_lead_form_does_not_list_employees(self):
+        self.login(self.data['admin'])
+        lead = Lead.objects.filter(assigned_to__isnull=False).first()
+        response = self.assertQueryBudget(6, reverse('admin:documents_lead_change', args=[lead.id]))
+        self.assertNotContains(response, 'Employee 39')
+
+    def test_event_stream_rejects_anonymous(self):
+        self.assertQueryBudget(0, reverse('event_stream'), status=(401,))
+
+    def test_event_stream_needs_asgi(self):
+        # The test client is WSGI: no stream to tie a worker up, and no EventSource on the page
+        self.login(self.data['employee'].user)
+        self.assertEqual(self.client.get(reverse('event_stream')).status_code, 204)
+        self.assertNotContains(self.client.get(reverse('home')), 'EventSource')
+
+    async def test_dashboard_opens_the_stream_under_asgi(self):
+        await self.async_client.aforce_login(self.data['employee'].user)
+        self.assertContains(await self.async_client.get(reverse('home')), 'EventSource')
+
+
+@override_settings(PERF_INSTRUMENTATION=True, PERF_SLOW_REQUEST_MS=0)
+class InstrumentationTests(TestCase):
+
+    def test_server_timing_header_and_summary(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin)
+        with self.assertLogs('documents.perf', 'WARNING'):
+            response = self.client.get(reverse('home'))
+            views = self.client.get(reverse('perf_summary'), {'format': 'json'}).json()['views']
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", .*tpl;dur=[\d.]+')
+        self.assertIn('home', [row['name'] for row in views])
+
+    def test_summary_page_sorts_by_column(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        with self.assertLogs('documents.perf', 'WARNING'):
+            self.client.get(reverse('home'))
+            response = self.client.get(reverse('perf_summary'), {'sort': 'count'})
+        self.assertEqual(response.context['sort'], 'count')
+        self.assertContains(response, '<td class="font-bold">home</td>', html=True)
+        self.assertEqual(self.client.get(reverse('perf_summary'), {'sort': 'bogus'}).context['sort'], 'p95_ms')
+
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.settings_override = override_settings(PROFILE_DIR=tmp.name, PROFILE_KEEP=2)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+
+    def test_superuser_profile_is_stored_listed_and_downloadable(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('home'), {'_profile': '1'})
+        stem = response['X-Profile-Id']
+        self.assertContains(self.client.get(reverse('profile_list')), stem)
+        sql = self.client.get(reverse('profile_download', args=[f'{stem}.sql.json']))
+        meta = json.loads(b''.join(sql.streaming_content))
+        self.assertEqual(meta['query_count'], len(meta['queries']))
+        self.assertGreater(meta['query_count'], 0)
+        self.assertEqual(self.client.get(reverse('profile_download', args=[f'{stem}.prof'])).status_code, 200)
+
+    def test_retention_cap(self):
+        self.client.force_login(self.admin)
+        for _ in range(4):
+            self.client.get(reverse('home'), HTTP_X_PROFILE='1')
+        self.assertEqual(len(self.client.get(reverse('profile_list')).context['profiles']), 2)
+
+    def test_ignored_for_non_superusers(self):
+        self.client.force_login(User.objects.create_user('staff', password='x'))
+        response = self.client.get(reverse('login'), {'_profile': '1'})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.client.get(reverse('profile_list')).status_code, 403)
+
+    def test_download_rejects_other_files(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('profile_download', args=['settings.py'])).status_code, 404)
+
+
+class ReplicaRoutingTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('documents.routers.replica_enabled', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = routers.ReplicaRouter()
+
+    def route(self, request):
+        @routers.reads_from_replica
+        def view(request):
+            return self.router.db_for_read(Lead), self.router.db_for_read(User)
+        return view(request)
+
+    def test_reports_read_from_replica_but_auth_stays_on_primary(self):
+        self.assertEqual(self.route(RequestFactory().get('/')), ('replica', 'default'))
+        self.assertEqual(self.router.db_for_read(Lead), 'default')
+        self.assertEqual(self.router.db_for_write(Lead), 'default')
+
+    def test_writes_and_sticky_requests_use_primary(self):
+        self.assertEqual(self.route(RequestFactory().post('/')), ('default', 'default'))
+        request = RequestFactory().get('/')
+        request.COOKIES[routers.STICKY_COOKIE] = '1'
+        self.assertEqual(self.route(request), ('default', 'default'))
+
+    def test_cached_fragments_are_built_on_primary(self):
+        from . import cache as fragments
+
+        @routers.reads_from_replica
+        def view(request):
+            build = lambda: self.router.db_for_read(Lead)
+            return self.router.db_for_read(Lead), fragments.fragment('admin', 'test', 'routing', build)
+
+        cache.clear()
+        self.assertEqual(view(RequestFactory().get('/')), ('replica', 'default'))
+
+    def test_post_sets_sticky_cookie(self):
+        response = self.client.post(reverse('login'), {'username': 'nobody', 'password': 'x'})
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+        self.assertNotIn(routers.STICKY_COOKIE, self.client.get(reverse('login')).cookies)
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(employees=4, days=10, leads=50, batches=1, clients_per_batch=2)
+
+    def setUp(self):
+        self.client.force_login(self.data['admin'])
+
+    def export(self, name, fmt, **params):
+        return self.client.get(reverse('export_data', args=[name, fmt]), params)
+
+    def test_csv_streams_filtered_rows(self):
+        response = self.export('leads', 'csv', status='Busy')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['ID', 'Name', 'Phone'])
+        self.assertEqual(len(lines) - 1, Lead.objects.filter(status='Busy').count())
+
+    def test_date_range(self):
+        today = datetime.date.today()
+        response = self.export('attendance', 'csv', **{'from': str(today - datetime.timedelta(days=2)), 'to': str(today)})
+        rows = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()[1:]
+        self.assertEqual(len(rows), 4 * 3)
+
+    def test_xlsx_and_parquet(self):
+        import pyarrow.parquet as pq
+        from openpyxl import load_workbook
+
+        xlsx = load_workbook(io.BytesIO(b''.join(self.export('expenses', 'xlsx').streaming_content)), read_only=True)
+        self.assertEqual(len(list(xlsx.active.rows)) - 1, Expense.objects.count())
+        table = pq.read_table(io.BytesIO(b''.join(self.export('leads', 'parquet').streaming_content)))
+        self.assertEqual(table.num_rows, Lead.objects.count())
+        self.assertIn('assigned_to__full_name', table.column_names)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.export('leads', 'csv', **{'from': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.export('sales', 'csv', status='Busy').status_code, 400)
+        self.assertEqual(self.export('payroll', 'csv').status_code, 400)
+        self.client.force_login(self.data['employee'].user)
+        self.assertEqual(self.export('leads', 'csv').status_code, 403)
+
+
+class SalesAnalyticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(employees=6, days=40, leads=10, batches=1, clients_per_batch=1)
+
+    def group_by_totals(self, month):
+        return {row['employee_id']: row['total'] for row in SalesRecord.objects.filter(
+            date__gte=month, date__lt=(month + datetime.timedelta(days=32)).replace(day=1),
+        ).values('employee_id').annotate(total=Sum('count'))}
+
+    def assertRollupsMatch(self):
+        month = datetime.date.today().replace(day=1)
+        board = analytics.leaderboard(month, limit=100)
+        self.assertEqual({row.employee_id: row.total for row in board}, self.group_by_totals(month))
+        self.assertEqual([row.total for row in board], sorted((row.total for row in board), reverse=True))
+
+    def test_commission_tiers(self):
+        self.assertEqual(analytics.commission(0), 0)
+        self.assertEqual(analytics.commission(10), 4000)
+        self.assertEqual(analytics.commission(12), 5000)
+        self.assertEqual((analytics.bonus(10), analytics.bonus(11)), (0, 1000))
+
+    def test_signals_keep_rollups_exact(self):
+        employee = self.data['employee']
+        today = datetime.date.today()
+        record = SalesRecord.objects.create(employee=employee, date=str(today), count=5)
+        self.assertRollupsMatch()
+        record = SalesRecord.objects.get(pk=record.pk)
+        record.count = 2
+        record.employee = Employee.objects.exclude(pk=employee.pk).first()
+        record.save()
+        self.assertRollupsMatch()
+        record.delete()
+        self.assertRollupsMatch()
+
+    def test_leaderboard_is_one_query(self):
+        with self.assertNumQueries(1):
+            board = analytics.leaderboard()
+            [row.employee.full_name for row in board]
+
+    def test_standing_and_api(self):
+        month = datetime.date.today().replace(day=1)
+        top = analytics.leaderboard(month, limit=1)[0]
+        self.assertEqual(analytics.standing(top.employee_id, month)['rank'], 1)
+        self.client.force_login(self.data['admin'])
+        leaders = self.client.get(reverse('sales_leaderboard'), {'month': month.strftime('%Y-%m')}).json()['leaders']
+        self.assertEqual(leaders[0]['total'], top.total)
+        self.assertEqual(self.client.get(reverse('sales_leaderboard'), {'month': 'May'}).status_code, 400)
+
+    def test_rebuild_matches_signals(self):
+        before = sorted(SalesMonthly.objects.values_list('employee_id', 'month', 'total', 'commission'))
+        analytics.rebuild()
+        self.assertEqual(sorted(SalesMonthly.objects.values_list('employee_id', 'month', 'total', 'commission')), before)
+
+
+class LeaveEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(employees=3, days=5, leads=10, batches=1, clients_per_batch=1)
+
+    def setUp(self):
+        self.employee = self.data['employee']
+        self.day = datetime.date.today() + datetime.timedelta(days=30)
+
+    def apply(self, start, days=1, leave_type='Casual', employee=None):
+        return leave.apply((employee or self.employee).id, leave_type, start, start + datetime.timedelta(days=days - 1))
+
+    def test_rejects_overlap_and_bad_range(self):
+        self.apply(self.day, days=3)
+        with self.assertRaises(leave.LeaveError):
+            self.apply(self.day + datetime.timedelta(days=2), leave_type='Sick')
+        with self.assertRaises(leave.LeaveError):
+            leave.apply(self.employee.id, 'Casual', self.day, self.day - datetime.timedelta(days=1))
+        # Back-to-back and other employees are fine
+        self.apply(self.day + datetime.timedelta(days=3))
+        self.apply(self.day, days=3, employee=Employee.objects.exclude(pk=self.employee.pk).first())
+
+    def test_batch_approve_deducts(self):
+        other = Employee.objects.exclude(pk=self.employee.pk).first()
+        leave.adjust(other.id, 'Sick', -13, note='Used elsewhere')  # 1 day left
+        reqs = [self.apply(self.day, days=2), self.apply(self.day + datetime.timedelta(days=5), days=3, leave_type='Sick'),
+                self.apply(self.day, days=1, leave_type='Sick', employee=other)]
+        approved = leave.approve([r.id for r in reqs], user=self.data['admin'])
+        self.assertEqual(len(approved), 3)
+        self.employee.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.employee.casual_leave_bal, self.employee.sick_leave_bal), (8, 11))
+        self.assertEqual(other.sick_leave_bal, 0)
+        self.assertEqual(leave.drift(), [])
+        # Already approved: skipped, nothing deducted twice
+        self.assertEqual(leave.approve(reqs[0].id), [])
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.casual_leave_bal, 8)
+
+    def test_approve_rejects_requests_over_the_balance(self):
+        leave.adjust(self.employee.id, 'Casual', -8)  # 2 days left
+        short, fine = self.apply(self.day, days=5), self.apply(self.day + datetime.timedelta(days=10), leave_type='Sick')
+        with self.assertRaisesMessage(leave.LeaveError, 'needs 5 days; only 2 left'):
+            leave.approve([short.id, fine.id])
+        # Nothing in the batch was approved or deducted
+        self.assertEqual(set(LeaveRequest.objects.filter(pk__in=[short.id, fine.id]).values_list('status', flat=True)), {'Pending'})
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).casual_leave_bal, 2)
+        self.client.force_login(self.data['admin'])
+        self.assertEqual(self.client.post(reverse('manage_leave'), {'approve_id': short.id}).status_code, 400)
+
+    def test_admin_keeps_balances_on_the_ledger(self):
+        self.client.force_login(self.data['admin'])
+        url = reverse('admin:documents_employee_change', args=[self.employee.id])
+        form = self.client.get(url).context['adminform'].form
+        self.assertNotIn('casual_leave_bal', form.fields)
+        data = {name: form.initial.get(name) or '' for name in form.fields}
+        data.update({'joining_date': str(self.employee.joining_date), 'company': self.employee.company_id,
+                     'user': self.employee.user_id, 'casual_adjustment': '3', 'casual_leave_bal': '99'})
+        data.pop('photo', None)
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).casual_leave_bal, 13)
+        self.assertEqual(leave.drift(), [])
+
+        req = self.apply(self.day, days=2)
+        changelist = reverse('admin:documents_leaverequest_changelist')
+        self.client.post(changelist, {'action': 'approve', '_selected_action': [req.id]})
+        self.assertEqual(LeaveRequest.objects.get(pk=req.pk).status, 'Approved')
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).casual_leave_bal, 11)
+        self.assertEqual(leave.drift(), [])
+
+    def test_new_employee_gets_opening_entries(self):
+        user = User.objects.create(username='newhire')
+        Employee.objects.create(user=user, company=self.data['company'], full_name='New Hire',
+                                joining_date=datetime.date.today())
+        self.assertEqual(leave.drift(), [])
+
+    def test_only_admin_can_approve(self):
+        req = self.apply(self.day)
+        self.client.force_login(self.employee.user)
+        self.client.post(reverse('manage_leave'), {'approve_id': req.id})
+        self.assertEqual(LeaveRequest.objects.get(pk=req.pk).status, 'Pending')
+        self.client.force_login(self.data['admin'])
+        response = self.client.post(reverse('manage_leave'), {'approve_ids': [req.id]}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json()['approved'], [req.id])
+
+    def test_apply_overlap_is_400(self):
+        self.apply(self.day)
+        self.client.force_login(self.employee.user)
+        response = self.client.post(reverse('manage_leave'), {
+            'apply_leave': '1', 'leave_type': 'Sick', 'start_date': str(self.day), 'end_date': str(self.day)})
+        self.assertEqual(response.status_code, 400)
+
+
+class CoverageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Gainers Future', address='Dhaka')
+        start = datetime.date(2026, 3, 1)
+        cls.start = start
+        cls.emps = [Employee.objects.create(
+            user=User.objects.create(username=f'cov{i}'), company=company, full_name=f'Staff {i}',
+            designation='Sales' if i < 3 else 'Coordinator',
+            joining_date=start + datetime.timedelta(days=5) if i == 4 else start - datetime.timedelta(days=100),
+        ) for i in range(5)]
+        e = cls.emps
+        LeaveRequest.objects.bulk_create([
+            LeaveRequest(employee=e[0], company_id=e[0].company_id, leave_type='Casual', start_date=start - datetime.timedelta(days=2),
+                         end_date=start + datetime.timedelta(days=1), reason='x', status='Approved'),
+            LeaveRequest(employee=e[1], company_id=e[1].company_id, leave_type='Sick', start_date=start + datetime.timedelta(days=1),
+                         end_date=start + datetime.timedelta(days=2), reason='x', status='Approved'),
+            LeaveRequest(employee=e[2], company_id=e[2].company_id, leave_type='Sick', start_date=start, end_date=start, reason='x', status='Pending'),
+        ])
+        Attendance.objects.bulk_create([
+            Attendance(employee=e[3], company_id=e[3].company_id, date=start + datetime.timedelta(days=2), status='Absent'),
+            Attendance(employee=e[1], company_id=e[1].company_id, date=start + datetime.timedelta(days=2), status='Absent'),  # on leave too, counted once
+            Attendance(employee=e[2], company_id=e[2].company_id, date=start, status='Present'),
+        ])
+
+    def test_daily_counts(self):
+        days = coverage.calendar(self.start, self.start + datetime.timedelta(days=6))['days']
+        self.assertEqual([d['headcount'] for d in days], [4, 4, 4, 4, 4, 5, 5])
+        self.assertEqual([d['on_leave'] for d in days], [1, 2, 1, 0, 0, 0, 0])
+        self.assertEqual([d['absent'] for d in days], [0, 0, 1, 0, 0, 0, 0])
+        self.assertEqual([d['available'] for d in days], [3, 2, 2, 4, 4, 5, 5])
+        self.assertEqual([d['by_designation']['Sales'] for d in days[:3]], [2, 1, 2])
+
+    def test_designation_filter_and_api(self):
+        result = coverage.calendar(self.start, self.start, Employee.objects.filter(designation='Coordinator'))
+        self.assertEqual((result['designations'], result['days'][0]['available']), (['Coordinator'], 1))
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin)
+        url = reverse('leave_coverage')
+        days = self.client.get(url, {'from': str(self.start), 'to': str(self.start), 'designation': 'Sales'}).json()['days']
+        self.assertEqual(days[0]['available'], 2)
+        self.assertEqual(self.client.get(url, {'from': '2026-03-05', 'to': '2026-03-01'}).status_code, 400)
+        self.client.force_login(self.emps[0].user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_approve_and_print(self):
+        req = LeaveRequest.objects.get(employee=self.emps[2])
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        response = self.client.post(reverse('manage_leave'), {'approve_id': req.id, 'print': '1'})
+        self.assertRedirects(response, reverse('print_leave_approval', args=[req.id]), fetch_redirect_response=False)
+        self.client.force_login(self.emps[0].user)
+        with mock.patch('documents.views.render_pdf', fake_pdf):
+            self.assertEqual(self.client.get(reverse('print_leave_approval', args=[req.id])).status_code, 403)
+
+
+class JobsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Gainers Future', address='Dhaka')
+        cls.day = datetime.date(2026, 3, 2)  # a Monday
+        cls.emps = [Employee.objects.create(
+            user=User.objects.create(username=f'job{i}'), company=company, full_name=f'Staff {i}', designation='Sales',
+            joining_date=cls.day + datetime.timedelta(days=1) if i == 3 else datetime.date(2025, 1, 1),
+        ) for i in range(4)]
+        Attendance.objects.create(employee=cls.emps[0], date=cls.day, in_time=datetime.time(15, 0), status='Present')
+        LeaveRequest.objects.create(employee=cls.emps[1], leave_type='Sick', start_date=cls.day, end_date=cls.day,
+                                    reason='Flu', status='Approved')
+
+    def statuses(self, day):
+        return dict(Attendance.objects.filter(date=day).values_list('employee_id', 'status'))
+
+    def test_nightly_marks_absences_once(self):
+        e = self.emps
+        with self.assertNumQueries(5):  # check-out UPDATE, one SELECT for the missing, SAVEPOINT, INSERT, RELEASE
+            result = jobs.nightly(self.day)
+        self.assertEqual(result, {'closed_checkins': 1, 'marked_absent': 2})
+        self.assertEqual(self.statuses(self.day), {e[0].id: 'Present', e[1].id: 'Leave', e[2].id: 'Absent'})
+        self.assertEqual(Attendance.objects.get(employee=e[0], date=self.day).out_time, datetime.time(22, 0))
+        self.assertEqual(jobs.nightly(self.day), {'closed_checkins': 0, 'marked_absent': 0})
+
+    def test_weekly_off_day_is_skipped(self):
+        friday = datetime.date(2026, 3, 6)
+        self.assertEqual(jobs.mark_absent(friday), 0)
+        with override_settings(WEEKLY_OFF_DAYS=[]):
+            self.assertEqual(jobs.mark_absent(friday), 4)
+
+    def test_rollover_fills_the_month(self):
+        out = io.StringIO()
+        call_command('run_jobs', 'rollover', '--date', '2026-02-10', stdout=out)
+        result = json.loads(out.getvalue())['result']
+        self.assertEqual(result['month'], '2026-02')
+        self.assertEqual(result['marked_absent'], 3 * 24)  # three employed, 28 days less four Fridays
+        call_command('run_jobs', 'rollover', '--date', '2026-02-10', stdout=io.StringIO())
+        self.assertEqual(Attendance.objects.filter(date__month=2).count(), 3 * 24)
+
+
+class ArchiveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(employees=3, days=5, leads=40, batches=1, clients_per_batch=1)
+        cls.old = timezone.now() - datetime.timedelta(days=400)
+        Lead.objects.filter(status__in=['No_Response', 'Busy'], id__lte=20).update(created_at=cls.old, updated_at=cls.old)
+        cls.old_day = datetime.date.today() - datetime.timedelta(days=500)
+        Attendance.objects.bulk_create([
+            Attendance(employee=cls.data['employee'], company_id=cls.data['employee'].company_id, date=cls.old_day + datetime.timedelta(days=d), status='Present',
+                       in_time=datetime.time(15, 0), penalty_amount='12.50')
+            for d in range(45)
+        ])
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(ARCHIVE_DIR=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_moves_rows_and_reads_them_back(self):
+        due = sorted(Lead.objects.filter(status='No_Response', updated_at=self.old).values_list('id', flat=True))
+        self.assertEqual(archive.archive('leads', chunk_size=3)[0], len(due))
+        self.assertFalse(Lead.objects.filter(id__in=due).exists())
+        self.assertTrue(Lead.objects.filter(status='Busy', updated_at=self.old).exists())  # still open
+        self.assertEqual(sorted(r['id'] for r in archive.rows('leads')), due)
+
+        moved, files = archive.archive('attendance', chunk_size=20)
+        self.assertEqual(moved, 45)
+        self.assertGreaterEqual(files, 3)  # chunks x month partitions
+        self.assertFalse(Attendance.objects.filter(date__lt=self.old_day + datetime.timedelta(days=45)).exists())
+        month = archive.rows('attendance', self.old_day, self.old_day + datetime.timedelta(days=9))
+        self.assertEqual([r['date'] for r in month], [self.old_day + datetime.timedelta(days=d) for d in range(10)])
+        self.assertEqual(str(month[0]['penalty_amount']), '12.50')
+        self.assertEqual(archive.archive('attendance'), (0, 0))
+
+    def test_failed_delete_keeps_rows_and_drops_files(self):
+        with mock.patch('django.db.models.query.QuerySet._raw_delete', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                archive.archive('attendance')
+        self.assertEqual(archive.read('attendance').num_rows, 0)
+        self.assertEqual(Attendance.objects.filter(date__lt=self.old_day + datetime.timedelta(days=45)).count(), 45)
+
+    def test_limit_skips_duplicate_copies(self):
+        import glob
+        import shutil
+
+        archive.archive('attendance')
+        for path in glob.glob(f'{self.tmp.name}/attendance/**/*.parquet', recursive=True):
+            shutil.copy(path, path.replace('part-', 'part-copy-'))  # as if a crash left every row twice
+        self.assertEqual(archive.read('attendance').num_rows, 90)
+        first = archive.rows('attendance', limit=7)
+        self.assertEqual([r['date'] for r in first], [self.old_day + datetime.timedelta(days=d) for d in range(7)])
+        self.assertEqual(len(archive.rows('attendance')), 45)
+
+    def test_query_api(self):
+        archive.archive('attendance')
+        self.client.force_login(self.data['admin'])
+        url = reverse('archive_query', args=['attendance'])
+        body = self.client.get(url, {'employee_id': self.data['employee'].id, 'limit': 5}).json()
+        self.assertEqual(body['count'], 5)
+        self.assertEqual(self.client.get(url, {'employee_id': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'nope': '1'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('archive_query', args=['sales'])).status_code, 400)
+
+    def test_query_api_reads_the_active_company_only(self):
+        archive.archive('attendance')
+        other = Company.objects.create(name='Gainers Abroad', address='Sylhet')
+        self.client.force_login(self.data['admin'])
+        url = reverse('archive_query', args=['attendance'])
+        self.assertEqual(self.client.get(url).json()['count'], 45)
+        self.client.post(reverse('switch_company'), {'company_id': other.id})
+        self.assertEqual(self.client.get(url).json()['count'], 0)
+        self.assertEqual(self.client.get(url, {'company_id': self.data['company'].id}).json()['count'], 0)
+
+
+class LedgerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Gainers Future', address='Dhaka')
+        cls.other = Company.objects.create(name='Gainers Abroad', address='Dhaka')
+
+    def expense(self, company=None, **fields):
+        fields = {'date': datetime.date(2026, 3, 5), 'description': 'Office', 'amount': 100, 'paid_to': 'Vendor', **fields}
+        return Expense.objects.create(company=company or self.company, **fields)
+
+    def rollups(self):
+        return sorted(ExpenseMonthly.objects.values_list('company_id', 'month', 'paid_to', 'total', 'count'))
+
+    def test_voucher_numbers_are_sequential_per_company_and_year(self):
+        numbers = [self.expense().voucher_no for _ in range(3)]
+        c = self.company.id
+        self.assertEqual(numbers, [f'V{c}-2026-00001', f'V{c}-2026-00002', f'V{c}-2026-00003'])
+        self.assertEqual(self.expense(self.other).voucher_no, f'V{self.other.id}-2026-00001')
+        self.assertEqual(self.expense(date=datetime.date(2027, 1, 2)).voucher_no, f'V{c}-2027-00001')
+        self.assertEqual(self.expense(voucher_no='MANUAL-7').voucher_no, 'MANUAL-7')
+
+    def test_failed_insert_gives_the_number_back(self):
+        self.expense()
+        with self.assertRaises(IntegrityError):
+            self.expense(amount=None)
+        self.assertEqual(self.expense().voucher_no, f'V{self.company.id}-2026-00002')
+
+    def test_rollups_follow_saves_edits_and_deletes(self):
+        first = self.expense()
+        self.expense(amount=50)
+        moved = self.expense(paid_to='ISP')
+        moved.date, moved.paid_to = datetime.date(2026, 4, 1), 'Landlord'
+        moved.save()
+        first.delete()
+        expected = self.rollups()
+        self.assertEqual(len(expected), 2)
+        ledger.rebuild()
+        self.assertEqual(self.rollups(), expected)
+
+    def test_report(self):
+        self.expense(amount=100, paid_to='Vendor')
+        self.expense(amount=300, paid_to='Landlord', date=datetime.date(2026, 5, 1))
+        self.expense(self.other, amount=1000)
+        report = ledger.report(datetime.date(2026, 2, 1), datetime.date(2026, 5, 1), self.company.id)
+        self.assertEqual([(m['month'], m['total']) for m in report['by_month']],
+                         [('2026-02', 0), ('2026-03', 100), ('2026-04', 0), ('2026-05', 300)])
+        self.assertEqual([p['paid_to'] for p in report['by_payee']], ['Landlord', 'Vendor'])
+        self.assertEqual(ledger.totals(datetime.date(2026, 3, 9)), {'total_expense': 1400, 'monthly_expense': 1100})
+
+    def test_report_view(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(admin)
+        self.expense()
+        body = self.client.get(reverse('expense_report'), {'from': '2026-03', 'to': '2026-03'}).json()
+        self.assertEqual((body['total'], body['count']), ('100.00', 1))  # Decimal, serialised as a string
+        self.assertEqual(self.client.get(reverse('expense_report'), {'from': 'March'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('expense_report'), {'from': '2020-01', 'to': '2026-01'}).status_code, 400)
+
+
+class TenancyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(employees=4, days=3, leads=20, batches=1, clients_per_batch=1)
+        cls.other = Company.objects.create(name='Gainers Abroad', address='Sylhet')
+        cls.outsider = Employee.objects.create(user=User.objects.create(username='abroad'), company=cls.other,
+                                               full_name='Abroad', designation='Sales', joining_date=datetime.date(2025, 1, 1))
+        Lead.objects.create(name='Abroad lead', phone='01911111111', assigned_to=cls.outsider)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rows_take_the_company_of_their_owner(self):
+        lead = Lead.objects.get(name='Abroad lead')
+        self.assertEqual(lead.company_id, self.other.id)
+        self.assertEqual(Attendance.objects.create(employee=self.outsider, status='Present').company_id, self.other.id)
+        with tenancy.activate(self.other.id):
+            self.assertEqual(Lead.objects.create(name='Walk-in', phone='01922222222').company_id, self.other.id)
+
+    def test_reassigned_rows_follow_their_new_owner(self):
+        lead = Lead.objects.filter(company=self.data['company']).first()
+        lead.assigned_to = self.outsider
+        lead.save()
+        self.assertEqual(Lead.objects.get(pk=lead.pk).company_id, self.other.id)
+        lead = Lead.objects.get(pk=lead.pk)
+        lead.assigned_to = None  # unassigned: stays where it is
+        lead.save()
+        self.assertEqual(Lead.objects.get(pk=lead.pk).company_id, self.other.id)
+        self.client.force_login(self.data['admin'])
+        self.assertNotContains(self.client.get(reverse('admin:documents_lead_add')), 'name="company"')
+
+    def test_moving_a_client_refreshes_both_coordinators(self):
+        from . import cache as fragments
+
+        new_batch = Batch.objects.create(name='Abroad batch', coordinator=self.outsider)
+        old_coordinator = self.data['batch'].coordinator_id
+        keys = [fragments.fragment_key('employee', old_coordinator, 'batches'),
+                fragments.fragment_key('employee', self.outsider.id, 'batches'),
+                fragments.fragment_key('admin', fragments.company_owner(self.data['company'].id), 'cms')]
+        cache.set_many(dict.fromkeys(keys, 'stale'))
+        client = EnrolledClient.objects.get(pk=self.data['client'].pk)
+        client.batch = new_batch
+        client.save()
+        self.assertEqual(cache.get_many(keys), {})
+
+    def test_scoped_manager(self):
+        self.assertEqual(Lead.scoped.count(), Lead.objects.count())  # nothing active: every company
+        with tenancy.activate(self.other.id):
+            self.assertEqual(list(Lead.scoped.values_list('name', flat=True)), ['Abroad lead'])
+            self.assertEqual(list(Employee.scoped.all()), [self.outsider])
+            self.assertEqual(EnrolledClient.scoped.count(), 0)
+
+    def test_admin_dashboard_follows_the_switcher(self):
+        self.client.force_login(self.data['admin'])
+        first = self.client.get(reverse('home'))
+        self.assertEqual(first.context['total_leads'], 20)  # oldest company until one is picked
+        self.client.post(reverse('switch_company'), {'company_id': self.other.id})
+        second = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual((second.context['total_leads'], list(second.context['employees'])), (1, [self.outsider]))
+        self.assertEqual(self.client.post(reverse('switch_company'), {'company_id': 999}).status_code, 404)
+
+    def test_expense_report_follows_the_switcher(self):
+        self.client.force_login(self.data['admin'])
+        first = self.client.get(reverse('expense_report'))
+        self.client.post(reverse('switch_company'), {'company_id': self.other.id})
+        second = self.client.get(reverse('expense_report'), HTTP_IF_NONE_MATCH=first['ETag'],
+                                 HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['count'], 0)
+
+    def test_employees_stay_in_their_company(self):
+        self.client.force_login(self.outsider.user)
+        self.assertEqual(self.client.post(reverse('switch_company'), {'company_id': self.data['company'].id}).status_code, 403)
+        self.client.get(reverse('home'))
+        self.assertEqual(self.client.session[tenancy.COMPANY_SESSION_KEY], self.other.id)
+
+    def test_demoted_superuser_loses_admin_at_once(self):
+        admin = self.data['admin']
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get(reverse('expense_report')).status_code, 200)
+        User.objects.filter(pk=admin.pk).update(is_superuser=False)
+        self.assertEqual(self.client.get(reverse('expense_report')).status_code, 403)
+
+    def test_requests_without_a_company_see_nothing(self):
+        with tenancy.activate(None):  # what a request resolving no company looks like
+            self.assertEqual(Lead.scoped.count(), 0)
+            self.assertEqual(EnrolledClient.scoped.count(), 0)
+
+    def test_coverage_designation_stays_in_the_company(self):
+        self.client.force_login(self.data['admin'])
+        day = datetime.date.today().isoformat()
+        params = {'from': day, 'to': day, 'designation': 'Sales'}
+        days = self.client.get(reverse('leave_coverage'), params).json()['days']
+        self.assertEqual(days[0]['headcount'], 2)  # not the other company's salesperson
+        self.client.post(reverse('switch_company'), {'company_id': self.other.id})
+        self.assertEqual(self.client.get(reverse('leave_coverage'), params).json()['days'][0]['headcount'], 1)
+
+    def test_support_events_go_to_the_company_admins(self):
+        self.assertEqual(events.coordinator_channels(self.outsider.id),
+                         [events.admin_channel(self.other.id), events.user_channel(self.outsider.user_id)])
+
+
+
+class Flaky(Exception):
+    code = 503
+
+
+@override_settings(SHEETS_BACKEND='fake', SHEETS_LEADS_KEY='', SHEETS_REQUESTS_PER_MINUTE=0)
+class SheetsTests(TestCase):
+    HEADER = ['Name/নাম', 'WhatsApp Number/নাম্বার', 'Email/ইমেল']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Gainers Future', address='Dhaka')
+        Lead.objects.create(company=cls.company, name='Known', phone='01700000001')
+
+    def setUp(self):
+        cache.clear()
+        sheets.reset()
+        self.fake = sheets.backend()
+        self.fake.load(sheets.LEADS_SHEET, {sheets.LEADS_RANGE: [
+            self.HEADER,
+            ['Rahim', '01700000001', ''],           # already a lead
+            ['Karim', '01700000002', 'k@example.com'],
+            ['Karim again', '01700000002', ''],     # duplicate row
+            ['', '', ''],
+            ['Salma', ' 01700000003 ', ''],
+        ]})
+        self.sleeps = []
+        patcher = mock.patch('documents.sheets._sleep', self.sleeps.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(sheets.reset)
+
+    def test_sync_imports_new_phones_once(self):
+        with self.assertNumQueries(5):  # company, existing phones, savepoint, insert, release
+            self.assertEqual(sheets.sync_leads(), 2)
+        added = Lead.objects.filter(source='Google Sheet').order_by('phone')
+        self.assertEqual([(l.name, l.phone, l.company_id) for l in added],
+                         [('Karim', '01700000002', self.company.id), ('Salma', '01700000003', self.company.id)])
+        self.assertEqual(sheets.sync_leads(), 0)
+        # Looked up by name once, then one batch read per sync
+        self.assertEqual([c[0] for c in self.fake.calls], ['key_for', 'batch_get', 'batch_get'])
+
+    def test_archived_phones_are_not_imported_again(self):
+        old = timezone.now() - datetime.timedelta(days=400)
+        Lead.objects.create(company=self.company, name='Karim', phone='01700000002', status='No_Response')
+        Lead.objects.filter(phone='01700000002').update(created_at=old, updated_at=old)
+        with tempfile.TemporaryDirectory() as tmp, override_settings(ARCHIVE_DIR=tmp):
+            self.assertEqual(archive.archive('leads')[0], 1)
+            self.assertEqual(sheets.sync_leads(), 1)
+        self.assertEqual(list(Lead.objects.filter(source='Google Sheet').values_list('phone', flat=True)), ['01700000003'])
+
+    def test_pinned_key_skips_the_lookup(self):
+        key = self.fake.keys[sheets.LEADS_SHEET]
+        with override_settings(SHEETS_LEADS_KEY=key):
+            self.assertEqual(len(sheets.batch_get(sheets.LEADS_SHEET, ['A1:Z', 'B1:B'])), 2)
+        self.assertEqual(self.fake.calls, [('batch_get', key, ('A1:Z', 'B1:B'))])
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        read, failures = self.fake.batch_get, [Flaky(), Flaky()]
+
+        def flaky(key, ranges):
+            if failures:
+                raise failures.pop()
+            return read(key, ranges)
+
+        with mock.patch.object(self.fake, 'batch_get', flaky):
+            self.assertEqual(len(sheets.fetch_records()), 4)
+        self.assertTrue(1 <= self.sleeps[0] <= 2 <= self.sleeps[1] <= 3)  # 1s, 2s, plus up to 1s jitter
+        with mock.patch.object(self.fake, 'batch_get', side_effect=sheets.SheetsError('gone')):
+            with self.assertRaises(sheets.SheetsError):
+                sheets.fetch_records()
+        self.assertEqual(len(self.sleeps), 2)  # permanent errors are not retried
+
+    def test_requests_are_spaced_to_the_quota(self):
+        with override_settings(SHEETS_REQUESTS_PER_MINUTE=60), mock.patch('documents.sheets._throttle', sheets._Throttle()):
+            sheets.fetch_records()
+            sheets.fetch_records()
+        # Key lookup, then two reads: one second apart each (the sleeps are not real here)
+        self.assertEqual([round(s) for s in self.sleeps], [1, 2])
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('sync_sheets', '--company', str(self.company.id), stdout=out)
+        self.assertTrue(out.getvalue().startswith('2 new leads'))
+
+
+@mock.patch('documents.views.render_pdf', fake_pdf)
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(employees=3, days=5, leads=10, batches=1, clients_per_batch=1)
+
+    def test_unchanged_pdf_is_304_without_rendering(self):
+        url = reverse('print_id_card', args=[self.data['employee'].id])
+        first = self.client.get(url)
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+        with self.assertNumQueries(1), mock.patch('documents.views.render_to_string') as render:
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        render.assert_not_called()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        url = reverse('print_id_card', args=[self.data['employee'].id])
+        etag = self.client.get(url)['ETag']
+        Employee.objects.filter(pk=self.data['employee'].pk).update(designation='Lead')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)  # update() is invisible...
+        with self.captureOnCommitCallbacks(execute=True):  # outside a request, bumps run on commit
+            leave.adjust(self.data['employee'].id, 'Casual', 1)  # ...unless the writer touches the watermark
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Employee.objects.get(pk=self.data['employee'].pk).save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_request_bumps_once(self):
+        self.client.force_login(self.data['admin'])
+        before = ChangeWatermark.objects.get(name='documents.lead').version
+        self.client.post(reverse('distribute_leads'), {'employee_id': self.data['employee'].id})
+        self.assertEqual(ChangeWatermark.objects.get(name='documents.lead').version, before + 1)
+
+    @mock.patch('documents.watermarks._bucket', lambda period: None)  # don't straddle a minute
+    def test_dashboard_etag_is_per_user(self):
+        self.client.force_login(self.data['admin'])
+        self.client.get(reverse('home'))  # picks up the CSRF cookie, which is part of the ETag
+        first = self.client.get(reverse('home'))
+        self.assertEqual(self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.client.force_login(self.data['employee'].user)
+        self.assertEqual(self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+
+class PortalApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(employees=3, days=5, leads=12, batches=1, clients_per_batch=2)
+
+    def test_employee_summary(self):
+        employee = self.data['employee']
+        self.client.force_login(employee.user)
+        body = self.client.get(reverse('employee_summary')).json()
+        self.assertEqual(body['attendance']['status'], 'Active')  # seed leaves today's check-out open
+        self.assertEqual(body['attendance']['in_time'], '09:00:00')
+        monthly = SalesMonthly.objects.get(employee=employee, month=analytics.month_start(datetime.date.today()))
+        self.assertEqual(body['sales'], {'month_total': monthly.total, 'projected_commission': monthly.commission})
+        self.assertEqual(body['new_leads'], Lead.objects.filter(assigned_to=employee, status='New').count())
+        self.assertEqual(body['leave']['pending'], 1)
+        self.assertEqual(body['queue']['open_tickets'], SupportTicket.objects.filter(coordinator=employee).count())
+        with self.assertNumQueries(1):
+            portal.employee_summary(employee.id, timezone.localtime(timezone.now()))
+
+    def test_client_summary(self):
+        client = self.data['client']
+        client.task_cv = True
+        client.save()
+        SupportTicket.objects.create(client=client, subject='Visa', description='Docs')
+        self.client.force_login(client.user)
+        response = self.client.get(reverse('client_summary'))
+        body = response.json()
+        self.assertEqual(body['progress'], client.get_progress())
+        self.assertEqual(body['coordinator'], client.batch.coordinator.full_name)
+        self.assertEqual([t['subject'] for t in body['tickets']], ['Visa', 'Help'])
+        self.assertEqual(self.client.get(reverse('client_summary'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_client_without_tickets(self):
+        client = self.data['client']
+        SupportTicket.objects.filter(client=client).delete()
+        self.client.force_login(client.user)
+        body = self.client.get(reverse('client_summary')).json()
+        self.assertEqual((body['name'], body['tickets']), (client.name, []))
+        with self.assertNumQueries(1):
+            portal.client_summary(client.id)
+
+    def test_roles(self):
+        self.client.force_login(self.data['client'].user)
+        self.assertEqual(self.client.get(reverse('employee_summary')).status_code, 403)
+        self.client.force_login(self.data['employee'].user)
+        self.assertEqual(self.client.get(reverse('client_summary')).status_code, 403)
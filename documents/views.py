@@ -1,5 +1,5 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import authenticate, login, logout
@@ -7,6 +7,7 @@ from django.contrib.auth.models import User
 from django.template.loader import render_to_string
 from django.db.models import Sum, Q, Count
 from django.utils import timezone
+from django.conf import settings
 import datetime
 import calendar
 import json
@@ -15,24 +16,18 @@ import io
 import os
 import random
 
-# Google Sheets Integration
-try:
-    import gspread
-    from oauth2client.service_account import ServiceAccountCredentials
-except ImportError:
-    pass
-
-# PDF Generation
-try:
-    from weasyprint import HTML
-except ImportError:
-    pass
-
 # Import Models
 from .models import (
     Employee, Expense, Company, Attendance, LeaveRequest, 
     SalesRecord, Lead, Batch, EnrolledClient, SupportTicket, CallRequest
 )
+from . import analytics, archive, cache, coverage, events, exports, instrumentation, leave, ledger, portal, profiling, sheets, support, tenancy, watermarks
+from .pdf import render_pdf  # WeasyPrint / gspread load lazily, see pdf.py and sheets.py
+from .middleware import remember_role
+from .routers import reads_from_replica
+
+# Dashboards show "x minutes ago" and live durations, so their ETags also roll over every minute
+dashboard_conditional = watermarks.conditional(*watermarks.ALL, per_user=True, period=60)
 
 # ==========================================
 # 1. AUTHENTICATION & ROUTING
@@ -46,11 +41,9 @@ def login_view(request):
             login(request, user)
             
             # Smart Redirect based on Role
-            if hasattr(user, 'enrolledclient'): # Student/Client
+            if remember_role(request, user) == 'client': # Student/Client
                 return redirect('client_portal')
-            elif user.is_superuser or hasattr(user, 'employee'): # Admin/Staff
-                return redirect('home')
-            else:
+            else: # Admin/Staff
                 return redirect('home')
     else:
         form = AuthenticationForm()
@@ -61,13 +54,24 @@ def logout_view(request):
     return redirect('login')
 
 @login_required(login_url='login')
+def switch_company(request):
+    """ Superusers pick the company their dashboard, reports and exports work in """
+    if not request.user.is_superuser: return HttpResponse(status=403)
+    if request.method == 'POST':
+        company = get_object_or_404(Company, pk=request.POST.get('company_id') or 0)
+        tenancy.remember_company(request, company.pk)
+    return redirect('home')
+
+@login_required(login_url='login')
+@reads_from_replica
+@dashboard_conditional
 def dashboard(request):
     """ Main Router """
-    if request.user.is_superuser:
+    if request.role == 'admin':
         return admin_dashboard(request)
-    elif hasattr(request.user, 'employee'):
+    elif request.role == 'employee':
         return employee_dashboard(request)
-    elif hasattr(request.user, 'enrolledclient'):
+    elif request.role == 'client':
         return client_portal(request)
     else:
         return HttpResponse("Access Denied: No Profile Found.", status=403)
@@ -79,48 +83,49 @@ def dashboard(request):
 def admin_dashboard(request):
     query = request.GET.get('q')
     
-    # 1. Filter Logic
+    # 1. Filter Logic (every query below is limited to the active company, see tenancy.py)
     if query:
-        employees = Employee.objects.filter(Q(full_name__icontains=query) | Q(designation__icontains=query))
-        expenses = Expense.objects.filter(description__icontains=query)
-        leads = Lead.objects.filter(Q(name__icontains=query) | Q(phone__icontains=query))
+        employees = Employee.scoped.filter(Q(full_name__icontains=query) | Q(designation__icontains=query))
+        expenses = Expense.scoped.filter(description__icontains=query)
+        leads = Lead.scoped.filter(Q(name__icontains=query) | Q(phone__icontains=query)).select_related('assigned_to')
     else:
-        employees = Employee.objects.all()
-        expenses = Expense.objects.all().order_by('-date')[:10]
-        leads = Lead.objects.all().order_by('-created_at')[:50]
+        employees = Employee.scoped.all()
+        expenses = Expense.scoped.all().order_by('-date')[:10]
+        leads = Lead.scoped.select_related('assigned_to').order_by('-created_at')[:50]
 
     today = datetime.date.today()
-    todays_attendance = Attendance.objects.filter(date=today)
+    company_id = tenancy.active()
+    owner = cache.company_owner(company_id)
+    todays_attendance = Attendance.scoped.filter(date=today).select_related('employee')
     
     # 2. Stats
     present_today = todays_attendance.filter(status='Present').count()
     late_today = todays_attendance.filter(status='Late').count()
-    pending_leaves = LeaveRequest.objects.filter(status='Pending')
+    pending_leaves = LeaveRequest.scoped.filter(status='Pending').select_related('employee')
     
     # Financials
-    try:
-        total_expense = Expense.objects.aggregate(Sum('amount'))['amount__sum'] or 0
-        current_month_start = today.replace(day=1)
-        monthly_expense = Expense.objects.filter(date__gte=current_month_start).aggregate(Sum('amount'))['amount__sum'] or 0
-    except:
-        total_expense = 0
-        monthly_expense = 0
+    financials = cache.fragment('admin', owner, 'finance', lambda: ledger.totals(today, company_id))
+    leaderboard = cache.fragment('admin', owner, 'leaderboard', lambda: analytics.leaderboard(today, company_id=company_id))
 
     # CMS & CRM Data
-    total_leads = Lead.objects.count()
-    new_leads = Lead.objects.filter(status='New').count()
-    enrolled_leads = Lead.objects.filter(status='Enrolled').count()
-    unassigned_leads = Lead.objects.filter(assigned_to__isnull=True).count()
-    
-    batches = Batch.objects.all().order_by('-created_at')
-    clients = EnrolledClient.objects.all().order_by('-joined_date')[:20]
-    pending_issues = SupportTicket.objects.filter(status='Pending').order_by('created_at')
-    pending_calls = CallRequest.objects.filter(status='Pending').order_by('created_at')
+    crm = cache.fragment('admin', owner, 'crm', lambda: {
+        'total_leads': Lead.scoped.count(),
+        'new_leads': Lead.scoped.filter(status='New').count(),
+        'enrolled_leads': Lead.scoped.filter(status='Enrolled').count(),
+        'unassigned_leads': Lead.scoped.filter(assigned_to__isnull=True).count(),
+    })
+    cms = cache.fragment('admin', owner, 'cms', lambda: {
+        'batches': list(Batch.scoped.select_related('coordinator').annotate(student_count=Count('students')).order_by('-created_at')),
+        'clients': list(EnrolledClient.scoped.select_related('batch').order_by('-joined_date')[:20]),
+    })
+    pending_issues = support.ticket_queue(page=request.GET.get('tickets_page'))
+    pending_calls = support.call_queue(page=request.GET.get('calls_page'))
 
     # Employee Status Check for Admin View
     now_time = datetime.datetime.now().time()
+    attendance_by_emp = {a.employee_id: a for a in todays_attendance}
     for emp in employees:
-        attn = Attendance.objects.filter(employee=emp, date=today).first()
+        attn = attendance_by_emp.get(emp.id)
         emp.attn_status = 'Pending'
         emp.check_in_time = None
         
@@ -146,21 +151,22 @@ def admin_dashboard(request):
         'pending_leaves': pending_leaves,
         'pending_count': pending_leaves.count(),
         'emp_count': employees.count(),
-        'total_expense': total_expense,
-        'monthly_expense': monthly_expense,
+        **financials,
+        'leaderboard': leaderboard,
         'today': today,
         'search_query': query,
         # CRM
         'leads': leads,
-        'total_leads': total_leads,
-        'new_leads': new_leads,
-        'enrolled_leads': enrolled_leads,
-        'unassigned_leads': unassigned_leads,
+        **crm,
         # CMS
-        'batches': batches,
-        'clients': clients,
+        **cms,
         'pending_issues': pending_issues,
         'pending_calls': pending_calls,
+        'sla': support.sla_summary(),
+        'companies': cache.fragment('admin', cache.GLOBAL_OWNER, 'companies',
+                                    lambda: list(Company.objects.order_by('pk').values_list('pk', 'name'))),
+        'active_company': company_id,
+        'live_events': events.streaming(request),
     }
     return render(request, 'dashboard.html', context)
 
@@ -175,53 +181,37 @@ def employee_dashboard(request):
     
     # 1. Attendance Logic
     attendance = Attendance.objects.filter(employee=employee, date=today_date).first()
-    attn_status = 'Pending'
-    can_checkout = False
-    in_time_display = None
-    out_time_display = None
-    work_duration = "0h 0m"
-
-    if attendance:
-        in_time_display = attendance.in_time
-        out_time_display = attendance.out_time
-        if attendance.out_time:
-            attn_status = 'Completed'
-            dummy = datetime.date(2000, 1, 1)
-            d1 = datetime.datetime.combine(dummy, attendance.in_time)
-            d2 = datetime.datetime.combine(dummy, attendance.out_time)
-            diff = (d2 - d1).total_seconds()
-            work_duration = f"{int(diff//3600)}h {int((diff%3600)//60)}m"
-        else:
-            attn_status = 'Active'
-            dummy = datetime.date(2000, 1, 1)
-            t1 = datetime.datetime.combine(dummy, attendance.in_time)
-            t2 = datetime.datetime.combine(dummy, now.time())
-            diff = (t2 - t1).total_seconds()
-            if diff >= 3600:
-                can_checkout = True
-            hours = int(diff // 3600)
-            minutes = int((diff % 3600) // 60)
-            work_duration = f"{hours}h {minutes}m"
+    in_time_display = attendance.in_time if attendance else None
+    out_time_display = attendance.out_time if attendance else None
+    attn_status, work_duration, can_checkout = portal.work_state(in_time_display, out_time_display, now)
 
     # 2. History & Sales
-    my_logs = Attendance.objects.filter(employee=employee).order_by('-date')[:5]
     month_start = today_date.replace(day=1)
-    my_sales = SalesRecord.objects.filter(employee=employee, date__gte=month_start).aggregate(Sum('count'))['count__sum'] or 0
-    my_leaves = LeaveRequest.objects.filter(employee=employee).order_by('-start_date')[:5]
+    my_logs = cache.fragment('employee', employee.id, 'history',
+        lambda: list(Attendance.objects.filter(employee=employee).order_by('-date')[:5]))
+    # Rank is cached with the employee's own total, so others' sales can take up to the TTL to move it
+    my_sales = cache.fragment('employee', employee.id, 'sales', lambda: analytics.standing(employee.id, month_start, employee.company_id))
+    my_leaves = cache.fragment('employee', employee.id, 'leaves',
+        lambda: list(LeaveRequest.objects.filter(employee=employee).order_by('-start_date')[:5]))
 
     # 3. CRM Leads (My Leads)
-    my_leads = Lead.objects.filter(assigned_to=employee).order_by('-created_at')
-    status_counts = my_leads.values('status').annotate(count=Count('status'))
-    lead_summary = {item['status']: item['count'] for item in status_counts}
-    new_assigned_leads = my_leads.filter(status='New')
+    def leads_fragment():
+        my_leads = list(Lead.objects.filter(assigned_to=employee).order_by('-created_at'))
+        summary = {}
+        for lead in my_leads:
+            summary[lead.status] = summary.get(lead.status, 0) + 1
+        return {'all': my_leads, 'new': [l for l in my_leads if l.status == 'New'], 'summary': summary}
+    leads = cache.fragment('employee', employee.id, 'leads', leads_fragment)
 
     # 4. CMS Data (Coordinator)
-    my_batches = Batch.objects.filter(coordinator=employee)
-    my_tickets = SupportTicket.objects.filter(client__batch__coordinator=employee, status='Pending')
-    my_calls = CallRequest.objects.filter(client__batch__coordinator=employee, status='Pending')
+    my_batches = cache.fragment('employee', employee.id, 'batches',
+        lambda: list(Batch.objects.filter(coordinator=employee).annotate(student_count=Count('students'))))
+    my_tickets = support.ticket_queue(employee, page=request.GET.get('tickets_page'))
+    my_calls = support.call_queue(employee, page=request.GET.get('calls_page'))
 
     return render(request, 'employee_dashboard.html', {
         'employee': employee,
+        'live_events': events.streaming(request),
         'attendance': attendance,
         'status': attn_status,
         'can_checkout': can_checkout,
@@ -229,24 +219,28 @@ def employee_dashboard(request):
         'out_time': out_time_display,
         'duration': work_duration,
         'history': my_logs,
-        'sales_count': my_sales,
+        'sales_count': my_sales['total'],
+        'sales_rank': my_sales['rank'],
+        'projected_commission': my_sales['commission'],
         'my_leaves': my_leaves,
-        'all_leads': my_leads,
-        'new_leads': new_assigned_leads,
-        'lead_summary': lead_summary,
+        'all_leads': leads['all'],
+        'new_leads': leads['new'],
+        'lead_summary': leads['summary'],
         'my_batches': my_batches,
         'my_tickets': my_tickets,
         'my_calls': my_calls,
+        'sla': support.sla_summary(employee),
         'today': now
     })
 
 # --- CLIENT PORTAL ---
 @login_required
+@reads_from_replica
+@dashboard_conditional
 def client_portal(request):
-    try:
-        client = request.user.enrolledclient
-    except:
+    if request.role != 'client':
         return redirect('home')
+    client = request.user.enrolledclient
 
     if request.method == 'POST':
         if 'submit_issue' in request.POST:
@@ -264,7 +258,8 @@ def client_portal(request):
     coordinator = client.batch.coordinator if client.batch else None
     
     # Fetch Client's Tickets
-    my_tickets = SupportTicket.objects.filter(client=client).order_by('-created_at')
+    my_tickets = cache.fragment('client', client.id, 'tickets',
+        lambda: list(SupportTicket.objects.filter(client=client).order_by('-created_at')))
 
     return render(request, 'client_dashboard.html', {
         'client': client,
@@ -339,27 +334,29 @@ def manage_leave(request):
     if request.method == 'POST':
         if 'apply_leave' in request.POST:
             emp_id = request.POST.get('employee_id')
-            if not emp_id and hasattr(request.user, 'employee'):
+            if not emp_id and request.role == 'employee':
                 emp_id = request.user.employee.id
             if emp_id:
-                LeaveRequest.objects.create(
-                    employee_id=emp_id, leave_type=request.POST.get('leave_type'),
-                    start_date=request.POST.get('start_date'), end_date=request.POST.get('end_date'),
-                    reason=request.POST.get('reason') or "Personal", status='Pending'
-                )
-        elif 'approve_id' in request.POST:
-            req = get_object_or_404(LeaveRequest, id=request.POST.get('approve_id'))
-            req.status = 'Approved'
-            req.save()
-            emp = req.employee
+                try:
+                    leave.apply(emp_id, request.POST.get('leave_type'), request.POST.get('start_date'),
+                                request.POST.get('end_date'), request.POST.get('reason'))
+                except leave.LeaveError as e:
+                    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+                    return HttpResponse(str(e), status=400)
+        elif request.role == 'admin' and ('approve_id' in request.POST or 'approve_ids' in request.POST):
+            # approve_id from a single card, approve_ids from the batch checkboxes
+            ids = request.POST.getlist('approve_ids') or [request.POST.get('approve_id')]
             try:
-                d1 = datetime.datetime.strptime(str(req.start_date), "%Y-%m-%d")
-                d2 = datetime.datetime.strptime(str(req.end_date), "%Y-%m-%d")
-                days = abs((d2 - d1).days) + 1
-                if req.leave_type == 'Sick': emp.sick_leave_bal = max(0, emp.sick_leave_bal - days)
-                elif req.leave_type == 'Casual': emp.casual_leave_bal = max(0, emp.casual_leave_bal - days)
-                emp.save()
-            except: pass
+                approved = leave.approve([i for i in ids if i and i.isdigit()], user=request.user)
+            except leave.LeaveError as e:
+                if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                    return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+                return HttpResponse(str(e), status=400)
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return JsonResponse({'status': 'success', 'approved': [r.id for r in approved]})
+            if 'print' in request.POST and len(approved) == 1:
+                return redirect('print_leave_approval', leave_id=approved[0].id)
     return redirect('home')
 
 def add_sales(request):
@@ -389,15 +386,15 @@ def distribute_leads(request):
     if request.method == 'POST':
         amount = int(request.POST.get('amount') or 10)
         emp_id = request.POST.get('employee_id')
-        leads = Lead.objects.filter(assigned_to__isnull=True, status='New')[:amount]
+        leads = Lead.scoped.filter(assigned_to__isnull=True, status='New')[:amount]
         if emp_id:
-            emp = Employee.objects.get(id=emp_id)
+            emp = Employee.scoped.get(id=emp_id)
             for lead in leads:
                 lead.assigned_to = emp
                 lead.assigned_date = timezone.now()
                 lead.save()
         else:
-            employees = Employee.objects.all()
+            employees = list(Employee.scoped.all())
             if employees and leads:
                 for i, lead in enumerate(leads):
                     emp = employees[i % len(employees)]
@@ -413,7 +410,7 @@ def update_lead_status(request):
         if request.POST.get('note'): lead.note = request.POST.get('note')
         lead.save()
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-            return JsonResponse({'status': 'success', 'new_status': status})
+            return JsonResponse({'status': 'success', 'new_status': lead.status})
     return redirect('home')
 
 def create_batch(request):
@@ -442,6 +439,8 @@ def add_enrolled_client(request):
         except Exception as e: print(e)
     return redirect('home')
 
+@reads_from_replica
+@watermarks.conditional(Batch, EnrolledClient, Employee)
 def batch_details(request, batch_id):
     batch = get_object_or_404(Batch, id=batch_id)
     clients = batch.students.all()
@@ -460,39 +459,22 @@ def update_client_task(request):
 
 def resolve_issue(request, issue_id):
     issue = get_object_or_404(SupportTicket, id=issue_id)
-    issue.status = 'Resolved'
-    issue.resolved_at = timezone.now()
-    issue.save()
+    if issue.status == 'Pending':
+        support.resolve_ticket(issue)
     return redirect('home')
 
 def complete_call_request(request, req_id):
     req = get_object_or_404(CallRequest, id=req_id)
-    req.status = 'Done'
-    req.save()
+    if req.status == 'Pending':
+        support.complete_call(req)
     return redirect('home')
 
 def sync_google_sheets(request):
-    """ Connects to Google Sheet and imports leads """
+    """ Imports new leads from the Google Sheet into the active company (manage.py sync_sheets does it from cron) """
     if not request.user.is_superuser: return redirect('home')
     response_data = {'status': 'error', 'message': 'Unknown Error'}
     try:
-        import gspread
-        from oauth2client.service_account import ServiceAccountCredentials
-        if not os.path.exists('credentials.json'): raise FileNotFoundError("credentials.json missing.")
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
-        sheet = client.open("Gainers_Leads").sheet1
-        data = sheet.get_all_records()
-        count = 0
-        for row in data:
-            name = row.get('Name/নাম', '') or row.get('Name', '')
-            phone = str(row.get('WhatsApp Number/নাম্বার', '') or row.get('Phone', '')).strip()
-            email = row.get('Email/ইমেল', '') or row.get('Email', '')
-            if phone and not Lead.objects.filter(phone=phone).exists():
-                Lead.objects.create(name=name, phone=phone, email=email, source='Google Sheet', status='New')
-                count += 1
-        response_data = {'status': 'success', 'count': count}
+        response_data = {'status': 'success', 'count': sheets.sync_leads()}
     except Exception as e:
         response_data = {'status': 'error', 'message': str(e)}
     if request.headers.get('x-requested-with') == 'XMLHttpRequest': return JsonResponse(response_data)
@@ -502,15 +484,10 @@ def sync_google_sheets(request):
 # 5. PDF GENERATORS
 # ==========================================
 
-def render_pdf(html_string, request, filename):
-    html = HTML(string=html_string, base_url=request.build_absolute_uri())
-    result = html.write_pdf()
-    response = HttpResponse(result, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-    return response
-
+@reads_from_replica
+@watermarks.conditional(Employee, Company, Attendance, SalesRecord, period='month')
 def generate_contract_payslip(request, emp_id):
-    employee = get_object_or_404(Employee, id=emp_id)
+    employee = get_object_or_404(Employee.objects.select_related('company'), id=emp_id)
     company = employee.company
     today = datetime.date.today()
     
@@ -532,9 +509,9 @@ def generate_contract_payslip(request, emp_id):
     allowance = float(employee.transport_allowance) + float(employee.food_allowance)
     
     sales = SalesRecord.objects.filter(employee=employee, date__range=[month_start, month_end]).aggregate(Sum('count'))['count__sum'] or 0
-    commission = (sales * 400) if sales <= 10 else ((10 * 400) + ((sales - 10) * 500))
-    bonus = 1000 if sales > 10 else 0
-    gross = base + allowance + commission + bonus
+    commission = analytics.commission(sales)
+    bonus = analytics.bonus(sales)
+    gross = base_salary + allowance + commission + bonus
     
     html = render_to_string('smart_payslip.html', {
         'employee': employee, 
@@ -543,57 +520,221 @@ def generate_contract_payslip(request, emp_id):
         'stats': {'present': present_days, 'late': late_days, 'sales': sales},
         'financials': {
             'base': int(base_salary), 
-            'transport': int(transport_allowance), 
-            'food': int(food_allowance), 
+            'transport': int(employee.transport_allowance), 
+            'food': int(employee.food_allowance), 
             'commission': int(commission), 
             'bonus': int(bonus), 
             'gross': int(gross)
         }
     })
-    return render_pdf(html, request, f"Payslip_{employee.full_name}.pdf")
+    return render_pdf(html, request, f"Payslip_{employee.full_name}.pdf", stylesheet='smart_payslip')
 
 # Standard PDF Wrappers (ARGUMENTS FIXED HERE)
+@reads_from_replica
+@watermarks.conditional(Employee, Company, period='day')
 def generate_pdf(request, emp_id):
-    emp = get_object_or_404(Employee, id=emp_id)
+    emp = get_object_or_404(Employee.objects.select_related('company'), id=emp_id)
     html = render_to_string('appointment_letter.html', {'employee': emp, 'company': emp.company})
-    return render_pdf(html, request, "Appointment.pdf")
+    return render_pdf(html, request, "Appointment.pdf", stylesheet='appointment_letter')
 
+@reads_from_replica
+@watermarks.conditional(Employee, Company)
 def generate_id_card(request, emp_id):
-    emp = get_object_or_404(Employee, id=emp_id)
+    emp = get_object_or_404(Employee.objects.select_related('company'), id=emp_id)
     html = render_to_string('id_card.html', {'employee': emp, 'company': emp.company, 'base_url': request.build_absolute_uri('/')[:-1]})
-    return render_pdf(html, request, "ID_Card.pdf")
+    return render_pdf(html, request, "ID_Card.pdf", stylesheet='id_card')
 
+@reads_from_replica
+@watermarks.conditional(Expense, Company)
 def generate_voucher(request, expense_id):
-    exp = get_object_or_404(Expense, id=expense_id)
+    exp = get_object_or_404(Expense.objects.select_related('company'), id=expense_id)
     html = render_to_string('expense_voucher.html', {'expense': exp, 'company': exp.company})
-    return render_pdf(html, request, "Voucher.pdf")
+    return render_pdf(html, request, "Voucher.pdf", stylesheet='expense_voucher')
 
+def _sheet_company():
+    # The active company; print links opened without a session fall back to the oldest one
+    company_id = tenancy.active()
+    companies = Company.objects.order_by('pk')
+    return (companies.filter(pk=company_id) if company_id else companies).first()
+
+@reads_from_replica
+@watermarks.conditional(Employee, Company, period='month', per_company=True)
 def generate_salary_sheet(request):
-    emps = Employee.objects.all()
-    comp = Company.objects.first()
+    comp = _sheet_company()
+    emps = Employee.objects.filter(company=comp)
     if not comp: return HttpResponse("No company found", status=404)
     html = render_to_string('salary_sheet.html', {'employees': emps, 'company': comp, 'month': datetime.date.today().strftime("%B %Y"), 'total_salary': 0})
-    return render_pdf(html, request, "Salary_Sheet.pdf")
+    return render_pdf(html, request, "Salary_Sheet.pdf", stylesheet='salary_sheet')
 
+@reads_from_replica
+@watermarks.conditional(Employee, Company, period='month', per_company=True)
 def generate_attendance_sheet(request):
-    emps = Employee.objects.all()
-    comp = Company.objects.first()
+    comp = _sheet_company()
+    emps = Employee.objects.filter(company=comp)
     if not comp: return HttpResponse("No company found", status=404)
     now = datetime.datetime.now()
     _, num = calendar.monthrange(now.year, now.month)
     html = render_to_string('attendance_sheet.html', {'employees': emps, 'company': comp, 'month': now.strftime("%B %Y"), 'days_range': range(1, num+1)})
-    return render_pdf(html, request, "Attendance_Sheet.pdf")
+    return render_pdf(html, request, "Attendance_Sheet.pdf", stylesheet='attendance_sheet')
 
 def generate_payslip(request, emp_id):
     return generate_contract_payslip(request, emp_id)
 
+@reads_from_replica
+@watermarks.conditional(Employee, Company, period='day')
 def generate_experience_certificate(request, emp_id):
-    emp = get_object_or_404(Employee, id=emp_id)
+    emp = get_object_or_404(Employee.objects.select_related('company'), id=emp_id)
     html = render_to_string('experience_certificate.html', {'employee': emp, 'company': emp.company, 'today': datetime.date.today()})
-    return render_pdf(html, request, "Experience_Certificate.pdf")
+    return render_pdf(html, request, "Experience_Certificate.pdf", stylesheet='experience_certificate')
 
+@reads_from_replica
+@watermarks.conditional(Employee, Company, Attendance, period='day')
 def print_employee_attendance(request, emp_id):
-    emp = get_object_or_404(Employee, id=emp_id)
+    emp = get_object_or_404(Employee.objects.select_related('company'), id=emp_id)
     records = Attendance.objects.filter(employee=emp).order_by('-date')[:30]
     html = render_to_string('single_emp_attendance.html', {'employee': emp, 'company': emp.company, 'records': records})
-    return render_pdf(html, request, "Attn_Log.pdf")
\ No newline at end of file
+    return render_pdf(html, request, "Attn_Log.pdf", stylesheet='single_emp_attendance')
+
+@login_required(login_url='login')
+@watermarks.conditional(LeaveRequest, Employee, Company, per_user=True, period='day')
+def generate_leave_approval(request, leave_id):
+    # Not routed to the replica: "Approve & Print" lands here straight after the approval
+    req = get_object_or_404(LeaveRequest.objects.select_related('employee__company'), id=leave_id, status='Approved')
+    if request.role != 'admin' and req.employee.user_id != request.user.id: return HttpResponse(status=403)
+    html = render_to_string('leave_approval_pdf.html', {'leave': req, 'company': req.employee.company, 'days': leave.leave_days(req)})
+    return render_pdf(html, request, f"Leave_Approval_{req.employee.full_name}.pdf", stylesheet='leave_approval_pdf')
+
+# ==========================================
+# 6. MONITORING
+# ==========================================
+
+@login_required(login_url='login')
+def cache_stats(request):
+    """ Per-process dashboard cache hit ratios, for tuning DASHBOARD_CACHE_TTL """
+    if not request.user.is_superuser: return HttpResponse(status=403)
+    return JsonResponse(cache.stats())
+
+@login_required(login_url='login')
+def perf_summary(request):
+    """ Per-view latency / query / template / PDF timings (needs PERF_INSTRUMENTATION=1); ?sort=<column>, ?format=json """
+    if not request.user.is_superuser: return HttpResponse(status=403)
+    rows = instrumentation.summary()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'enabled': settings.PERF_INSTRUMENTATION, 'views': rows})
+    sort = request.GET.get('sort') if request.GET.get('sort') in instrumentation.SUMMARY_COLUMNS else 'p95_ms'
+    rows.sort(key=lambda r: r[sort], reverse=sort != 'name')  # names A-Z, numbers largest first
+    return render(request, 'perf_summary.html', {'enabled': settings.PERF_INSTRUMENTATION, 'views': rows, 'sort': sort,
+                                                 'columns': instrumentation.SUMMARY_COLUMNS.items(),
+                                                 'size': settings.PERF_SUMMARY_SIZE})
+
+@login_required(login_url='login')
+def profile_list(request):
+    """ Stored ?_profile=1 captures, newest first """
+    if not request.user.is_superuser: return HttpResponse(status=403)
+    return render(request, 'profiles.html', {'profiles': profiling.list_profiles(), 'keep': settings.PROFILE_KEEP})
+
+@login_required(login_url='login')
+def profile_download(request, name):
+    if not request.user.is_superuser: return HttpResponse(status=403)
+    path = profiling.profile_path(name)
+    if path is None: raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
+# ==========================================
+# 7. EXPORTS
+# ==========================================
+
+@login_required(login_url='login')
+@reads_from_replica
+def export_data(request, name, fmt):
+    """ /exports/leads.csv?from=2026-01-01&to=2026-01-31&status=Interested (csv, xlsx, parquet) """
+    if not request.user.is_superuser: return HttpResponse(status=403)
+    try:
+        return exports.export_response(name, fmt, request.GET)
+    except exports.ExportError as e:
+        return HttpResponse(str(e), status=400)
+
+@login_required(login_url='login')
+def archive_query(request, name):
+    """ The active company's archived rows: ?from=&to= (YYYY-MM-DD), equality filters on any column, ?limit= """
+    if not request.user.is_superuser: return HttpResponse(status=403)
+    try:
+        start, end, limit, filters = archive.parse_query(name, request.GET)
+    except archive.ArchiveError as e:
+        return HttpResponse(str(e), status=400)
+    company_id = tenancy.active()
+    rows = archive.rows(name, start, end, limit=limit, **{**filters, 'company_id': company_id}) if company_id else []
+    return JsonResponse({'archive': name, 'count': len(rows), 'rows': rows})
+
+# ==========================================
+# 8. ANALYTICS
+# ==========================================
+
+@login_required(login_url='login')
+@reads_from_replica
+def sales_leaderboard(request):
+    """ Monthly (or ?day=YYYY-MM-DD daily) sales ranking from the roll-up tables """
+    if request.role not in ('admin', 'employee'): return HttpResponse(status=403)
+    try:
+        limit = min(int(request.GET.get('limit', analytics.LEADERBOARD_SIZE)), 100)
+        if request.GET.get('day'):
+            period = datetime.date.fromisoformat(request.GET['day'])
+            rows = analytics.daily_leaderboard(period, limit, tenancy.active())
+        else:
+            period = datetime.date.fromisoformat(request.GET['month'] + '-01') if request.GET.get('month') else datetime.date.today()
+            rows = analytics.leaderboard(period, limit, tenancy.active())
+    except ValueError:
+        return HttpResponse("Use ?month=YYYY-MM or ?day=YYYY-MM-DD", status=400)
+    return JsonResponse({'period': str(period), 'leaders': [{
+        'rank': i, 'employee_id': row.employee_id, 'name': row.employee.full_name, 'total': row.total,
+        'projected_commission': analytics.commission(row.total) + analytics.bonus(row.total),
+    } for i, row in enumerate(rows, 1)]})
+
+@login_required(login_url='login')
+@reads_from_replica
+def leave_coverage(request):
+    """ Staff available per day (overall and per designation), ?from=&to= and optional ?designation= """
+    if request.role != 'admin': return HttpResponse(status=403)
+    try:
+        start, end = coverage.parse_range(request.GET)
+    except coverage.CoverageError as e:
+        return HttpResponse(str(e), status=400)
+    staff = Employee.scoped.filter(designation=request.GET['designation']) if request.GET.get('designation') else None
+    return JsonResponse(coverage.calendar(start, end, staff))
+
+@login_required(login_url='login')
+@reads_from_replica
+@watermarks.conditional(Expense, per_company=True)
+def expense_report(request):
+    """ The active company's spend per month and per payee from the roll-ups, ?from=&to= (YYYY-MM) """
+    if request.role != 'admin': return HttpResponse(status=403)
+    try:
+        start, end = ledger.parse_period(request.GET, datetime.date.today())
+    except ledger.LedgerError as e:
+        return HttpResponse(str(e), status=400)
+    return JsonResponse(ledger.report(start, end, tenancy.active()))
+
+# ==========================================
+# 9. PORTAL APIs
+# ==========================================
+
+@login_required(login_url='login')
+@reads_from_replica
+@watermarks.conditional(Employee, Attendance, SalesRecord, Lead, LeaveRequest, SupportTicket, CallRequest,
+                        per_user=True, period=60)  # duration and can_checkout move with the clock
+def employee_summary(request):
+    """ Today's attendance, month sales, leave and queue counts for the signed-in employee, one query """
+    if request.role != 'employee': return HttpResponse(status=403)
+    summary = portal.employee_summary(request.user.employee.id, timezone.localtime(timezone.now()))
+    if summary is None: raise Http404
+    return JsonResponse(summary)
+
+@login_required(login_url='login')
+@reads_from_replica
+@watermarks.conditional(EnrolledClient, Batch, Employee, SupportTicket, CallRequest, per_user=True)
+def client_summary(request):
+    """ Progress, coordinator and recent tickets for the signed-in client, one query """
+    if request.role != 'client': return HttpResponse(status=403)
+    summary = portal.client_summary(request.user.enrolledclient.id)
+    if summary is None: raise Http404
+    return JsonResponse(summary)
@@ -0,0 +1,149 @@
+"""
+Change watermarks and conditional GET.
+
+ChangeWatermark holds a version counter and a changed_at time per model.
+Saves and deletes bump it through the generic signal receiver; code that
+writes with update() / bulk_create() / raw deletes calls touch() itself.
+Inside a request the bumps are collected and written once, as a single
+UPDATE, when the response is ready (watermark_middleware). Elsewhere
+(jobs, commands) they are written on commit.
+
+@conditional(Model, ...) derives an ETag and Last-Modified from the
+watermarks a view depends on, so a repeat GET of an unchanged dashboard or
+PDF costs one small SELECT and returns 304 without rendering anything.
+Watermarks are per model, not per row: any attendance write changes the
+ETag of every payslip. That's coarse, but never stale.
+"""
+import datetime
+import hashlib
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import tenancy
+from .models import (
+    ChangeWatermark, Company, Employee, Attendance, LeaveRequest, Expense, SalesRecord, Lead, Batch,
+    EnrolledClient, SupportTicket, CallRequest
+)
+
+# Everything the dashboards and documents render from, in a fixed order for the ETag
+ALL = (Attendance, Batch, CallRequest, Company, Employee, EnrolledClient, Expense, Lead, LeaveRequest,
+       SalesRecord, SupportTicket)
+TRACKED = set(ALL)
+
+_pending = ContextVar('watermarks_pending', default=None)
+
+
+def label(model):
+    return model._meta.label_lower
+
+
+def bump(labels):
+    labels = sorted(labels)
+    if not labels:
+        return
+    updated = ChangeWatermark.objects.filter(name__in=labels).update(version=F('version') + 1, changed_at=timezone.now())
+    if updated < len(labels):
+        ChangeWatermark.objects.bulk_create([ChangeWatermark(name=name, version=1) for name in labels],
+                                            ignore_conflicts=True)
+
+
+def touch(*models):
+    """ Mark models as changed. Untracked models are ignored. """
+    labels = {label(m) for m in models if m in TRACKED}
+    if not labels:
+        return
+    pending = _pending.get()
+    if pending is not None:
+        pending.update(labels)
+    else:
+        transaction.on_commit(lambda: bump(labels))
+
+
+@sync_and_async_middleware
+def watermark_middleware(get_response):
+    """ Collect the request's touch() calls and write them in one UPDATE at the end. """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _pending.set(set())
+            try:
+                return await get_response(request)
+            finally:
+                pending = _pending.get()
+                _pending.reset(token)
+                if pending:
+                    await sync_to_async(bump)(pending)
+    else:
+        def middleware(request):
+            token = _pending.set(set())
+            try:
+                return get_response(request)
+            finally:
+                pending = _pending.get()
+                _pending.reset(token)
+                bump(pending)
+    return middleware
+
+
+# --- Conditional GET ---
+
+def _bucket(period):
+    """ Start of the current day / month / `period`-second slot, for pages that change with the clock. """
+    now = timezone.localtime().replace(microsecond=0)
+    if period == 'day':
+        return now.replace(hour=0, minute=0, second=0)
+    if period == 'month':
+        return now.replace(day=1, hour=0, minute=0, second=0)
+    if period:
+        return now - datetime.timedelta(seconds=int(now.timestamp()) % period)
+    return None
+
+
+def _state(request, models, per_user, period, per_company=False):
+    """ (etag, last_modified), worked out once per request with one SELECT. """
+    key = (models, per_user, period, per_company)
+    if not hasattr(request, '_watermark_state'):
+        request._watermark_state = {}
+    if key not in request._watermark_state:
+        rows = {name: (version, changed_at) for name, version, changed_at in ChangeWatermark.objects
+                .filter(name__in=[label(m) for m in models]).values_list('name', 'version', 'changed_at')}
+        bucket = _bucket(period)
+        parts = [request.get_full_path()] + [f'{label(m)}:{rows.get(label(m), (0,))[0]}' for m in models]
+        if bucket:
+            parts.append(bucket.isoformat())
+        # Pages embed the CSRF token, so a new token must not get a cached copy
+        parts.append(request.COOKIES.get('csrftoken', ''))
+        if per_user:
+            parts += [str(request.user.pk), str(request.role)]
+        if per_user or per_company:
+            # Per-company pages: a superuser who switches company must not get the old one's copy
+            parts.append(str(tenancy.active()))
+        last = max([changed_at for _, changed_at in rows.values()] + ([bucket] if bucket else []), default=None)
+        request._watermark_state[key] = (hashlib.sha1('|'.join(parts).encode()).hexdigest(), last)
+    return request._watermark_state[key]
+
+
+def conditional(*models, per_user=False, period=None, per_company=False):
+    """
+    ETag / Last-Modified from the given models' watermarks (plus the URL, the
+    user for per_user pages, and the active company for per_user and
+    per_company pages). period ('day', 'month' or seconds) also rolls the
+    ETag over with the clock for pages that show dates or "x minutes ago".
+    Responses are private and always revalidated.
+    """
+    def decorator(view):
+        @wraps(view)
+        @cache_control(private=True, no_cache=True)
+        @condition(etag_func=lambda request, *args, **kwargs: _state(request, models, per_user, period, per_company)[0],
+                   last_modified_func=lambda request, *args, **kwargs: _state(request, models, per_user, period, per_company)[1])
+        def wrapper(request, *args, **kwargs):
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -3,6 +3,10 @@ ASGI config for sme_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The /events/ stream (documents.events) holds one idle connection per open
+dashboard, so serve it through this module with an async worker, e.g.
+    gunicorn sme_project.asgi:application -k uvicorn_worker.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
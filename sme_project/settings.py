@@ -31,12 +31,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'documents.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'documents.middleware.role_middleware',
+    'documents.tenancy.company_middleware',
+    'documents.profiling.profiling_middleware',
+    'documents.routers.sticky_primary_middleware',
+    'documents.watermarks.watermark_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -45,7 +51,7 @@ ROOT_URLCONF = 'sme_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'documents.instrumentation.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -72,9 +78,125 @@ DATABASES = {
 }
 db_from_env = dj_database_url.config(conn_max_age=600)
 DATABASES['default'].update(db_from_env)
+
+# Optional read replica for dashboards/reports/exports (see documents/routers.py)
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = {**dj_database_url.parse(os.environ['DATABASE_REPLICA_URL'], conn_max_age=600), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_ROUTERS = ['documents.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+# SQLite production profile (on by default, SQLITE_TUNING=0 turns it off).
+# WAL lets readers run while one writer commits, busy_timeout makes writers
+# queue instead of failing with "database is locked", and IMMEDIATE takes the
+# write lock at BEGIN so a read-then-write transaction can't deadlock on upgrade.
+# Measure with: python manage.py bench_sqlite_writes --workers 4
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 20000))
+SQLITE_OPTIONS = {
+    'init_command': ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}',
+        'PRAGMA mmap_size=134217728',  # 128 MB
+        'PRAGMA cache_size=-20000',    # ~20 MB page cache
+        'PRAGMA temp_store=MEMORY',
+    ]),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+}
+
+# PostgreSQL connection pool (psycopg 3, on by default, DB_POOL=0 falls back to
+# persistent connections). Each gunicorn worker gets its own pool, so keep
+# workers * DB_POOL_MAX_SIZE under the server's max_connections.
+# CONN_HEALTH_CHECKS makes the pool (or the persistent connection) test a
+# connection before handing it out, so a database restart costs one reconnect
+# instead of a 500. Measure with: python manage.py bench_db_connect
+DB_POOL_OPTIONS = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+    'max_lifetime': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),  # seconds, recycled with jitter
+    'max_idle': int(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+    'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),  # wait for a free connection
+}
+
+for db in DATABASES.values():
+    if db['ENGINE'] == 'django.db.backends.sqlite3' and os.environ.get('SQLITE_TUNING', '1') == '1':
+        db.setdefault('OPTIONS', {}).update(SQLITE_OPTIONS)
+    elif db['ENGINE'] == 'django.db.backends.postgresql':
+        db['CONN_HEALTH_CHECKS'] = True
+        if os.environ.get('DB_POOL', '1') == '1':
+            db['CONN_MAX_AGE'] = 0  # the pool owns connection reuse
+            db.setdefault('OPTIONS', {})['pool'] = DB_POOL_OPTIONS
 # Production e PostgreSQL use korbe
 ALLOWED_HOSTS = ['*'] # Sobai access korte parbe
 
+# Cache
+# CACHE_BACKEND picks one of: locmem (default, per process), file, redis.
+# redis works with any Redis-compatible server (Redis, Valkey, KeyDB), e.g. a local one on 6379.
+# With several gunicorn workers use file or redis, otherwise evictions only reach one worker.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gainers',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, '.cache')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+CACHES = {'default': CACHE_BACKENDS[CACHE_BACKEND]}
+
+# Seconds a dashboard fragment lives; signals evict earlier when the data changes
+DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 300))
+
+# Performance instrumentation (Server-Timing headers, slow-request log, /perf/ summary)
+PERF_INSTRUMENTATION = os.environ.get('PERF_INSTRUMENTATION', '') == '1'
+PERF_SLOW_REQUEST_MS = int(os.environ.get('PERF_SLOW_REQUEST_MS', 1000))
+PERF_SUMMARY_SIZE = int(os.environ.get('PERF_SUMMARY_SIZE', 200))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'documents.perf': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+if os.environ.get('PERF_SLOW_LOG'):
+    LOGGING['handlers']['slow_file'] = {'class': 'logging.FileHandler', 'filename': os.environ['PERF_SLOW_LOG']}
+    LOGGING['loggers']['documents.perf']['handlers'].append('slow_file')
+
+# On-demand cProfile (?_profile=1 as a superuser), listed at /profiles/
+PROFILE_DIR = os.environ.get('PROFILE_DIR', BASE_DIR / '.profiles')
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+
+# Scheduled jobs (manage.py run_jobs, see documents/jobs.py). Weekdays as date.weekday(): Friday is 4.
+WEEKLY_OFF_DAYS = [int(d) for d in os.environ.get('WEEKLY_OFF_DAYS', '4').split(',') if d.strip()]
+# Check-ins still open after the day are closed at this time (the 7-hour shift ends at 22:00)
+AUTO_CHECKOUT_TIME = os.environ.get('AUTO_CHECKOUT_TIME', '22:00')
+
+# Hot/cold archival to Parquet (manage.py archive_data, see documents/archive.py)
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', BASE_DIR / 'archive')
+ARCHIVE_LEADS_AFTER_DAYS = int(os.environ.get('ARCHIVE_LEADS_AFTER_DAYS', 180))
+ARCHIVE_ATTENDANCE_AFTER_DAYS = int(os.environ.get('ARCHIVE_ATTENDANCE_AFTER_DAYS', 365))
+
+# Google Sheets lead import (documents/sheets.py); 'fake' serves SHEETS_FAKE_FILE instead of Google
+SHEETS_BACKEND = os.environ.get('SHEETS_BACKEND', 'google')
+SHEETS_CREDENTIALS_FILE = os.environ.get('SHEETS_CREDENTIALS_FILE', 'credentials.json')
+SHEETS_LEADS_KEY = os.environ.get('SHEETS_LEADS_KEY', '')  # pinned spreadsheet id; else looked up by name once a day
+SHEETS_FAKE_FILE = os.environ.get('SHEETS_FAKE_FILE', '')
+SHEETS_REQUESTS_PER_MINUTE = int(os.environ.get('SHEETS_REQUESTS_PER_MINUTE', 60))
+
+# Loads the user with its employee/client profile in one query (see documents.middleware)
+AUTHENTICATION_BACKENDS = ['documents.backends.ProfileBackend']
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
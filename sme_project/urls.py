@@ -1,17 +1,26 @@
 from django.contrib import admin
 from django.urls import path
 from documents.views import (
-    login_view, logout_view, dashboard, 
+    login_view, logout_view, switch_company, dashboard, 
     mark_attendance, mark_own_attendance, manage_leave, add_sales,
     generate_pdf, generate_id_card, generate_voucher, 
     generate_salary_sheet, generate_attendance_sheet, 
     generate_payslip, generate_contract_payslip, generate_experience_certificate,
-    print_employee_attendance,
+    print_employee_attendance, generate_leave_approval,
     # CRM & CMS
     add_lead_admin, distribute_leads, update_lead_status, sync_google_sheets,
     create_batch, add_enrolled_client, batch_details, update_client_task,
-    resolve_issue, complete_call_request, client_portal
+    resolve_issue, complete_call_request, client_portal,
+    # Monitoring
+    cache_stats, perf_summary, profile_list, profile_download,
+    # Exports
+    export_data, archive_query,
+    # Analytics
+    sales_leaderboard, leave_coverage, expense_report,
+    # Portal APIs
+    employee_summary, client_summary,
 )
+from documents.events import event_stream
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -21,6 +30,7 @@ urlpatterns = [
     # Authentication
     path('login/', login_view, name='login'),
     path('logout/', logout_view, name='logout'),
+    path('switch-company/', switch_company, name='switch_company'),
     
     # Main Dashboard
     path('', dashboard, name='home'),
@@ -41,6 +51,7 @@ urlpatterns = [
     path('print-smart-payslip/<int:emp_id>/', generate_contract_payslip, name='print_smart_payslip'),
     path('print-experience/<int:emp_id>/', generate_experience_certificate, name='print_experience'),
     path('print-emp-attendance/<int:emp_id>/', print_employee_attendance, name='print_emp_attendance'),
+    path('print-leave/<int:leave_id>/', generate_leave_approval, name='print_leave_approval'),
 
     # CRM & Lead Management
     path('crm/add/', add_lead_admin, name='add_lead_admin'),
@@ -56,6 +67,28 @@ urlpatterns = [
     path('cms/resolve-issue/<int:issue_id>/', resolve_issue, name='resolve_issue'),
     path('cms/call-done/<int:req_id>/', complete_call_request, name='complete_call_request'),
     path('student-portal/', client_portal, name='client_portal'),
+
+    # Live updates (SSE, needs the ASGI server)
+    path('events/', event_stream, name='event_stream'),
+
+    # Monitoring
+    path('cache-stats/', cache_stats, name='cache_stats'),
+    path('perf/', perf_summary, name='perf_summary'),
+    path('profiles/', profile_list, name='profile_list'),
+    path('profiles/<str:name>', profile_download, name='profile_download'),
+
+    # Exports
+    path('exports/<str:name>.<str:fmt>', export_data, name='export_data'),
+    path('archive/<str:name>/', archive_query, name='archive_query'),
+
+    # Analytics
+    path('analytics/leaderboard/', sales_leaderboard, name='sales_leaderboard'),
+    path('analytics/coverage/', leave_coverage, name='leave_coverage'),
+    path('analytics/expenses/', expense_report, name='expense_report'),
+
+    # Portal APIs
+    path('api/employee/summary/', employee_summary, name='employee_summary'),
+    path('api/client/summary/', client_summary, name='client_summary'),
     
     ]
 